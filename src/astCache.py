@@ -0,0 +1,185 @@
+from logoAst import encode, decode
+from collections import OrderedDict
+import hashlib
+import marshal
+import os
+import tempfile
+import threading
+
+"""
+Limiti di default della cache, possono essere modificati tramite variabili d'ambiente.
+La cache su disco e' disabilitata se `LOGO_AST_CACHE_DIR` non e' definita.
+"""
+MAX_ENTRIES = int(os.environ.get('LOGO_AST_CACHE_ENTRIES', 1024))
+MAX_BYTES = int(os.environ.get('LOGO_AST_CACHE_BYTES', 64 * 1024 * 1024))
+CACHE_DIR = os.environ.get('LOGO_AST_CACHE_DIR')
+
+"""
+Ogni quanti inserimenti viene controllata la dimensione della cache su disco.
+"""
+DISK_PRUNE_INTERVAL = 64
+
+class ASTCache:
+    """
+    Cache a due livelli degli alberi prodotti da `parse`:
+
+        - una cache LRU in memoria
+        - una cache opzionale su disco, condivisa tra processi diversi
+
+    La chiave e' l'hash del sorgente Logo unito a `salt`, che deve identificare la grammatica e la versione
+    della trasformazione `logoToAst`: quando una delle due cambia le vecchie voci non vengono piu' trovate.
+    Gli alberi sono salvati serializzati tramite `encode` definita in [[logoAst.py#encode]],
+    ad ogni `get` viene ricostruito un albero nuovo, cosi' che le modifiche fatte all'albero non possano mai alterare la cache.
+    La cache in memoria e' protetta da `lock`, cosi' che possa essere usata da piu' thread.
+    """
+
+    def __init__(self, salt, maxEntries=MAX_ENTRIES, maxBytes=MAX_BYTES, directory=CACHE_DIR):
+        self.salt = salt.encode('utf-8')
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.directory = None
+        if directory is not None:
+            self.directory = os.path.join(directory, 'ast-' + hashlib.sha256(self.salt).hexdigest()[:16])
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.diskHits = 0
+        self.misses = 0
+        self.puts = 0
+
+    def key(self, code):
+        """
+        Restituisce la chiave con cui il sorgente e' salvato nella cache.
+        """
+        return hashlib.sha256(self.salt + code.encode('utf-8')).hexdigest()
+
+    def get(self, code):
+        """
+        Cerca l'albero del sorgente prima in memoria e poi su disco, restituisce `None` se non e' presente.
+        """
+        key = self.key(code)
+        with self.lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+        if data is not None:
+            return decode(marshal.loads(data))
+
+        data = self._readDisk(key)
+        if data is not None:
+            try:
+                tree = decode(marshal.loads(data))
+            except (EOFError, ValueError, TypeError, KeyError):
+                self.misses += 1
+                return None
+            self._store(key, data)
+            self.diskHits += 1
+            return tree
+
+        self.misses += 1
+        return None
+
+    def put(self, code, tree):
+        """
+        Salva l'albero del sorgente in memoria e, se abilitata, su disco.
+        """
+        key = self.key(code)
+        data = marshal.dumps(encode(tree))
+        self._store(key, data)
+        self._writeDisk(key, data)
+
+    def clear(self):
+        """
+        Svuota la cache in memoria e azzera i contatori, la cache su disco non viene toccata.
+        """
+        self.entries.clear()
+        self.bytes = 0
+        self.hits = self.diskHits = self.misses = self.puts = 0
+
+    def stats(self):
+        """
+        Restituisce i contatori della cache.
+        """
+        return {
+            'hits': self.hits,
+            'diskHits': self.diskHits,
+            'misses': self.misses,
+            'entries': len(self.entries),
+            'bytes': self.bytes
+        }
+
+    def _store(self, key, data):
+        """
+        Inserisce una voce nella cache in memoria ed elimina le voci usate meno di recente
+        finche' non vengono rispettati i limiti sul numero di voci e sulla dimensione.
+        """
+        if len(data) > self.maxBytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self.entries[key] = data
+            self.bytes += len(data)
+
+            while len(self.entries) > self.maxEntries or self.bytes > self.maxBytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.ast')
+
+    def _readDisk(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), 'rb') as inf:
+                data = inf.read()
+            os.utime(self._path(key))
+            return data
+        except OSError:
+            return None
+
+    def _writeDisk(self, key, data):
+        """
+        Scrive la voce su disco in modo atomico, ogni `DISK_PRUNE_INTERVAL` inserimenti applica i limiti anche al disco.
+        """
+        if self.directory is None:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, 'wb') as ouf:
+                ouf.write(data)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            return
+
+        self.puts += 1
+        if self.puts % DISK_PRUNE_INTERVAL == 0:
+            self._pruneDisk()
+
+    def _pruneDisk(self):
+        """
+        Elimina dal disco i file meno recenti finche' non vengono rispettati i limiti della cache.
+        """
+        try:
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.ast'):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return
+
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        while files and (len(files) > self.maxEntries or total > self.maxBytes):
+            _, size, path = files.pop(0)
+            total -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,144 @@
+from interpreter import Interpreter, toWord
+from parser import parse
+from stackMachine import runProgramAsync, STEPS
+import asyncio
+import sys
+
+"""
+Esecuzione di programmi Logo dentro un event loop di **asyncio**, per ospitare in un solo processo
+molte sessioni interattive, per lo piu' ferme in attesa dell'utente.
+
+**AsyncInterpreter** esegue l'albero con il motore `stack`, tramite [[stackMachine.py#evaluate async]]:
+ogni `STEPS` passi restituisce il controllo all'event loop, quindi una sessione che esegue un ciclo lungo
+non blocca le altre, e `READWORD` attende la funzione asincrona `input` invece di chiamare `input()` bloccando il processo.
+Una sessione in attesa di input e' solo una coroutine sospesa, senza thread ne' processi.
+
+Se viene indicata la coda `events` (un `asyncio.Queue` o un oggetto con il metodo asincrono `put`) l'output
+non viene stampato ma inviato come sequenza di eventi, nell'ordine in cui il programma li ha prodotti:
+
+    - `('print', testo)` per ogni `print`
+    - `('draw', tratti)` con la lista dei tratti aggiunti alla display list dall'evento precedente
+    - `('clear', None)` quando `clearscreen` svuota la display list
+    - `('end', errore)` al termine dell'esecuzione, `errore` e' l'eccezione che l'ha interrotta oppure `None`
+
+Gli eventi vengono consegnati a ogni cessione del controllo, prima di attendere l'input e al termine,
+i tratti disegnati prima di un `clearscreen` vengono raccolti prima di svuotare la display list:
+con una coda limitata una sessione il cui consumatore non legge gli eventi resta sospesa invece di accumularli.
+I tratti sono rilevati dalla display list dei backend derivati da `headless`, con gli altri backend vengono inviati
+solo gli eventi di `print`.
+Il parsing resta sincrono, ma i programmi gia' visti sono letti dalla cache di [[parser.py]].
+"""
+
+#===async interpreter===
+class AsyncInterpreter(Interpreter):
+    """
+    **Interpreter** con il motore `stack` che esegue i programmi con la coroutine **run**.
+    `input` e' la funzione asincrona, senza argomenti, che restituisce la riga letta da `READWORD`, ad esempio il metodo
+    `get` di un `asyncio.Queue`; se non e' indicata `READWORD` solleva `EOFError`.
+    `steps` e' il numero di passi tra due cessioni del controllo all'event loop.
+    """
+
+    def __init__(self, optimize=None, graphics='headless', input=None, events=None, steps=STEPS, seed=None):
+        Interpreter.__init__(self, 'stack', optimize, graphics, seed=seed)
+        self.asyncInput = input
+        self.events = events
+        self.steps = steps
+        self.pending = []
+        self.shown = getattr(self.graphics, 'displayList', None)
+        self.drawn = 0
+        if self.shown is not None:
+            self.clearDisplay, self.graphics.clear = self.graphics.clear, self._clear
+
+    def write(self, value):
+        """
+        Con una coda di eventi accoda `('print', testo)`, altrimenti stampa come **Interpreter.write**.
+        """
+        if self.events is None:
+            Interpreter.write(self, value)
+            return
+        self._collect()
+        self.pending.append(('print', str(value)))
+
+    def _collect(self):
+        """
+        Accoda gli eventi dei tratti aggiunti alla display list da quando e' stata osservata l'ultima volta.
+        """
+        shapes = getattr(self.graphics, 'displayList', None)
+        if shapes is None or self.events is None:
+            return
+        if shapes is not self.shown:
+            self.pending.append(('clear', None))
+            self.shown, self.drawn = shapes, 0
+        if len(shapes) > self.drawn:
+            self.pending.append(('draw', shapes[self.drawn:]))
+            self.drawn = len(shapes)
+
+    def _clear(self):
+        """
+        Sostituisce `clear` del backend: accoda i tratti disegnati dall'ultimo evento prima che la display list
+        venga svuotata, altrimenti non verrebbero mai inviati.
+        """
+        self._collect()
+        self.clearDisplay()
+
+    async def _flush(self, *events):
+        self._collect()
+        self.pending.extend(events)
+        pending, self.pending = self.pending, []
+        for event in pending:
+            await self.events.put(event)
+
+    async def _pause(self):
+        if self.events is not None:
+            await self._flush()
+        await asyncio.sleep(0)
+
+    async def _read(self):
+        if self.events is not None:
+            await self._flush()
+        if self.asyncInput is None:
+            raise EOFError("READWORD non ha un ingresso da cui leggere")
+        return toWord(await self.asyncInput())
+
+    async def run(self, code):
+        """
+        Interpreta il codice e restituisce il risultato del backend grafico, come **Interpreter.run**.
+        Se il codice non e' valido solleva **SyntaxError**; questo errore e quelli del programma vengono rilanciati
+        dopo aver inviato l'evento `end`.
+        """
+        error = None
+        try:
+            ast = parse(code)
+            if ast is None:
+                raise SyntaxError("Errore di parsing")
+            with self.active():
+                if self.optimize:
+                    import optimizer
+                    ast = optimizer.optimize(ast)
+                await runProgramAsync(ast, self._read, self._pause, self.steps)
+        except Exception as exc:
+            error = exc
+        if self.events is not None:
+            await self._flush(('end', error))
+        if error is not None:
+            raise error
+        return self.graphics.close()
+
+#===run async===
+async def runAsync(code, input=None, events=None, graphics='headless', optimize=None, steps=STEPS, seed=None):
+    """
+    Esegue il codice in un nuovo **AsyncInterpreter** e restituisce il risultato del backend grafico.
+    """
+    return await AsyncInterpreter(optimize, graphics, input, events, steps, seed).run(code)
+
+#===console===
+async def _console():
+    line = await asyncio.get_running_loop().run_in_executor(None, sys.stdin.readline)
+    if not line:
+        raise EOFError()
+    return line.rstrip('\n')
+
+if __name__ == '__main__':
+    with open(sys.argv[1]) as inf:
+        displayList = asyncio.run(runAsync(inf.read(), input=_console))
+    print(len(displayList), 'tratti')
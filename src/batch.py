@@ -0,0 +1,274 @@
+from interpreter import Interpreter, ENGINES
+from budget import Budget, BudgetExceeded
+from svg import writeSvg
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from io import StringIO
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+# import anticipati: i moduli dei motori vengono caricati prima di creare i processi,
+# cosi' che i worker li ereditino gia' inizializzati
+import compiler
+import stackMachine
+import transpiler
+import optimizer
+
+"""
+Esecuzione in blocco di molti programmi Logo, ad esempio i compiti degli studenti o i programmi generati.
+La grammatica di [[parser.py]] e i motori vengono caricati una sola volta, poi un pool di processi creati con `fork`
+esegue i programmi ricevendoli a blocchi di `CHUNKSIZE`: ogni worker eredita la grammatica gia' costruita
+invece di generarla di nuovo come un processo per file.
+
+Per ogni programma viene prodotto un oggetto JSON su una riga, nello stesso ordine dei programmi:
+
+    - `path`, il file eseguito
+    - `status`, `ok`, `error`, `timeout` oppure `limit`, se il programma ha superato un limite del [[budget.py#budget]]
+    - `stdout`, quello che il programma ha stampato
+    - `error`, tipo e messaggio dell'eccezione, con `resource` per un limite superato, `null` se il programma e' terminato correttamente
+    - `seconds`, il tempo di esecuzione del programma, parsing compreso
+    - `strokes`, i tratti della display list del backend `headless` e, se richiesto, `drawing`, il file SVG del disegno
+    - `usage`, le risorse consumate e i limiti, come restituiti da **Budget.report**
+
+Il tempo massimo di un programma viene fatto rispettare nel worker con `SIGALRM`, che interrompe l'esecuzione
+sollevando **Timeout**, i limiti di passi, profondita' e tratti dal **Budget** dell'interprete.
+Al termine **runBatch** restituisce il riepilogo calcolato da **summary**.
+"""
+
+"""
+Numero di programmi consegnati insieme a un worker.
+"""
+CHUNKSIZE = 16
+
+"""
+Tempo massimo in secondi per un programma, `None` se illimitato.
+"""
+TIMEOUT = None
+
+"""
+Programma eseguito prima di creare i worker. ANTLR costruisce le proprie tabelle di parsing (DFA) durante i primi parsing,
+molto piu' lenti dei successivi, e alcuni moduli, come **numpy** per i cicli vettorizzati, vengono importati solo al primo uso.
+Eseguendolo nel processo principale i worker ereditano tabelle e moduli gia' pronti: altrimenti ogni worker pagherebbe
+questo costo sul primo programma, e di nuovo dopo ogni parsing interrotto da un timeout.
+"""
+WARMUP_PROGRAM = r"""
+    to square :size :angle
+        if :size < 1 [stop]
+        ifelse :size > 100 [output :size] [repeat 4 [fd :size rt 90]]
+        make "n :size
+        while :n > 1 [make "n :n / 2 pu fd 1 pd]
+        output (sum :size 2 3)
+    end
+    make "x (square 10 45)
+    print :x print "word
+    setxy 10 20 setpc [255 0 0] arc 360 10 setpensize 2
+    print (random 10) + (quotient 5 2) * 3 - 1
+    if (and "true (or "false not "true)) [print 2 = 2]
+    make "k 3 repeat 36 [fd :k / 10 rt 10] print :k
+"""
+
+#===timeout===
+class Timeout(BaseException):
+    """
+    Sollevata quando un programma supera il tempo massimo.
+    Non deriva da `Exception`, cosi' che non venga intercettata dai motori come un errore del programma Logo.
+    """
+    pass
+
+def _alarm(signum, frame):
+    raise Timeout()
+
+def _noInput(prompt=''):
+    raise EOFError("READWORD non e' disponibile durante l'esecuzione in blocco")
+
+#===warm up===
+def warmUp(engine=None):
+    """
+    Esegue `WARMUP_PROGRAM` con il motore indicato, da chiamare prima di creare i worker.
+    """
+    with redirect_stdout(StringIO()):
+        Interpreter(engine, graphics='headless').run(WARMUP_PROGRAM)
+
+#===find programs===
+def findPrograms(paths):
+    """
+    Restituisce la lista dei programmi indicati da `paths`: una cartella contribuisce tutti i file `.logo` che contiene,
+    anche nelle sottocartelle, in ordine alfabetico; un file `.logo` se stesso; ogni altro file e' un manifest
+    con un percorso per riga, relativo alla cartella del manifest, le righe vuote e quelle che iniziano con `#` sono ignorate.
+    """
+    programs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, subdirectories, files in os.walk(path):
+                subdirectories.sort()
+                programs += [os.path.join(directory, name) for name in sorted(files) if name.endswith('.logo')]
+        elif path.endswith('.logo'):
+            programs.append(path)
+        else:
+            base = os.path.dirname(path)
+            with open(path) as inf:
+                for line in inf:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        programs.append(os.path.join(base, line))
+    return programs
+
+#===limits===
+def addLimits(arguments):
+    """
+    Aggiunge al parser della riga di comando le opzioni dei limiti del **Budget**, lette da **limitsOf**.
+    """
+    arguments.add_argument('--max-steps', type=int, default=None, help='passi massimi per programma')
+    arguments.add_argument('--max-depth', type=int, default=None, help='profondita\' massima delle chiamate di procedura')
+    arguments.add_argument('--max-segments', type=int, default=None, help='tratti massimi disegnati da un programma')
+
+def limitsOf(options):
+    return {'steps': options.max_steps, 'depth': options.max_depth, 'segments': options.max_segments}
+
+#===run code===
+def runCode(code, engine=None, timeout=None, input=_noInput, limits=None):
+    """
+    Esegue il codice in un nuovo **Interpreter** con il backend `headless` e restituisce il risultato, senza `path`,
+    e la display list, `None` se l'esecuzione non e' terminata correttamente.
+    `limits` e' il dizionario degli argomenti del **Budget** dell'interprete.
+    Puo' essere chiamata solo dal thread principale del processo, perche' il tempo massimo usa `SIGALRM`.
+    """
+    result = {'status': 'ok', 'stdout': '', 'error': None, 'seconds': 0.0, 'strokes': None}
+    displayList = None
+    budget = Budget(**(limits or {}))
+    output = StringIO()
+    start = time.perf_counter()
+    if timeout:
+        signal.signal(signal.SIGALRM, _alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        with redirect_stdout(output):
+            displayList = Interpreter(engine, graphics='headless', input=input, budget=budget).run(code)
+        result['strokes'] = len(displayList)
+    except Timeout:
+        result['status'] = 'timeout'
+        result['error'] = {'type': 'Timeout', 'message': 'Superato il tempo massimo di ' + str(timeout) + ' secondi'}
+    except BudgetExceeded as error:
+        result['status'] = 'limit'
+        result['error'] = {'type': 'BudgetExceeded', 'message': str(error), 'resource': error.resource}
+    except Exception as error:
+        result['status'] = 'error'
+        result['error'] = {'type': type(error).__name__, 'message': str(error)}
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    result['seconds'] = time.perf_counter() - start
+    result['stdout'] = output.getvalue()
+    result['usage'] = budget.report()
+    return result, displayList
+
+#===run job===
+def runJob(job):
+    """
+    Esegue un programma con **runCode** e restituisce il suo risultato.
+    `job` e' la tupla `(indice, percorso, motore, timeout, cartella dei disegni, limiti)`.
+    """
+    index, path, engine, timeout, drawings, limits = job
+    result = {'path': path}
+    try:
+        with open(path) as inf:
+            code = inf.read()
+    except OSError as error:
+        result.update({'status': 'error', 'stdout': '', 'error': {'type': type(error).__name__, 'message': str(error)},
+                       'seconds': 0.0, 'strokes': None, 'usage': None})
+        return result
+
+    outcome, displayList = runCode(code, engine, timeout, limits=limits)
+    result.update(outcome)
+    if displayList is not None and drawings is not None:
+        name = os.path.splitext(os.path.basename(path))[0]
+        result['drawing'] = os.path.join(drawings, '%06d_%s.svg' % (index, name))
+        writeSvg(displayList, result['drawing'])
+    return result
+
+#===percentile===
+def percentile(values, fraction):
+    """
+    Percentile di `values` con il metodo nearest-rank, `None` se `values` e' vuota.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+#===summary===
+def summary(results, seconds):
+    """
+    Riepilogo di un esecuzione: programmi eseguiti, terminati correttamente, con errore, interrotti o oltre un limite,
+    tempo totale, programmi al secondo e latenze p50 e p99 in secondi.
+    """
+    latencies = [result['seconds'] for result in results]
+    statuses = [result['status'] for result in results]
+    return {
+        'programs': len(results),
+        'ok': statuses.count('ok'),
+        'errors': statuses.count('error'),
+        'timeouts': statuses.count('timeout'),
+        'limits': statuses.count('limit'),
+        'seconds': seconds,
+        'programsPerSecond': len(results) / seconds if seconds else 0.0,
+        'p50': percentile(latencies, 0.5),
+        'p99': percentile(latencies, 0.99)
+    }
+
+#===run batch===
+def runBatch(programs, out, processes=None, timeout=TIMEOUT, chunksize=CHUNKSIZE, engine=None, drawings=None, limits=None):
+    """
+    Esegue `programs` con `processes` worker, `os.cpu_count()` se non indicato, scrivendo su `out` una riga JSON
+    per programma appena il suo risultato e' disponibile nell'ordine della lista, e restituisce il riepilogo di **summary**.
+    Con `processes` uguale a 0 i programmi vengono eseguiti nel processo corrente.
+    `limits` sono i limiti del **Budget** di ogni programma, come in **runCode**.
+    """
+    if drawings is not None:
+        os.makedirs(drawings, exist_ok=True)
+    warmUp(engine)
+    jobs = [(index, path, engine, timeout, drawings, limits) for index, path in enumerate(programs)]
+    results = []
+    start = time.perf_counter()
+
+    if processes == 0:
+        outcomes = map(runJob, jobs)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(processes or os.cpu_count(), mp_context=multiprocessing.get_context('fork'))
+        outcomes = pool.map(runJob, jobs, chunksize=chunksize)
+    try:
+        for result in outcomes:
+            out.write(json.dumps(result) + '\n')
+            results.append({'status': result['status'], 'seconds': result['seconds']})
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return summary(results, time.perf_counter() - start)
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(description='Esegue in blocco programmi Logo e scrive i risultati in JSON Lines.')
+    arguments.add_argument('paths', nargs='+', help='file .logo, cartelle o manifest con un percorso per riga')
+    arguments.add_argument('-o', '--output', default='-', help='file dei risultati, - per lo standard output')
+    arguments.add_argument('-j', '--processes', type=int, default=None, help='numero di worker, 0 per nessun worker')
+    arguments.add_argument('-t', '--timeout', type=float, default=TIMEOUT, help='tempo massimo in secondi per programma')
+    arguments.add_argument('-c', '--chunksize', type=int, default=CHUNKSIZE, help='programmi consegnati insieme a un worker')
+    arguments.add_argument('-e', '--engine', choices=ENGINES, default=None, help='motore di esecuzione')
+    arguments.add_argument('-d', '--drawings', default=None, help='cartella in cui salvare i disegni SVG')
+    addLimits(arguments)
+    options = arguments.parse_args()
+
+    programs = findPrograms(options.paths)
+    settings = (options.processes, options.timeout, options.chunksize, options.engine, options.drawings, limitsOf(options))
+    if options.output == '-':
+        report = runBatch(programs, sys.stdout, *settings)
+    else:
+        with open(options.output, 'w') as ouf:
+            report = runBatch(programs, ouf, *settings)
+    print(json.dumps(report), file=sys.stderr)
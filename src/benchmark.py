@@ -0,0 +1,27 @@
+from benchmarks import AREAS, find
+import argparse
+
+"""
+Esegue i benchmark del progetto, definiti per area in [[benchmarks/__init__.py]].
+Si eseguono con `python benchmark.py [nome ...]`, dove ogni nome e' un benchmark oppure un area,
+senza argomenti vengono eseguiti tutti. `python benchmark.py --list` stampa le aree e i loro benchmark.
+"""
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(description='Esegue i benchmark dell\'interprete Logo.')
+    arguments.add_argument('names', nargs='*', help='benchmark o aree da eseguire, tutti se non indicati')
+    arguments.add_argument('-l', '--list', action='store_true', help='stampa le aree e i loro benchmark')
+    options = arguments.parse_args()
+
+    if options.list:
+        for area, names in AREAS.items():
+            print('{:<12}{}'.format(area, ' '.join(names)))
+    else:
+        benchmarks = []
+        for name in options.names or AREAS:
+            try:
+                benchmarks += find(name)
+            except KeyError:
+                arguments.error('benchmark o area sconosciuta: ' + name)
+        for benchmark in benchmarks:
+            benchmark()
@@ -0,0 +1,38 @@
+import importlib
+
+"""
+Benchmark del progetto, divisi per area in un modulo ciascuno:
+
+    - `parsing`, [[benchmarks/parsing.py]]: generazione della grammatica, parsing e memoria dell'albero
+    - `execution`, [[benchmarks/execution.py]]: motori di esecuzione, ottimizzatore, budget e thread
+    - `turtles`, [[benchmarks/turtles.py]]: backend grafici che calcolano la tartaruga
+    - `exporters`, [[benchmarks/exporters.py]]: SVG, ottimizzazione della display list, PNG e tasselli
+    - `services`, [[benchmarks/services.py]]: esecuzione in blocco, server HTTP e sessioni asyncio
+
+Ogni benchmark e' una funzione che stampa le proprie misure, le funzioni di misura comuni sono in [[benchmarks/common.py]].
+Si eseguono con [[benchmark.py]]. I moduli vengono importati solo quando servono, perche' alcuni benchmark richiedono **numpy**.
+"""
+
+"""
+Benchmark di ogni area, nell'ordine in cui vengono eseguiti.
+"""
+AREAS = {
+    'parsing': ('startup', 'parse', 'memory'),
+    'execution': ('engines', 'control', 'tailcalls', 'deep', 'optimizer', 'budgets', 'threads'),
+    'turtles': ('graphics', 'vectorized', 'procedures', 'swarm', 'trajectory'),
+    'exporters': ('svg', 'drawing', 'raster', 'tiles'),
+    'services': ('batch', 'server', 'sessions')
+}
+
+#===find===
+def find(name):
+    """
+    Restituisce le funzioni del benchmark o dell'area `name`, se non esiste solleva **KeyError**.
+    """
+    if name in AREAS:
+        benchmarks = [(name, benchmark) for benchmark in AREAS[name]]
+    else:
+        benchmarks = [(area, name) for area, names in AREAS.items() if name in names]
+    if not benchmarks:
+        raise KeyError(name)
+    return [getattr(importlib.import_module('benchmarks.' + area), benchmark) for area, benchmark in benchmarks]
@@ -0,0 +1,49 @@
+import os
+import statistics
+import time
+
+"""
+Funzioni di misura e programmi condivisi dai benchmark di [[benchmarks/__init__.py]].
+"""
+
+"""
+Cartella dei sorgenti dell'interprete, in cui vengono eseguiti i processi python avviati dai benchmark.
+"""
+SOURCE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#===timeit===
+def timeit(function, repeat):
+    """
+    Esegue `repeat` volte la funzione e restituisce la lista dei tempi in secondi.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+#===report===
+def report(name, times):
+    """
+    Stampa il tempo minimo e la mediana di una serie di misurazioni.
+    """
+    print('{:<40} min {:9.4f}s   median {:9.4f}s'.format(name, min(times), statistics.median(times)))
+
+"""
+Fiocco di neve di Koch, usato per misurare i backend grafici.
+"""
+KOCH_PROGRAM = r"""
+    to koch :count :length
+        ifelse :count = 1 [fd :length] [
+            (koch :count - 1 :length / 3)
+            lt 60
+            (koch :count - 1 :length / 3)
+            rt 120
+            (koch :count - 1 :length / 3)
+            lt 60
+            (koch :count - 1 :length / 3)
+        ]
+    end
+    repeat 3 [(koch 6 300) rt 120]
+"""
@@ -0,0 +1,232 @@
+from benchmarks.common import timeit, report, KOCH_PROGRAM
+
+"""
+Benchmark dei motori di esecuzione: cicli, chiamate in coda, ricorsione profonda, ottimizzatore, budget e thread.
+"""
+
+"""
+Programmi Logo usati per confrontare i motori di esecuzione, uno basato su cicli e uno ricorsivo.
+"""
+LOOP_PROGRAM = r"""
+    make "s 0
+    make "i 0
+    repeat 20000 [make "s :s + :i * 2 - 1 make "i :i + 1]
+    while :i > 0 [make "i :i - 1]
+"""
+
+RECURSION_PROGRAM = r"""
+    to fib :n
+        if :n <= 1 [output :n]
+        output (fib :n - 2) + (fib :n - 1)
+    end
+    make "r fib 18
+"""
+
+#===engines===
+def engines(repeat=5):
+    """
+    Confronta i motori di esecuzione disponibili su programmi ricchi di cicli e di ricorsione.
+    Per il motore `python` viene misurata anche l'esecuzione del modulo gia' compilato, presente nella cache del transpiler.
+    """
+    import parser
+    import interpreter
+    import transpiler
+
+    for name, program in (('loop', LOOP_PROGRAM), ('recursion', RECURSION_PROGRAM)):
+        ast = parser.parse(program)
+        for engine in interpreter.ENGINES:
+            report(name + ' ' + engine, timeit(lambda: interpreter.execute(ast, engine), repeat))
+        transpiler.loadProgram(program)
+        runtime = interpreter.Interpreter('python')
+        def cachedModule():
+            with runtime.active():
+                transpiler.execute(transpiler.loadProgram(program))
+        report(name + ' python (cached module)', timeit(cachedModule, repeat))
+
+"""
+Cicli stretti usati per misurare il costo del controllo di `OUTPUT` e `STOP` nei corpi dei cicli,
+con un corpo di una sola istruzione e uno di otto, sia al di fuori che all'interno di una procedura.
+"""
+CONTROL_PROGRAMS = {
+    'repeat x1': r"""
+        make "i 0
+        repeat 20000 [make "i :i + 1]
+    """,
+    'repeat x8': r"""
+        make "i 0
+        repeat 5000 [make "i :i + 1 make "i :i + 1 make "i :i + 1 make "i :i + 1
+                     make "i :i + 1 make "i :i + 1 make "i :i + 1 make "i :i + 1]
+    """,
+    'while x1': r"""
+        make "i 0
+        while :i < 20000 [make "i :i + 1]
+    """,
+    'procedure repeat x8': r"""
+        to loop :n
+            repeat :n [make "i :i + 1 make "i :i + 1 make "i :i + 1 make "i :i + 1
+                       make "i :i + 1 make "i :i + 1 make "i :i + 1 make "i :i + 1]
+            output :i
+        end
+        make "i 0
+        make "r loop 5000
+    """
+}
+
+#===control===
+def control(repeat=5):
+    """
+    Esegue i cicli di `CONTROL_PROGRAMS` con i motori `tree` e `closure`.
+    """
+    import parser
+    import interpreter
+
+    for name, program in CONTROL_PROGRAMS.items():
+        ast = parser.parse(program)
+        for engine in ('tree', 'closure'):
+            report(name + ' ' + engine, timeit(lambda: interpreter.execute(ast, engine), repeat))
+
+"""
+Ricorsione in coda: una procedura che conta alla rovescia chiamando se stessa come ultima istruzione
+e due procedure mutuamente ricorsive che si chiamano tramite `OUTPUT`.
+Le versioni `shallow` restano entro il limite di ricorsione di python anche senza eliminazione delle chiamate in coda.
+"""
+TAIL_PROGRAMS = {
+    'countdown shallow': r"""
+        to down :n
+            if :n > 0 [down :n - 1]
+        end
+        repeat 200 [down 100]
+    """,
+    'countdown deep': r"""
+        to down :n
+            if :n > 0 [down :n - 1]
+        end
+        down 20000
+    """,
+    'mutual deep': r"""
+        to ping :n
+            if :n = 0 [output 0]
+            output (pong :n - 1)
+        end
+        to pong :n
+            if :n = 0 [output 1]
+            output (ping :n - 1)
+        end
+        make "r ping 20000
+    """
+}
+
+#===tail calls===
+def tailcalls(repeat=5):
+    """
+    Esegue i programmi di `TAIL_PROGRAMS` con tutti i motori, se la ricorsione supera il limite di python
+    viene stampato `RecursionError` al posto dei tempi.
+    """
+    import parser
+    import interpreter
+
+    for name, program in TAIL_PROGRAMS.items():
+        ast = parser.parse(program)
+        for engine in interpreter.ENGINES:
+            try:
+                report(name + ' ' + engine, timeit(lambda: interpreter.execute(ast, engine), repeat))
+            except RecursionError:
+                print('{:<40} RecursionError'.format(name + ' ' + engine))
+
+"""
+Ricorsione non in coda: il risultato della chiamata ricorsiva viene usato dalla procedura chiamante.
+"""
+DEEP_PROGRAMS = {
+    'depth 100': r"""
+        to depth :n
+            if :n = 0 [output 0]
+            output (depth :n - 1) + 1
+        end
+        repeat 100 [make "r depth 100]
+    """,
+    'depth 20000': r"""
+        to depth :n
+            if :n = 0 [output 0]
+            output (depth :n - 1) + 1
+        end
+        make "r depth 20000
+    """
+}
+
+#===deep===
+def deep(repeat=5):
+    """
+    Esegue i programmi di `DEEP_PROGRAMS` con tutti i motori, solo il motore `stack` non e' limitato dallo stack di python.
+    """
+    import parser
+    import interpreter
+
+    for name, program in DEEP_PROGRAMS.items():
+        ast = parser.parse(program)
+        for engine in interpreter.ENGINES:
+            try:
+                report(name + ' ' + engine, timeit(lambda: interpreter.execute(ast, engine), repeat))
+            except RecursionError:
+                print('{:<40} RecursionError'.format(name + ' ' + engine))
+
+#===threads===
+def threads(repeat=5, programs=32, workers=8):
+    """
+    Esegue `programs` volte `KOCH_PROGRAM`, gia' analizzato e condiviso da tutte le esecuzioni,
+    con un **Interpreter** per esecuzione, uno dopo l'altro e su un pool di `workers` thread.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    import parser
+    import interpreter
+
+    ast = parser.parse(KOCH_PROGRAM)
+    def execute(index):
+        return interpreter.Interpreter(engine, graphics='headless', seed=index).execute(ast)
+
+    for engine in interpreter.ENGINES:
+        report('threads ' + engine + ' sequential', timeit(lambda: list(map(execute, range(programs))), repeat))
+        with ThreadPoolExecutor(workers) as pool:
+            report('threads ' + engine + ' pool', timeit(lambda: list(pool.map(execute, range(programs))), repeat))
+
+"""
+Programma Logo con molte espressioni costanti, usato per misurare l'effetto di [[optimizer.py]].
+"""
+CONSTANT_PROGRAM = r"""
+    make "s 0
+    repeat 20000 [make "s :s + 3 * 4 - (sum 1 2 (product 2 3)) / 2 + -(1.5)]
+"""
+
+#===optimizer===
+def optimizer(repeat=5):
+    """
+    Confronta l'esecuzione con e senza ottimizzazione dell'albero per i motori `tree` e `closure`.
+    """
+    import parser
+    import interpreter
+    import optimizer
+
+    ast = parser.parse(CONSTANT_PROGRAM)
+    for engine in ('tree', 'closure'):
+        report('constants ' + engine, timeit(lambda: interpreter.execute(ast, engine, optimize=False), repeat))
+        report('constants ' + engine + ' (optimized)', timeit(lambda: interpreter.execute(ast, engine, optimize=True), repeat))
+    print('optimizer report', optimizer.report())
+
+#===budgets===
+def budgets(repeat=5):
+    """
+    Misura il costo dei contatori di [[budget.py]]: esegue il ciclo `while x1` di `CONTROL_PROGRAMS`
+    e `depth 100` di `DEEP_PROGRAMS` con tutti i motori, senza limiti e con tutti i limiti attivi ma mai raggiunti,
+    compreso quello di tempo che legge l'orologio ogni `CHECK_STEPS` passi.
+    """
+    import interpreter
+    from budget import Budget
+
+    limits = {'steps': 10 ** 9, 'depth': 10 ** 6, 'seconds': 3600, 'segments': 10 ** 9}
+    for name, program in (('while x1', CONTROL_PROGRAMS['while x1']), ('depth 100', DEEP_PROGRAMS['depth 100'])):
+        for engine in interpreter.ENGINES:
+            for label, budget in (('', Budget), (' (limited)', lambda: Budget(**limits))):
+                run = lambda: interpreter.Interpreter(engine, graphics='headless', budget=budget()).run(program)
+                report('budget ' + name + ' ' + engine + label, timeit(run, repeat))
+    usage = Budget(**limits)
+    interpreter.Interpreter('tree', graphics='headless', budget=usage).run(DEEP_PROGRAMS['depth 100'])
+    print('budget report', {resource: value['used'] for resource, value in usage.report().items()})
@@ -0,0 +1,128 @@
+from benchmarks.common import timeit, report, KOCH_PROGRAM
+import os
+import statistics
+import tempfile
+import tracemalloc
+
+"""
+Benchmark degli esportatori dei disegni: SVG, ottimizzazione della display list, PNG e tasselli.
+"""
+
+#===peak===
+def _peak(function):
+    """
+    Esegue la funzione e restituisce il massimo numero di byte allocati contemporaneamente durante l'esecuzione.
+    """
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+#===svg===
+def svg(repeat=5):
+    """
+    Esporta `KOCH_PROGRAM` in SVG scrivendo i tratti durante l'esecuzione con [[svg.py#svg backend]]
+    e, per confronto, esportando la display list del backend `headless` al termine,
+    stampando la memoria di picco dei due metodi.
+    """
+    import interpreter
+    from svg import SvgBackend, writeSvg
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'koch.svg')
+        streamed = lambda: interpreter.run(KOCH_PROGRAM, 'closure', graphics=SvgBackend(path))
+        exported = lambda: writeSvg(interpreter.run(KOCH_PROGRAM, 'closure', graphics='headless'), path)
+        report('koch svg streamed', timeit(streamed, repeat))
+        report('koch svg from display list', timeit(exported, repeat))
+        print('peak memory streamed', _peak(streamed) // 1024, 'KiB, from display list', _peak(exported) // 1024, 'KiB')
+        print('svg size', os.path.getsize(path) // 1024, 'KiB')
+
+"""
+Stella con molti segmenti lunghi e sottili e spirale con penna spessa, usate per misurare [[raster.py]].
+"""
+RASTER_PROGRAM = r"""
+    repeat 20000 [fd 400 rt 179.9]
+    pu home pd setpensize 4
+    make "r 1
+    repeat 5000 [fd :r rt 7 make "r :r + 0.05]
+"""
+
+#===raster===
+def raster(repeat=5):
+    """
+    Rasterizza in PNG `KOCH_PROGRAM` e `RASTER_PROGRAM` a 512x512 con [[raster.py]],
+    stampando i segmenti disegnati al secondo.
+    """
+    import interpreter
+    import raster
+
+    for name, program in (('koch', KOCH_PROGRAM), ('star', RASTER_PROGRAM)):
+        displayList = interpreter.run(program, 'closure', graphics='headless')
+        times = timeit(lambda: raster.encodePng(raster.render(displayList, width=512, height=512)), repeat)
+        report('raster ' + name, times)
+        print(name, len(displayList), 'segments,', int(len(displayList) / statistics.median(times)), 'segments/s')
+
+"""
+Disegno di circa 2000x2000 pixel con segmenti lunghi che attraversano molti tasselli e una spirale di segmenti corti.
+"""
+TILES_PROGRAM = r"""
+    repeat 2000 [fd 1000 rt 179.9]
+    pu home pd setpensize 3
+    make "r 1
+    repeat 20000 [fd :r rt 3 make "r :r + 0.0006]
+"""
+
+#===tiles===
+def tiles(repeat=3):
+    """
+    Disegna `TILES_PROGRAM` in tasselli con [[tiles.py]] per varie dimensioni dei tasselli e, per confronto,
+    in un unica immagine con [[raster.py]], stampando il tempo e la memoria di picco di ciascun metodo.
+    """
+    import interpreter
+    import raster
+    import tiles
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in (128, 256, 512):
+            draw = lambda: tiles.renderTiles(interpreter.run(TILES_PROGRAM, 'closure', graphics=tiles.TileBackend(directory, tileSize=size)),
+                                             os.path.join(directory, 'out'))
+            report('tiles ' + str(size), timeit(draw, repeat))
+            print('peak memory tiles', size, _peak(draw) // 1024, 'KiB')
+
+        whole = lambda: raster.encodePng(raster.render(interpreter.run(TILES_PROGRAM, 'closure', graphics='headless'),
+                                                       width=2048, height=2048, fit=False))
+        report('single image 2048', timeit(whole, repeat))
+        print('peak memory single image', _peak(whole) // 1024, 'KiB')
+
+"""
+Disegno con molti passi piccoli e allineati, movimenti a penna alzata e un `setpc` ad ogni passo, usato per [[drawing.py]].
+"""
+DRAWING_PROGRAM = r"""
+    to dashes :n
+        repeat :n [setpc [200 0 0] fd 1 fd 1 fd 1 pu fd 2 pd]
+    end
+    repeat 60 [(dashes 50) bk 250 rt 6]
+    repeat 3600 [fd 1 rt 0.1]
+"""
+
+#===drawing===
+def drawing(repeat=5):
+    """
+    Ottimizza la display list di `DRAWING_PROGRAM` con [[drawing.py]], esatta e con tolleranza di mezzo pixel,
+    stampando di quanto si riduce e il tempo di esportazione in SVG prima e dopo l'ottimizzazione.
+    """
+    import io
+    import interpreter
+    import drawing
+    from svg import writeSvg
+
+    displayList = interpreter.run(DRAWING_PROGRAM, 'closure', graphics='headless')
+    report('svg original', timeit(lambda: writeSvg(displayList, io.StringIO()), repeat))
+    for tolerance in (0, 0.5):
+        report('optimize tolerance ' + str(tolerance), timeit(lambda: drawing.optimizeDrawing(displayList, tolerance), repeat))
+        optimized = drawing.optimizeDrawing(displayList, tolerance)
+        print('display list', drawing.report())
+        report('svg optimized tolerance ' + str(tolerance), timeit(lambda: writeSvg(optimized, io.StringIO()), repeat))
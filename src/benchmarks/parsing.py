@@ -0,0 +1,126 @@
+from benchmarks.common import SOURCE, timeit, report
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+"""
+Benchmark della generazione della grammatica, del parsing e della memoria occupata dall'albero.
+"""
+
+#===startup===
+def startup(repeat=5):
+    """
+    Misura il tempo di `import parser` in un nuovo processo python:
+
+        - a freddo, con una cartella di cache vuota, quindi ANTLR genera la grammatica
+        - a caldo, con la cache gia' popolata dalla prima esecuzione
+    """
+    command = [sys.executable, '-c', 'import parser']
+
+    def _import(cacheDir):
+        subprocess.run(command, cwd=SOURCE, env=dict(os.environ, LOGO_CACHE_DIR=cacheDir), check=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cold = []
+        for i in range(repeat):
+            cacheDir = os.path.join(tmp, 'cold' + str(i))
+            cold += timeit(lambda: _import(cacheDir), 1)
+        report('startup cold (grammar generated)', cold)
+
+        warm = os.path.join(tmp, 'warm')
+        _import(warm)
+        report('startup warm (grammar from cache)', timeit(lambda: _import(warm), repeat))
+
+"""
+Programma Logo usato dai benchmark sul parsing.
+"""
+PARSE_PROGRAM = r"""
+    to line :count :length
+     ifelse :count = 1 [fd :length] [
+       make "count :count -1
+       (line :count :length)
+       lt 60 (line :count :length)
+       rt 120 (line :count :length)
+       lt 60 (line :count :length)
+      ]
+    end
+    to koch :count :length
+      rt 30 (line :count :length)
+      rt 120 (line :count :length)
+      rt 120 (line :count :length)
+    end
+    cs
+    setxy 0 0
+    (koch 5 5)
+"""
+
+#===parse===
+def parse(repeat=20):
+    """
+    Confronta il tempo di `parse` senza cache con quello di una parse che trova l'albero nella cache in memoria.
+    """
+    import parser
+
+    report('parse without cache', timeit(lambda: parser.parse(PARSE_PROGRAM, cache=False), repeat))
+    parser.parse(PARSE_PROGRAM)
+    report('parse with AST cache', timeit(lambda: parser.parse(PARSE_PROGRAM), repeat))
+    print('cache stats', parser.AST_CACHE.stats())
+
+#===allocated===
+def _allocated(function):
+    """
+    Esegue la funzione e restituisce il suo risultato insieme ai byte ancora allocati al termine,
+    cioe' la memoria occupata dal risultato.
+    """
+    tracemalloc.start()
+    try:
+        result = function()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+#===nodes===
+def _nodes(node):
+    """
+    Restituisce tutti i nodi dell'albero in preordine.
+    """
+    yield node
+    for child in node.children:
+        yield from _nodes(child)
+
+#===memory===
+def memory(copies=20, repeat=20):
+    """
+    Confronta l'albero prodotto da `parse`, composto dai nodi di [[logoAst.py]], con lo stesso albero
+    rappresentato tramite `Tree` di liblet e dizionari, ottenuto con `toTree`:
+
+        - memoria occupata, misurata con `tracemalloc`
+        - tempo di una visita completa che legge il tipo di ogni nodo
+    """
+    import parser
+    from logoAst import encode, decode, toTree
+
+    ast = parser.parse(PARSE_PROGRAM * copies, cache=False)
+    data = encode(ast)
+    nodes, slotsBytes = _allocated(lambda: decode(data))
+    tree, treeBytes = _allocated(lambda: toTree(ast))
+
+    def walkNodes(node):
+        node.TYPE
+        for child in node.children:
+            walkNodes(child)
+
+    def walkTree(tree):
+        tree.root['type']
+        for child in tree.children:
+            walkTree(child)
+
+    count = sum(1 for _ in _nodes(ast))
+    print('{} nodes'.format(count))
+    print('{:<40} {:9d} bytes   {:6.1f} bytes/node'.format('memory slots nodes', slotsBytes, slotsBytes / count))
+    print('{:<40} {:9d} bytes   {:6.1f} bytes/node'.format('memory liblet Tree', treeBytes, treeBytes / count))
+    report('walk slots nodes', timeit(lambda: walkNodes(nodes), repeat))
+    report('walk liblet Tree', timeit(lambda: walkTree(tree), repeat))
@@ -0,0 +1,136 @@
+from benchmarks.common import SOURCE, timeit, report, KOCH_PROGRAM
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+"""
+Benchmark dell'esecuzione in blocco, del server HTTP e delle sessioni asyncio.
+"""
+
+"""
+Programma eseguito in blocco dal benchmark `batch`, `{size}` viene sostituito con un valore diverso per ogni file.
+"""
+BATCH_PROGRAM = r"""
+    to polygon :sides :length
+        repeat :sides [fd :length rt 360 / :sides]
+    end
+    make "i 3
+    while :i < 12 [(polygon :i {size}) make "i :i + 1]
+    print :i
+"""
+
+#===batch===
+def batch(repeat=3, programs=200, separate=10):
+    """
+    Esegue `programs` file con [[batch.py]], con un pool di processi e nel solo processo principale,
+    e confronta i programmi al secondo con quelli ottenuti avviando un processo python per ognuno dei primi `separate` file.
+    Prima di ogni misurazione la cache degli alberi in memoria viene svuotata, cosi' che ogni programma venga analizzato.
+    """
+    import batch
+    import parser
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for index in range(programs):
+            with open(os.path.join(tmp, '%04d.logo' % index), 'w') as ouf:
+                ouf.write(BATCH_PROGRAM.replace('{size}', str(10 + index % 50)))
+        paths = batch.findPrograms([tmp])
+
+        for processes in (None, 0):
+            with open(os.devnull, 'w') as ouf:
+                times = timeit(lambda: parser.AST_CACHE.clear() or batch.runBatch(paths, ouf, processes), repeat)
+            label = 'batch pool' if processes is None else 'batch single process'
+            report(label, times)
+            print(label, '{:.1f} programs/s'.format(programs / statistics.median(times)))
+
+        command = 'import sys; from interpreter import run; run(open(sys.argv[1]).read(), graphics="headless")'
+        times = timeit(lambda: [subprocess.run([sys.executable, '-c', command, path], cwd=SOURCE, check=True, stdout=subprocess.DEVNULL)
+                                 for path in paths[:separate]], 1)
+        report('one process per file', times)
+        print('one process per file', '{:.1f} programs/s'.format(separate / times[0]))
+
+#===server===
+def server(repeat=200, clients=8):
+    """
+    Avvia [[server.py]] su una porta libera e misura la latenza di `repeat` richieste `BATCH_PROGRAM` inviate una alla volta,
+    con e senza il disegno SVG, poi le richieste al secondo con `clients` client contemporanei.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    import server
+
+    logo = server.LogoServer(port=0, workers=os.cpu_count()).start()
+    url = logo.url('/run')
+    try:
+        for drawing in (None, 'svg'):
+            times = timeit(lambda: server.request(url, BATCH_PROGRAM.replace('{size}', '20'), drawing=drawing), repeat)
+            report('server request' + (' (svg)' if drawing else ''), times)
+            times.sort()
+            print('server request p50 {:.4f}s p99 {:.4f}s'.format(times[len(times) // 2], times[int(len(times) * 0.99)]))
+
+        with ThreadPoolExecutor(clients) as pool:
+            start = time.perf_counter()
+            list(pool.map(lambda index: server.request(url, BATCH_PROGRAM.replace('{size}', str(index % 50))), range(repeat)))
+            print('server {} clients {:.1f} requests/s'.format(clients, repeat / (time.perf_counter() - start)))
+        print('server report', logo.report())
+    finally:
+        logo.close()
+
+"""
+Sessione interattiva eseguita dal benchmark `sessions`: attende una riga con `READWORD` e disegna un poligono.
+"""
+SESSION_PROGRAM = r"""
+    to polygon :sides :length
+        repeat :sides [fd :length rt 360 / :sides]
+    end
+    make "n rw
+    (polygon :n 20)
+    print :n
+"""
+
+#===sessions===
+def sessions(repeat=3, count=2000):
+    """
+    Avvia `count` sessioni di [[asyncRunner.py]] in un solo event loop, tutte in attesa di `READWORD`,
+    e misura la memoria allocata per sessione e il tempo per rispondere a tutte consumandone gli eventi.
+    Poi confronta `KOCH_PROGRAM` eseguito da **runAsync**, con e senza eventi, con il motore `stack` sincrono.
+    """
+    import asyncio
+    import asyncRunner
+    import interpreter
+
+    async def drain(events):
+        while (await events.get())[0] != 'end':
+            pass
+
+    async def interactive():
+        inputs = [asyncio.Queue() for _ in range(count)]
+        streams = [asyncio.Queue(maxsize=64) for _ in range(count)]
+        tracemalloc.start()
+        tasks = [asyncio.ensure_future(asyncRunner.runAsync(SESSION_PROGRAM, inputs[index].get, streams[index]))
+                 for index in range(count)]
+        await asyncio.sleep(0)
+        allocated = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        start = time.perf_counter()
+        for index, queue in enumerate(inputs):
+            queue.put_nowait(str(3 + index % 8))
+        await asyncio.gather(*tasks, *map(drain, streams))
+        return allocated, time.perf_counter() - start
+
+    asyncio.run(asyncRunner.runAsync(SESSION_PROGRAM, lambda: asyncio.sleep(0, '3'), asyncio.Queue()))
+    for _ in range(repeat):
+        allocated, seconds = asyncio.run(interactive())
+        print('sessions {} waiting {:.1f} KiB/session, answered in {:.4f}s'.format(count, allocated / count / 1024, seconds))
+
+    async def koch(events):
+        task = asyncRunner.runAsync(KOCH_PROGRAM, events=events)
+        if events is None:
+            return await task
+        return await asyncio.gather(task, drain(events))
+
+    report('sessions koch stack', timeit(lambda: interpreter.Interpreter('stack', graphics='headless').run(KOCH_PROGRAM), repeat))
+    report('sessions koch async', timeit(lambda: asyncio.run(koch(None)), repeat))
+    report('sessions koch async events', timeit(lambda: asyncio.run(koch(asyncio.Queue())), repeat))
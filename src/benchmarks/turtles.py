@@ -0,0 +1,141 @@
+from benchmarks.common import timeit, report, KOCH_PROGRAM
+
+"""
+Benchmark dei backend grafici che calcolano la tartaruga: display list, cicli vettorizzati, cache delle procedure,
+sciami e traiettorie.
+"""
+
+#===graphics===
+def graphics(repeat=5):
+    """
+    Esegue `KOCH_PROGRAM` con il backend `headless` di [[graphics.py]] e tutti i motori,
+    stampando anche il numero di elementi della display list.
+    """
+    import interpreter
+
+    for engine in interpreter.ENGINES:
+        report('koch headless ' + engine, timeit(lambda: interpreter.run(KOCH_PROGRAM, engine, graphics='headless'), repeat))
+    print('display list', len(interpreter.run(KOCH_PROGRAM, graphics='headless')), 'elements')
+
+"""
+Cicli di soli movimenti della tartaruga, trasformati in `TurtleRepeat` da [[optimizer.py]].
+"""
+SPIRAL_PROGRAM = r"""
+    repeat 36000 [fd 1 rt 0.01]
+    make "side 3
+    repeat 10000 [fd :side lt 91 fd :side / 2 rt 1]
+"""
+
+#===vectorized===
+def vectorized(repeat=5):
+    """
+    Esegue `SPIRAL_PROGRAM` con il backend `headless` e tutti i motori, con e senza ottimizzazione:
+    solo con l'ottimizzazione i cicli vengono calcolati in blocco da [[graphics.py#headless]].
+    """
+    import interpreter
+
+    for engine in interpreter.ENGINES:
+        for optimize in (False, True):
+            label = 'spiral ' + engine + (' (vectorized)' if optimize else '')
+            report(label, timeit(lambda: interpreter.run(SPIRAL_PROGRAM, engine, optimize=optimize, graphics='headless'), repeat))
+
+"""
+Mille tartarughe che disegnano la stessa figura: con `TELLALL` ogni comando muove tutte le tartarughe insieme,
+con `TELL :i` le tartarughe eseguono la figura una alla volta. Il secondo ciclo contiene un `MAKE`
+e non diventa un `TurtleRepeat`.
+"""
+SWARM_PROGRAMS = {
+    'together': r"""
+        crt 999 tellall
+        repeat 100 [fd 2 rt 3.6]
+        repeat 100 [fd 3 make "a 1 lt 2]
+    """,
+    'one by one': r"""
+        crt 999 make "i 0
+        repeat 1000 [
+            tell :i
+            repeat 100 [fd 2 rt 3.6]
+            repeat 100 [fd 3 make "a 1 lt 2]
+            make "i :i + 1
+        ]
+    """
+}
+
+#===swarm===
+def swarm(repeat=5):
+    """
+    Esegue `SWARM_PROGRAMS` con il backend `swarm` di [[swarm.py]] e tutti i motori.
+    """
+    import interpreter
+
+    for engine in interpreter.ENGINES:
+        for name, program in SWARM_PROGRAMS.items():
+            report('swarm ' + name + ' ' + engine, timeit(lambda: interpreter.run(program, engine, graphics='swarm'), repeat))
+
+"""
+Spirale di segmenti corti, stella di segmenti lunghi che si attraversano tutti e archi con la penna spessa.
+"""
+TRAJECTORY_PROGRAM = r"""
+    repeat 36000 [fd 1 rt 0.01]
+    pu home pd setpc [255 0 0]
+    repeat 1000 [fd 800 rt 179.9]
+    pu setxy -200 -200 pd setpensize 3
+    repeat 500 [arc 50 120 fd 2]
+"""
+
+#===trajectory===
+def trajectory(repeat=5):
+    """
+    Esegue `TRAJECTORY_PROGRAM` con il backend `headless` e con quello di [[trajectory.py]],
+    poi calcola le metriche del percorso con **report**.
+    """
+    import interpreter
+    import trajectory
+
+    for graphics in ('headless', 'trajectory'):
+        report('trajectory ' + graphics, timeit(lambda: interpreter.run(TRAJECTORY_PROGRAM, 'python', graphics=graphics), repeat))
+    path = interpreter.run(TRAJECTORY_PROGRAM, 'python', graphics='trajectory')
+    for name, metric in (('length', trajectory.pathLength), ('bounds', trajectory.bounds),
+                         ('coverage', trajectory.coverage), ('intersections', trajectory.intersections)):
+        report('trajectory ' + name, timeit(lambda: metric(path), repeat))
+    print(trajectory.report(path))
+
+"""
+Albero binario disegnato da una procedura ricorsiva, le cui chiamate si ripetono con gli stessi parametri.
+"""
+TREE_PROGRAM = r"""
+    to tree :length :depth
+        if :depth = 0 [stop]
+        fd :length lt 25
+        (tree :length * 0.75 :depth - 1)
+        rt 50
+        (tree :length * 0.75 :depth - 1)
+        lt 25 bk :length
+    end
+    repeat 8 [(tree 60 12) rt 45]
+"""
+
+#===procedures===
+def procedures(repeat=5):
+    """
+    Esegue `KOCH_PROGRAM` e `TREE_PROGRAM` con il backend `headless` e tutti i motori, con e senza la cache
+    dei disegni di [[procedureCache.py]], stampando la frazione di chiamate ridisegnate dalla cache.
+    """
+    import interpreter
+    import procedureCache
+
+    size = procedureCache.CACHE_SIZE
+    last = []
+    def execute(program, engine):
+        last[:] = [interpreter.Interpreter(engine, graphics='headless')]
+        last[0].run(program)
+    try:
+        for name, program in (('koch', KOCH_PROGRAM), ('tree', TREE_PROGRAM)):
+            for engine in interpreter.ENGINES:
+                for cached in (False, True):
+                    procedureCache.CACHE_SIZE = size if cached else 0
+                    label = name + ' ' + engine + (' (cached)' if cached else '')
+                    report(label, timeit(lambda: execute(program, engine), repeat))
+            print(name, 'cache', procedureCache.report(last[0].procedures))
+    finally:
+        procedureCache.CACHE_SIZE = size
@@ -0,0 +1,173 @@
+import math
+import time
+
+"""
+Limiti di esecuzione di un programma, per eseguire codice non fidato senza che un `while "true [...]`
+o una ricorsione infinita occupino un worker per sempre.
+
+Un **Budget** conta, per ogni esecuzione di un [[interpreter.py#interpreter]]:
+
+    - `steps`, i passi: le iterazioni di `REPEAT` e `WHILE` (un ciclo vettorizzato conta tutte le sue iterazioni)
+      e le chiamate di procedura, comprese quelle in coda e quelle ridisegnate dalla cache di [[procedureCache.py]]. Ogni programma che non termina passa da uno di questi punti,
+      e tra due passi il lavoro e' limitato dalla lunghezza del programma
+    - `depth`, la massima profondita' delle chiamate di procedura in esecuzione
+    - `seconds`, il tempo trascorso dall'inizio dell'esecuzione
+    - `segments`, i tratti disegnati, segmenti e archi, dai backend derivati da `headless`
+
+Ogni limite e' `None` se illimitato, superarlo solleva **BudgetExceeded**.
+I motori chiamano **step** e **call** nei cicli e nelle chiamate, il backend grafico **draw** per ogni tratto:
+nel caso comune costano un incremento e un confronto, l'orologio viene letto solo ogni `CHECK_STEPS` passi.
+"""
+
+"""
+Passi tra due letture dell'orologio per il limite di tempo.
+"""
+CHECK_STEPS = 1000
+
+"""
+Nomi delle risorse limitate, nell'ordine di **Budget.report**.
+"""
+RESOURCES = ('steps', 'depth', 'seconds', 'segments')
+
+#===budget exceeded===
+class BudgetExceeded(Exception):
+    """
+    Errore Logo sollevato quando un programma supera un limite del proprio **Budget**:
+    `resource` e' il nome della risorsa in `RESOURCES`, `limit` il limite e `used` il valore che lo ha superato.
+    """
+
+    MESSAGES = {
+        'steps':    "Superato il limite di {limit} passi",
+        'depth':    "Superata la profondità massima di {limit} chiamate",
+        'seconds':  "Superato il tempo massimo di {limit} secondi",
+        'segments': "Superato il limite di {limit} tratti disegnati"
+    }
+
+    def __init__(self, resource, limit, used):
+        Exception.__init__(self, BudgetExceeded.MESSAGES[resource].format(limit=limit))
+        self.resource = resource
+        self.limit = limit
+        self.used = used
+
+#===budget===
+class Budget:
+    """
+    Limiti e consumo delle risorse di un esecuzione, **start** azzera i contatori.
+    Una volta superato, un limite resta superato fino alla prossima esecuzione: anche se l'errore viene intercettato,
+    ad esempio da un ciclo vettorizzato che ripiega sull'esecuzione un comando alla volta, il passo successivo lo solleva di nuovo.
+    """
+
+    def __init__(self, steps=None, depth=None, seconds=None, segments=None):
+        self.limits = {'steps': steps, 'depth': depth, 'seconds': seconds, 'segments': segments}
+        # limiti usati da call e draw, infiniti se assenti
+        self.maxDepth = math.inf if depth is None else depth
+        self.maxSegments = math.inf if segments is None else segments
+        self.start()
+
+    def start(self, graphics=None):
+        """
+        Azzera i contatori e fa partire l'orologio. Se `graphics` conta i tratti, cioe' ha l'attributo `budget`,
+        gli vengono segnalati i tratti disegnati.
+        """
+        self.steps = 0
+        self.depth = 0
+        self.level = 0
+        self.segments = 0
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self.counting = graphics is not None and hasattr(graphics, 'budget')
+        if self.counting:
+            graphics.budget = self
+        seconds = self.limits['seconds']
+        self.deadline = None if seconds is None else self.started + seconds
+        self.checkpoint = self._checkpoint()
+
+    def _checkpoint(self):
+        """
+        Numero di passi a cui **step** deve chiamare **_check**.
+        """
+        checkpoint = math.inf if self.deadline is None else self.steps + CHECK_STEPS
+        if self.limits['steps'] is not None:
+            checkpoint = min(checkpoint, self.limits['steps'] + 1)
+        return checkpoint
+
+    def _check(self):
+        if self.limits['steps'] is not None and self.steps > self.limits['steps']:
+            raise BudgetExceeded('steps', self.limits['steps'], self.steps)
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise BudgetExceeded('seconds', self.limits['seconds'], time.perf_counter() - self.started)
+        self.checkpoint = self._checkpoint()
+
+    def step(self, count=1):
+        """
+        Conta `count` passi.
+        """
+        self.steps += count
+        if self.steps >= self.checkpoint:
+            self._check()
+
+    def call(self, depth):
+        """
+        Conta una chiamata di procedura che porta a `depth` le procedure in esecuzione.
+        """
+        if depth > self.depth:
+            self.depth = depth
+        if depth > self.maxDepth:
+            raise BudgetExceeded('depth', self.maxDepth, depth)
+        # come step, senza un altra chiamata
+        self.steps += 1
+        if self.steps >= self.checkpoint:
+            self._check()
+
+    def enter(self):
+        """
+        Come **call**, per i motori che non tengono uno stack delle chiamate: la profondita' e' contata dal budget
+        e ogni **enter** va seguito da **leave**.
+        """
+        depth = self.level + 1
+        if depth > self.depth:
+            self.depth = depth
+        if depth > self.maxDepth:
+            raise BudgetExceeded('depth', self.maxDepth, depth)
+        self.level = depth
+        self.steps += 1
+        if self.steps >= self.checkpoint:
+            self._check()
+
+    def leave(self):
+        self.level -= 1
+
+    def replay(self, depth, steps):
+        """
+        Conta una chiamata ridisegnata da [[procedureCache.py]] senza eseguirne il corpo, come **call**:
+        `depth` e' la profondita' massima raggiunta dal corpo e `steps` i passi che aveva consumato, chiamata compresa.
+        """
+        self.call(depth)
+        self.step(steps - 1)
+
+    def draw(self, count=1):
+        """
+        Conta `count` tratti disegnati, chiamata dal backend grafico prima di disegnarli.
+        """
+        self.segments += count
+        if self.segments > self.maxSegments:
+            raise BudgetExceeded('segments', self.maxSegments, self.segments)
+
+    def stop(self):
+        """
+        Ferma l'orologio al termine dell'esecuzione.
+        """
+        self.elapsed = time.perf_counter() - self.started
+
+    def report(self):
+        """
+        Restituisce per ogni risorsa il consumo `used` e il limite `limit` dell'ultima esecuzione.
+        `segments` vale `None` se il backend grafico non conta i tratti.
+        """
+        used = {
+            'steps': self.steps,
+            'depth': self.depth,
+            'seconds': time.perf_counter() - self.started if self.elapsed is None else self.elapsed,
+            'segments': self.segments if self.counting else None
+        }
+        return {resource: {'used': used[resource], 'limit': self.limits[resource]} for resource in RESOURCES}
@@ -0,0 +1,538 @@
+from logoAst import NodeWalker, Block
+from interpreter import DT_OPERATORS, DT_GRAPHICS, turtleMoves, repeatMoves, cachedCall, beginAsk, endAsk, readword, write, current
+from frames import resolve, topFrame, ProcedureReturn, LOCAL, GLOBAL, UNBOUND
+from tailcalls import TailCall, OUTPUT
+
+"""
+Motore di esecuzione alternativo a quello di [[interpreter.py]].
+L'albero viene visitato una sola volta e ogni nodo viene trasformato in una closure python
+in cui sono gia' legati gli operatori, i valori letterali e le closure dei figli.
+Eseguire il programma significa invocare la closure della radice, senza passare dalla dispatch table
+di `NodeWalker` per ogni nodo.
+La semantica osservabile e' la stessa di [[interpreter.py#run]].
+"""
+compiler = NodeWalker()
+
+#===numbers===
+def _isNumber(value):
+    return not isinstance(value, bool) and isinstance(value, (int, float))
+
+#===check numbers===
+def _checkNumbers(values):
+    """
+    Lancia un eccezione **TypeError** se uno dei valori non e' un numero.
+    """
+    if not all(_isNumber(ele) for ele in values):
+        raise TypeError("In un espressione gli operandi devono essere int o float")
+
+#===check boolean===
+def _checkBoolean(value):
+    if not isinstance(value, bool):
+        raise TypeError("Gli input dei connettivi logici devono essere dei boolean")
+    return value
+
+#===and===
+def _and(operands):
+    """
+    Short circuit evaluation, come `_and` definita in [[interpreter.py#and]].
+    """
+    def _and():
+        for operand in operands:
+            if not _checkBoolean(operand()):
+                return False
+        return True
+    return _and
+
+#===or===
+def _or(operands):
+    """
+    Short circuit evaluation, come `_or` definita in [[interpreter.py#or]].
+    """
+    def _or():
+        for operand in operands:
+            if _checkBoolean(operand()):
+                return True
+        return False
+    return _or
+
+#===not===
+def _not(operands):
+    operand = operands[0]
+    def _not():
+        return not _checkBoolean(operand())
+    return _not
+
+"""
+Dispatch table dei connettivi logici, ricevono le closure degli operandi perche' devono valutarle in modo pigro.
+"""
+DT_LOGIC = {
+    'and': _and,
+    'or':  _or,
+    'not': _not
+}
+
+#===constant===
+def _constant(value):
+    def constant():
+        return value
+    return constant
+
+#===sequence===
+def _sequence(children):
+    """
+    Restituisce una closure che esegue in ordine le closure dei figli.
+    """
+    def sequence():
+        for child in children:
+            child()
+    return sequence
+
+#===last value===
+def _lastValue(children):
+    """
+    Come **_sequence**, ma la closure restituisce il valore dell'ultimo figlio:
+    in coda al corpo di una procedura puo' essere una **TailCall**.
+    Una linea con una sola istruzione viene compilata direttamente nella closure dell'istruzione.
+    """
+    if len(children) == 1:
+        return children[0]
+    def lastValue():
+        result = None
+        for child in children:
+            result = child()
+        return result
+    return lastValue
+
+#===prog===
+@compiler.register
+def prog(compile, ast):
+    return _sequence([compile(child) for child in ast.children])
+
+#===line===
+@compiler.register
+def line(compile, ast):
+    return _lastValue([compile(child) for child in ast.children])
+
+#===operations===
+@compiler.register
+def operation(compile, ast):
+    """
+    Come `operation` definita in [[interpreter.py#operations]], ma l'operatore viene cercato in `DT_OPERATORS`
+    una sola volta durante la compilazione.
+    """
+    left = compile(ast.children[0])
+    right = compile(ast.children[1])
+    sign = ast.function or DT_OPERATORS[ast.op]
+
+    def operation():
+        x = left()
+        y = right()
+        if not (_isNumber(x) and _isNumber(y)):
+            raise TypeError("In un espressione gli operandi devono essere int o float")
+        return sign(x, y)
+    return operation
+
+#===sign===
+@compiler.register
+def sign(compile, ast):
+    """
+    Il segno dell'espressione viene convertito nel fattore moltiplicativo durante la compilazione.
+    """
+    value = compile(ast.children[0])
+    factor = ast.factor
+
+    def signedExpression():
+        return factor * value()
+    return signedExpression
+
+#===print===
+@compiler.register
+def pr(compile, ast):
+    children = [compile(child) for child in ast.children]
+    def pr():
+        for child in children:
+            write(child())
+    return pr
+
+#===arithmetic and boolean operations===
+@compiler.register
+def arithmBoolOperations(compile, ast):
+    """
+    I connettivi logici sono compilati tramite `DT_LOGIC`, le altre operazioni legano la funzione di `DT_OPERATORS`.
+    """
+    name = ast.name
+    params = [compile(child) for child in ast.children]
+
+    if name in DT_LOGIC:
+        return DT_LOGIC[name](params)
+
+    function = ast.function or DT_OPERATORS[name]
+    def arithmBoolOperation():
+        values = [param() for param in params]
+        _checkNumbers(values)
+        return function(values)
+    return arithmBoolOperation
+
+#===make===
+@compiler.register
+def make(compile, ast):
+    memory = compile.GLOBAL_MEMORY
+    values = memory.values
+    slot = ast.slot
+    name = compile(ast.children[0])
+    value = compile(ast.children[1])
+
+    def make():
+        key = name()
+        result = value()
+        if not isinstance(key, str):
+            raise ValueError("Il nome di una variabile deve essere una stringa")
+        if result == None:
+            raise TypeError("Non posso assegnare ad una variabile un valore nullo")
+        if slot is None:
+            memory[key] = result
+        else:
+            values[slot] = result
+    return make
+
+#===deref===
+@compiler.register
+def deref(compile, ast):
+    """
+    Come `deref` definita in [[interpreter.py#deref]].
+    Lo stack degli activation record e la memoria globale vengono legati alla closure durante la compilazione,
+    le variabili risolte da [[frames.py#resolve]] hanno una closure dedicata che legge direttamente lo slot.
+    """
+    records = compile.ACTIVATION_RECORDS
+    memory_global = compile.GLOBAL_MEMORY
+    values = memory_global.values
+    slot = ast.slot
+    name = compile(ast.children[0])
+
+    if ast.scope == LOCAL:
+        def localDeref():
+            return records[-1].slots[slot]
+        return localDeref
+
+    if ast.scope == GLOBAL:
+        def globalDeref():
+            res = values[slot]
+            if res is UNBOUND:
+                raise NameError("La variabile " + name() + " non è stata dichiarata")
+            return res
+        return globalDeref
+
+    def deref():
+        key = name()
+        memory_stack = records[-1]
+        if key in memory_stack.index:
+            res = memory_stack.slots[memory_stack.index[key]]
+        elif key in memory_global:
+            res = memory_global[key]
+        else:
+            raise NameError("La variabile " + key + " non è stata dichiarata")
+        return res
+    return deref
+
+#===graphic operations===
+@compiler.register
+def graphic(compile, ast):
+    """
+    Come `graphic` definita in [[interpreter.py#graphic]]:
+    i comandi senza parametri si comportano come `zeroPrarameterFunctions`.
+    """
+    if len(ast.children) == 0:
+        command = DT_GRAPHICS[ast.name]
+        def zeroParameterGraphic():
+            command()
+        return zeroParameterGraphic
+
+    function = DT_GRAPHICS[ast.name]
+    children = ast.children[0].children if isinstance(ast.children[0], Block) else ast.children
+    children = [compile(child) for child in children]
+
+    def moreParameterGraphic():
+        values = [child() for child in children]
+        if not all(isinstance(ele, (int, float)) for ele in values):
+            raise TypeError("In un espressione gli operandi devono essere int o float")
+        function(values)
+    return moreParameterGraphic
+
+#===check condition===
+def _condition(condition):
+    """
+    Restituisce una closure che valuta la condizione e controlla che sia un boolean.
+    """
+    def checkedCondition():
+        value = condition()
+        if not isinstance(value, bool):
+            raise TypeError("La condizione di un IF deve essere un boolean")
+        return value
+    return checkedCondition
+
+#===if===
+@compiler.register
+def ifState(compile, ast):
+    condition = _condition(compile(ast.children[0]))
+    then = compile(ast.children[1])
+
+    def ifState():
+        if condition():
+            return then()
+    return ifState
+
+#===if else===
+@compiler.register
+def ifelseState(compile, ast):
+    condition = _condition(compile(ast.children[0]))
+    then = compile(ast.children[1])
+    otherwise = compile(ast.children[2])
+
+    def ifelseState():
+        if condition():
+            return then()
+        return otherwise()
+    return ifelseState
+
+#===repeat===
+@compiler.register
+def repeatState(compile, ast):
+    times = compile(ast.children[0])
+    body = compile(ast.children[1])
+    step = compile.BUDGET.step
+
+    def repeatState():
+        value = times()
+        if not isinstance(value, int):
+            raise TypeError("REPEAT deve avere un int come parametro")
+        for _ in range(value):
+            step()
+            body()
+    return repeatState
+
+#===turtle repeat===
+@compiler.register
+def turtleRepeat(compile, ast):
+    """
+    Come `turtleRepeat` definita in [[interpreter.py#turtle repeat]].
+    """
+    times = compile(ast.children[0])
+    body = compile(ast.children[1])
+    params = [compile(child.children[0]) for child in ast.children[1].children]
+    names = ast.moves
+    step = compile.BUDGET.step
+
+    def turtleRepeat():
+        value = times()
+        if not isinstance(value, int):
+            raise TypeError("REPEAT deve avere un int come parametro")
+        moves = None
+        if value > 0:
+            try:
+                moves = turtleMoves(names, [param() for param in params])
+            except Exception:
+                moves = None
+        if moves is None:
+            for _ in range(value):
+                step()
+                body()
+        else:
+            repeatMoves(value, moves)
+    return turtleRepeat
+
+#===while===
+@compiler.register
+def whileState(compile, ast):
+    condition = compile(ast.children[0])
+    body = compile(ast.children[1])
+    step = compile.BUDGET.step
+
+    def whileState():
+        while condition():
+            step()
+            body()
+    return whileState
+
+#===ask===
+@compiler.register
+def askState(compile, ast):
+    """
+    Come `askState` definita in [[interpreter.py#ask]].
+    """
+    turtles, body = ast.children
+    children = turtles.children if isinstance(turtles, Block) else [turtles]
+    children = [compile(child) for child in children]
+    body = compile(body)
+
+    def askState():
+        previous = beginAsk([child() for child in children])
+        try:
+            body()
+        finally:
+            endAsk(previous)
+    return askState
+
+#===procedure declaration===
+@compiler.register
+def procedureDeclaration(compile, ast):
+    """
+    Il corpo della procedura viene compilato una sola volta, la dichiarazione a runtime
+    si limita a salvare i parametri, il `FramePool`, la closure del corpo e `cache` in `FUNCTIONS`.
+    """
+    functions = compile.FUNCTIONS
+    name = ast.name
+    params = ast.params
+    frames = ast.frames
+    cache = ast.cache
+    procedureExec = _lastValue([compile(child) for child in ast.children])
+
+    def procedureDeclaration():
+        functions[name] = (params, frames, procedureExec, cache)
+    return procedureDeclaration
+
+#===procedure invocation===
+@compiler.register
+def procedureInvocation(compile, ast):
+    """
+    Come `procedureInvocation` definita in [[interpreter.py#procedure invocation]]:
+    una chiamata in coda restituisce una **TailCall** e la procedura chiamata viene eseguita dal ciclo dell'invocazione in corso.
+    Le procedure con `cache` vengono eseguite tramite [[interpreter.py#cached call]], con il corpo come chiave.
+    """
+    functions = compile.FUNCTIONS
+    records = compile.ACTIVATION_RECORDS
+    call = compile.BUDGET.call
+    name = ast.name
+    children = [compile(child) for child in ast.children]
+
+    def lookup():
+        if name in functions:
+            function = functions[name]
+        else:
+            raise NameError("La funzione non è stata dichiarata")
+
+        paramsValue = [child() for child in children]
+        if len(function[0]) != len(paramsValue):
+            raise TypeError("Numero di parametri per la funzione `" +  name + "` non corretto")
+        return function, paramsValue
+
+    if ast.tail is not None:
+        keep = ast.tail == OUTPUT
+        def tailInvocation():
+            function, paramsValue = lookup()
+            return TailCall(function, paramsValue, keep)
+        return tailInvocation
+
+    def invoke(frames, body, paramsValue):
+        keep = True
+        while True:
+            call(len(records))
+            frame = frames.acquire(paramsValue)
+            records.append(frame)
+            try:
+                result = body()
+                if result.__class__ is not TailCall:
+                    result = None
+            except ProcedureReturn as signal:
+                result = signal.value
+
+            records.pop()
+            frames.release(frame)
+            if result.__class__ is not TailCall:
+                return result if keep else None
+            (_, frames, body, _), paramsValue = result.function, result.values
+            keep = keep and result.keep
+
+    def procedureInvocation():
+        (_, frames, body, cache), paramsValue = lookup()
+        if cache:
+            return cachedCall(body, paramsValue, lambda: invoke(frames, body, paramsValue), len(records))
+        return invoke(frames, body, paramsValue)
+    return procedureInvocation
+
+#===output===
+@compiler.register
+def opState(compile, ast):
+    records = compile.ACTIVATION_RECORDS
+    value = compile(ast.children[0])
+
+    def opState():
+        if len(records) == 1:
+            raise SyntaxError("Non si può avere un output state al di fuori di una funzione")
+        result = value()
+        if result.__class__ is TailCall:
+            return result
+        raise ProcedureReturn(result)
+    return opState
+
+#===stop===
+@compiler.register
+def stopState(compile, ast):
+    records = compile.ACTIVATION_RECORDS
+
+    def stopState():
+        if len(records) == 1:
+            raise SyntaxError("Non si può avere uno stop state al di fuori di una funzione")
+        raise ProcedureReturn()
+    return stopState
+
+#===block===
+@compiler.register
+def block(compile, ast):
+    """
+    Restituisce l'ultimo valore diverso da `None` prodotto dai figli, come `block` definita in [[interpreter.py#block]].
+    """
+    children = [compile(child) for child in ast.children]
+
+    def block():
+        result = None
+        for child in children:
+            value = child()
+            if value != None:
+                result = value
+        return result
+    return block
+
+#===read word===
+@compiler.register
+def rw(compile, ast):
+    def rw():
+        return readword()
+    return rw
+
+@compiler.register
+def Boolean_(compile, ast):
+    return _constant(ast.value)
+
+@compiler.register
+def STRINGLITERAL(compile, ast):
+    return _constant(str(ast.value))
+
+@compiler.register
+def STRING(compile, ast):
+    return _constant(str(ast.value.replace('"', '')))
+
+@compiler.register
+def number(compile, ast):
+    if '.' in ast.value:
+        return _constant(float(ast.value))
+    return _constant(int(ast.value))
+
+@compiler.register
+def constant(compile, ast):
+    return _constant(ast.value)
+
+#===compile program===
+def compileProgram(ast):
+    """
+    Risolve le variabili tramite [[frames.py#resolve]], inizializza un nuovo spazio di memoria per i nomi di funzioni,
+    uno stack vuoto e la memoria globale, poi compila l'albero e restituisce la closure che esegue il programma.
+    Lo stato, compreso il budget dell'interprete corrente, viene salvato in un walker creato per la compilazione,
+    a cui le closure restano legate.
+    """
+    ast, memory = resolve(ast)
+    walker = compiler.fork()
+    walker.FUNCTIONS = {}
+    walker.ACTIVATION_RECORDS = [topFrame()]
+    walker.GLOBAL_MEMORY = memory
+    walker.BUDGET = current().budget
+    return walker(ast)
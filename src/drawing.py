@@ -0,0 +1,224 @@
+from graphics import Segment
+import math
+import sys
+import threading
+
+"""
+Ottimizzazione della display list prodotta dal backend `headless` di [[graphics.py]], da eseguire prima di passarla
+a un esportatore ([[svg.py]], [[raster.py]]) o di ridisegnarla su un altro backend con **replay**.
+**writeSvg** di [[svg.py]] e **render** di [[raster.py]] la applicano se ricevono `tolerance`, come il server
+di [[server.py]] per le richieste che la indicano.
+Restituisce una nuova display list, quella ricevuta non viene modificata:
+
+    - i tratti che non lasciano traccia vengono eliminati: segmenti di lunghezza zero, archi con raggio o ampiezza zero
+      e segmenti contenuti nel segmento disegnato subito prima con la stessa penna, come in `fd 10 bk 10`
+    - i segmenti consecutivi con la stessa penna che proseguono nella stessa direzione vengono uniti in un solo segmento
+    - con `tolerance` maggiore di zero le spezzate formate da segmenti consecutivi con la stessa penna vengono semplificate
+      con l'algoritmo di Ramer-Douglas-Peucker, spostando ogni punto di al piu' `tolerance`
+
+I movimenti con la penna alzata non compaiono nella display list, mentre i cambi di penna sono attributi dei tratti:
+**replay** li trasforma di nuovo in comandi, inviando al backend solo quelli che cambiano effettivamente lo stato.
+"""
+
+"""
+Tolleranza relativa con cui due segmenti sono considerati allineati.
+"""
+COLLINEAR = 1e-9
+
+#===invisible===
+def _invisible(shape):
+    if isinstance(shape, Segment):
+        return shape.x1 == shape.x2 and shape.y1 == shape.y2
+    return shape.radius == 0 or shape.extent == 0
+
+#===covers===
+def _covers(last, shape):
+    """
+    Vero se il segmento `shape` e' contenuto nel segmento `last`.
+    """
+    ax, ay = last.x2 - last.x1, last.y2 - last.y1
+    length = ax * ax + ay * ay
+    for px, py in ((shape.x1 - last.x1, shape.y1 - last.y1), (shape.x2 - last.x1, shape.y2 - last.y1)):
+        if abs(ax * py - ay * px) > COLLINEAR * length or not 0 <= ax * px + ay * py <= length:
+            return False
+    return True
+
+#===continues===
+def _continues(last, shape):
+    """
+    Vero se `shape`, che inizia dove termina `last`, prosegue nella stessa direzione.
+    """
+    ax, ay = last.x2 - last.x1, last.y2 - last.y1
+    bx, by = shape.x2 - shape.x1, shape.y2 - shape.y1
+    if abs(ax * by - ay * bx) > COLLINEAR * math.hypot(ax, ay) * math.hypot(bx, by):
+        return False
+    return ax * bx + ay * by > 0
+
+#===merge===
+def _merge(displayList, stats):
+    """
+    Elimina i tratti invisibili e unisce i segmenti allineati.
+    """
+    result = []
+    last = None
+    for shape in displayList:
+        if _invisible(shape):
+            stats['invisible'] += 1
+            continue
+        if isinstance(shape, Segment) and last is not None and (last.color, last.width) == (shape.color, shape.width):
+            if (last.x2, last.y2) == (shape.x1, shape.y1) and _continues(last, shape):
+                last = result[-1] = Segment(last.x1, last.y1, shape.x2, shape.y2, last.color, last.width)
+                stats['merged'] += 1
+                continue
+            if _covers(last, shape):
+                stats['invisible'] += 1
+                continue
+        result.append(shape)
+        last = shape if isinstance(shape, Segment) else None
+    return result
+
+#===douglas peucker===
+def _distance(px, py, x1, y1, x2, y2):
+    """
+    Distanza del punto `(px, py)` dal segmento da `(x1, y1)` a `(x2, y2)`.
+    """
+    dx, dy = x2 - x1, y2 - y1
+    length = dx * dx + dy * dy
+    t = 0 if length == 0 else max(0, min(1, ((px - x1) * dx + (py - y1) * dy) / length))
+    return math.hypot(px - (x1 + t * dx), py - (y1 + t * dy))
+
+def _douglasPeucker(points, tolerance):
+    """
+    Restituisce gli indici dei punti della spezzata da conservare, con una pila invece della ricorsione.
+    """
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        x1, y1 = points[first]
+        x2, y2 = points[last]
+        farthest, index = -1, None
+        for i in range(first + 1, last):
+            distance = _distance(points[i][0], points[i][1], x1, y1, x2, y2)
+            if distance > farthest:
+                farthest, index = distance, i
+        if index is not None and farthest > tolerance:
+            keep[index] = True
+            stack += [(first, index), (index, last)]
+    return [i for i, kept in enumerate(keep) if kept]
+
+#===simplify===
+def _simplify(displayList, tolerance, stats):
+    """
+    Semplifica le spezzate di segmenti consecutivi con la stessa penna.
+    """
+    result = []
+    run = []
+
+    def flush():
+        if len(run) > 1:
+            points = [(run[0].x1, run[0].y1)] + [(segment.x2, segment.y2) for segment in run]
+            kept = _douglasPeucker(points, tolerance)
+            color, width = run[0].color, run[0].width
+            for start, end in zip(kept, kept[1:]):
+                result.append(Segment(points[start][0], points[start][1], points[end][0], points[end][1], color, width))
+            stats['simplified'] += len(run) - (len(kept) - 1)
+        else:
+            result.extend(run)
+        run.clear()
+
+    for shape in displayList:
+        if run and not (isinstance(shape, Segment) and (run[-1].color, run[-1].width) == (shape.color, shape.width)
+                        and (run[-1].x2, run[-1].y2) == (shape.x1, shape.y1)):
+            flush()
+        if isinstance(shape, Segment):
+            run.append(shape)
+        else:
+            result.append(shape)
+    flush()
+    return result
+
+"""
+I contatori sono una variabile del modulo, quindi un solo thread alla volta puo' ottimizzare una display list.
+"""
+LOCK = threading.Lock()
+
+#===optimize drawing===
+def optimizeDrawing(displayList, tolerance=0):
+    """
+    Restituisce la display list ottimizzata, i contatori dell'ultima ottimizzazione sono disponibili tramite **report**.
+    """
+    global STATS
+    with LOCK:
+        STATS = {'before': len(displayList), 'after': 0, 'invisible': 0, 'merged': 0, 'simplified': 0}
+        result = _merge(displayList, STATS)
+        if tolerance > 0:
+            result = _simplify(result, tolerance, STATS)
+        STATS['after'] = len(result)
+        return result
+
+STATS = {'before': 0, 'after': 0, 'invisible': 0, 'merged': 0, 'simplified': 0}
+
+#===report===
+def report():
+    """
+    Restituisce il numero di elementi prima e dopo l'ultima ottimizzazione, quanti tratti invisibili sono stati eliminati,
+    quanti segmenti sono stati uniti al precedente e quanti sono stati eliminati dalla semplificazione.
+    """
+    with LOCK:
+        return dict(STATS)
+
+#===replay===
+def replay(displayList, backend):
+    """
+    Ridisegna la display list sul backend con i comandi della tartaruga.
+    La penna viene alzata solo se un tratto non inizia dove termina il precedente,
+    il colore e lo spessore vengono impostati solo quando cambiano.
+    """
+    x, y = 0.0, 0.0
+    color, width = None, None
+    down = True
+    for shape in displayList:
+        if shape.color != color:
+            backend.pencolor(*shape.color)
+            color = shape.color
+        if shape.width != width:
+            backend.pensize(shape.width)
+            width = shape.width
+
+        if isinstance(shape, Segment):
+            start, end = (shape.x1, shape.y1), (shape.x2, shape.y2)
+        else:
+            angle = math.radians(shape.start)
+            start = (shape.x + shape.radius * math.cos(angle), shape.y + shape.radius * math.sin(angle))
+            end = None
+
+        if start != (x, y):
+            if down:
+                backend.penup()
+                down = False
+            backend.setpos(*start)
+        if not down:
+            backend.pendown()
+            down = True
+
+        if end is not None:
+            backend.setpos(*end)
+            x, y = end
+        else:
+            # con raggio negativo il centro e' a destra della tartaruga e l'arco viene percorso in senso orario
+            if shape.extent >= 0:
+                backend.setheading(shape.start + 90)
+                backend.circle(shape.radius, shape.extent)
+            else:
+                backend.setheading(shape.start - 90)
+                backend.circle(-shape.radius, -shape.extent)
+            angle = math.radians(shape.start + shape.extent)
+            x, y = shape.x + shape.radius * math.cos(angle), shape.y + shape.radius * math.sin(angle)
+
+if __name__ == '__main__':
+    from interpreter import run
+    with open(sys.argv[1]) as inf:
+        optimizeDrawing(run(inf.read(), graphics='headless'), float(sys.argv[2]) if len(sys.argv) > 2 else 0)
+    print(report())
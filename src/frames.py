@@ -0,0 +1,183 @@
+from logoAst import NodeWalker, Word, StringLiteral
+from tailcalls import tailCalls
+
+"""
+Variabili risolte in slot per i motori `tree` e `closure`.
+Prima dell'esecuzione **resolve** assegna ad ogni parametro di procedura l'indice che occupa nel frame della procedura
+e ad ogni variabile globale con nome costante uno slot fisso nella memoria globale.
+A runtime un frame e' una lista di dimensione fissa e la memoria globale una lista di valori,
+quindi leggere una variabile risolta e' un accesso per indice.
+
+Le variabili il cui nome viene calcolato a runtime continuano a essere cercate per nome, con la stessa regola di sempre:
+prima tra i parametri della procedura in esecuzione e poi nella memoria globale.
+
+Inoltre **resolve** segna le chiamate di procedura in posizione di coda, trovate da [[tailcalls.py#tail calls]].
+"""
+
+"""
+Valori di `scope` assegnati ai nodi `Deref` risolti.
+"""
+LOCAL = 'local'
+GLOBAL = 'global'
+
+"""
+Valore degli slot della memoria globale a cui non e' ancora stato assegnato nulla.
+"""
+UNBOUND = object()
+
+class ProcedureReturn(Exception):
+    """
+    Sollevata da `OUTPUT` e `STOP` per terminare la procedura in esecuzione, viene catturata dall'invocazione della procedura.
+    `value` e' il valore di `OUTPUT`, `None` per `STOP`.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value=None):
+        self.value = value
+
+class Frame:
+    """
+    Activation record di una procedura.
+    `slots` contiene i valori dei parametri, `index` associa ad ogni nome di parametro il suo slot.
+    """
+    __slots__ = ('index', 'slots')
+
+    def __init__(self, index, slots):
+        self.index = index
+        self.slots = slots
+
+class FramePool:
+    """
+    Frame di una procedura: quelli liberati al termine di un invocazione vengono riutilizzati dalle successive.
+    """
+    __slots__ = ('index', 'free')
+
+    def __init__(self, params):
+        # se un parametro e' ripetuto vale l'ultimo, come con dict(zip(params, values))
+        self.index = {param: slot for slot, param in enumerate(params)}
+        self.free = []
+
+    def acquire(self, values):
+        if self.free:
+            frame = self.free.pop()
+            frame.slots[:] = values
+            return frame
+        return Frame(self.index, values)
+
+    def release(self, frame):
+        self.free.append(frame)
+
+class Memory:
+    """
+    Memoria globale.
+    I nomi risolti da **resolve** hanno uno slot fisso, gli altri ricevono uno slot la prima volta che vengono assegnati.
+    """
+    __slots__ = ('index', 'values')
+
+    def __init__(self, index=None):
+        self.index = dict(index or {})
+        self.values = [UNBOUND] * len(self.index)
+
+    def slot(self, name):
+        """
+        Restituisce lo slot del nome, creandolo se non esiste.
+        """
+        slot = self.index.get(name)
+        if slot is None:
+            slot = self.index[name] = len(self.values)
+            self.values.append(UNBOUND)
+        return slot
+
+    def __contains__(self, name):
+        slot = self.index.get(name)
+        return slot is not None and self.values[slot] is not UNBOUND
+
+    def __getitem__(self, name):
+        return self.values[self.index[name]]
+
+    def __setitem__(self, name, value):
+        self.values[self.slot(name)] = value
+
+#===resolve===
+def _copy(visit, ast):
+    return ast.replace([visit(child) for child in ast.children])
+
+resolver = NodeWalker(_copy)
+
+#===static name===
+def _staticName(ast):
+    """
+    Restituisce il nome della variabile se e' costante, altrimenti `None`.
+    """
+    if isinstance(ast, (Word, StringLiteral)):
+        return ast.value.replace('"', '')
+    return None
+
+#===global slot===
+def _globalSlot(visit, name):
+    names = visit.GLOBALS
+    if name not in names:
+        names[name] = len(names)
+    return names[name]
+
+@resolver.register
+def procedureDeclaration(visit, ast):
+    """
+    I nomi usati nel corpo vengono risolti rispetto ai parametri della procedura
+    e alle chiamate in coda del corpo viene assegnato `tail`.
+    """
+    node = ast.replace([])
+    node.frames = FramePool(ast.params)
+
+    outer = visit.PARAMS
+    visit.PARAMS = node.frames.index
+    try:
+        node.children = tuple(visit(child) for child in ast.children)
+    finally:
+        visit.PARAMS = outer
+
+    for call, kind in tailCalls(node):
+        call.tail = kind
+    return node
+
+@resolver.register
+def deref(visit, ast):
+    """
+    Un parametro della procedura che contiene il nodo e' sempre nel frame in cima allo stack,
+    perche' il corpo di una procedura viene eseguito solo nel proprio frame.
+    """
+    node = _copy(visit, ast)
+    name = _staticName(node.children[0])
+    if name is None:
+        return node
+    if name in visit.PARAMS:
+        node.scope, node.slot = LOCAL, visit.PARAMS[name]
+    else:
+        node.scope, node.slot = GLOBAL, _globalSlot(visit, name)
+    return node
+
+@resolver.register
+def make(visit, ast):
+    node = _copy(visit, ast)
+    name = _staticName(node.children[0])
+    if name is not None:
+        node.slot = _globalSlot(visit, name)
+    return node
+
+def resolve(ast):
+    """
+    Restituisce una copia dell'albero con le variabili risolte e la memoria globale in cui eseguirlo.
+    L'albero ricevuto non viene modificato e i nomi vengono raccolti in un walker creato per la singola visita,
+    quindi lo stesso albero puo' essere risolto da piu' thread insieme.
+    """
+    walker = resolver.fork()
+    walker.PARAMS = {}
+    walker.GLOBALS = {}
+    ast = walker(ast)
+    return ast, Memory(walker.GLOBALS)
+
+def topFrame():
+    """
+    Frame del codice al di fuori delle procedure, non contiene parametri.
+    """
+    return Frame({}, [])
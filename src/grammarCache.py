@@ -0,0 +1,117 @@
+from liblet import ANTLR
+from importlib import util as imputil
+from importlib import metadata
+import hashlib
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+"""
+Cache persistente su disco del lexer e del parser generati da ANTLR.
+
+La generazione della grammatica richiede l'esecuzione di ANTLR (java) e la compilazione dei moduli generati,
+per questo motivo i sorgenti prodotti vengono salvati in una cartella il cui nome dipende da un hash
+della grammatica e delle versioni di liblet e di ANTLR, cosi' che un cambiamento di una di esse
+provochi automaticamente la rigenerazione.
+"""
+CACHE_DIR = os.environ.get('LOGO_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'logo-interpreter'))
+
+"""
+L'ordine dei suffissi e' importante, i moduli vanno caricati nello stesso ordine usato da liblet.
+"""
+SUFFIXES = ('Lexer', 'Parser', 'Visitor', 'Listener')
+
+#===versions===
+def _version(package):
+    """
+    Restituisce la versione installata del pacchetto, oppure `unknown` se non e' possibile determinarla.
+    """
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return 'unknown'
+
+#===grammar hash===
+def grammarHash(grammar):
+    """
+    Calcola la chiave della cache a partire dal testo della grammatica,
+    dalla versione di liblet, del runtime di ANTLR e dal jar usato per generare il codice.
+    """
+    key = hashlib.sha256()
+    for part in (grammar, _version('liblet'), _version('antlr4-python3-runtime'), os.path.basename(os.environ.get('ANTLR4_JAR', ''))):
+        key.update(part.encode('utf-8'))
+        key.update(b'\0')
+    return key.hexdigest()
+
+#===load modules===
+def _loadModules(grammar, name, path):
+    """
+    Carica i moduli generati presenti nella cartella `path` e costruisce un oggetto `ANTLR` senza rieseguire ANTLR.
+    I moduli vengono caricati dai file, in questo modo python puo' riutilizzare il bytecode salvato in `__pycache__`.
+    """
+    # rispecchia il costruttore di `ANTLR` di liblet 1.13.2: stessi attributi e moduli caricati nello stesso ordine,
+    # se il costruttore cambia in un altra versione di liblet questa funzione va aggiornata
+    antlr = ANTLR.__new__(ANTLR)
+    antlr.grammar = grammar
+    antlr.name = name
+    antlr.source = {}
+
+    for suffix in SUFFIXES:
+        qn = name + suffix
+        if qn in sys.modules:
+            del sys.modules[qn]
+        src_path = os.path.join(path, qn + '.py')
+        with open(src_path) as inf:
+            antlr.source[suffix] = inf.read()
+        spec = imputil.spec_from_file_location(qn, src_path)
+        module = imputil.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules[qn] = module
+        setattr(antlr, suffix, getattr(module, qn))
+
+    return antlr
+
+#===store modules===
+def _storeModules(antlr, path):
+    """
+    Salva i sorgenti generati da ANTLR nella cartella `path`.
+    I file vengono scritti in una cartella temporanea che viene poi rinominata, cosi' che processi concorrenti
+    non possano mai leggere una cache scritta a meta'.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(path))
+    try:
+        for suffix in SUFFIXES:
+            with open(os.path.join(tmp, antlr.name + suffix + '.py'), 'w') as ouf:
+                ouf.write(antlr.source[suffix])
+        os.replace(tmp, path)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+#===load grammar===
+def loadGrammar(grammar, cacheDir=None):
+    """
+    Restituisce l'oggetto `ANTLR` corrispondente alla grammatica.
+    Se la grammatica e' gia' presente nella cache i moduli vengono caricati dal disco,
+    altrimenti viene eseguito ANTLR e il codice generato viene salvato nella cache.
+    Se la cartella della cache non e' utilizzabile la grammatica viene semplicemente generata ogni volta.
+    """
+    cacheDir = CACHE_DIR if cacheDir is None else cacheDir
+    name = re.findall(r'grammar\s+(\w+)\s*;', grammar)[0]
+    path = os.path.join(cacheDir, 'grammar-' + grammarHash(grammar))
+
+    if os.path.isdir(path):
+        try:
+            return _loadModules(grammar, name, path)
+        except (OSError, SyntaxError, AttributeError):
+            shutil.rmtree(path, ignore_errors=True)
+
+    antlr = ANTLR(grammar)
+    if len(antlr.source) == len(SUFFIXES):
+        try:
+            _storeModules(antlr, path)
+        except OSError:
+            pass
+    return antlr
@@ -0,0 +1,631 @@
+import math
+import os
+import time
+
+"""
+Backend grafici usati da `DT_GRAPHICS` in [[interpreter.py]].
+Un backend espone i comandi della tartaruga con gli stessi nomi e parametri delle funzioni di **turtle**:
+
+    - `forward`, `back`, `right`, `left`, `setheading`
+    - `setpos`, `setx`, `sety`, `home`, `circle`
+    - `penup`, `pendown`, `pencolor`, `pensize`
+    - `clear`, `hideturtle`, `showturtle`
+    - `speed`, `refresh`, che controllano l'aggiornamento della finestra e vengono ignorati dai backend senza finestra
+    - `createTurtles`, `tell`, `tellAll`, `addressed`, che gestiscono piu' tartarughe e sono supportati solo dal backend `swarm`
+
+e il metodo `close`, chiamato al termine di [[interpreter.py#run]], che restituisce il risultato del disegno.
+I backend che calcolano la tartaruga possono inoltre registrare e ridisegnare i **Fragment** usati da [[procedureCache.py]].
+
+    - `screen` disegna con **turtle** su una finestra Tk, il modulo viene importato al primo comando grafico
+    - `batched` disegna come `screen` senza animare i comandi, aggiornando la finestra a blocchi
+    - `headless` calcola lo stato della tartaruga in python e salva i tratti disegnati in una display list,
+      senza importare **turtle** ne' **tkinter**
+    - `swarm` calcola come `headless` lo stato di molte tartarughe, con un solo comando **numpy** per tutte
+      le tartarughe a cui vengono inviati i comandi, vedi [[swarm.py]]
+    - `trajectory` calcola come `headless` la tartaruga e restituisce il suo percorso come array **numpy**, vedi [[trajectory.py]]
+"""
+
+#===shape===
+class Shape:
+    """
+    Elemento della display list, i campi sono elencati in `FIELDS`.
+    """
+    __slots__ = ()
+    FIELDS = ()
+
+    def __init__(self, *values):
+        for field, value in zip(self.FIELDS, values):
+            setattr(self, field, value)
+
+    def fields(self):
+        return tuple(getattr(self, field) for field in self.FIELDS)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.fields() == other.fields()
+
+    def __repr__(self):
+        return type(self).__name__ + '(' + ', '.join(field + '=' + repr(getattr(self, field)) for field in self.FIELDS) + ')'
+
+class Segment(Shape):
+    """
+    Segmento da `(x1, y1)` a `(x2, y2)`.
+    Il costruttore assegna i campi direttamente perche' i segmenti sono di gran lunga gli elementi piu' numerosi.
+    """
+    __slots__ = ('x1', 'y1', 'x2', 'y2', 'color', 'width')
+    FIELDS = __slots__
+
+    def __init__(self, x1, y1, x2, y2, color, width):
+        self.x1, self.y1, self.x2, self.y2 = x1, y1, x2, y2
+        self.color, self.width = color, width
+
+class Arc(Shape):
+    """
+    Arco della circonferenza di centro `(x, y)` e raggio `radius`, che parte dall'angolo `start`
+    e si estende per `extent` gradi, in senso antiorario se positivo.
+    """
+    __slots__ = ('x', 'y', 'radius', 'start', 'extent', 'color', 'width')
+    FIELDS = __slots__
+
+#===fragment===
+class Fragment:
+    """
+    Tratti disegnati da una chiamata di procedura, nel sistema di riferimento della tartaruga all'inizio della chiamata:
+    l'origine e' la posizione iniziale e l'asse x la direzione iniziale.
+    `runs` contiene i gruppi di tratti consecutivi con la stessa penna, come `(colore, spessore, segmenti, archi)`:
+    i segmenti sono quattro liste `x1, y1, x2, y2`, gli archi una lista di `(x, y, radius, start, extent)`
+    e un gruppo contiene solo segmenti oppure solo archi.
+    `x`, `y` e `turn` sono la posizione finale e la rotazione della tartaruga, `down`, `color` e `width` lo stato finale della penna,
+    `strokes` il numero di tratti, `steps` e `depth` i passi e la profondita' oltre la chiamata consumati dal corpo,
+    assegnati da [[procedureCache.py]] per contarli nel [[budget.py#budget]] quando il frammento viene ridisegnato.
+    """
+    __slots__ = ('runs', 'x', 'y', 'turn', 'down', 'color', 'width', 'strokes', 'steps', 'depth')
+
+    def __init__(self, runs, x, y, turn, down, color, width, strokes):
+        self.runs = runs
+        self.x, self.y, self.turn = x, y, turn
+        self.down, self.color, self.width = down, color, width
+        self.strokes = strokes
+        self.steps, self.depth = 1, 0
+
+#===backend===
+class Backend:
+    """
+    Interfaccia dei backend grafici, ogni comando non implementato solleva **NotImplementedError**.
+    `speed` e `refresh` riguardano solo la finestra, per default vengono ignorati.
+    `repeatMoves` esegue in blocco i cicli di soli movimenti di [[interpreter.py#turtle repeat]].
+    `penState` restituisce `None` se il backend non sa registrare e ridisegnare i **Fragment**, come la finestra di **turtle**.
+    """
+
+    def _missing(self, *params):
+        raise NotImplementedError("Comando grafico non supportato da " + type(self).__name__)
+
+    forward = back = right = left = setheading = _missing
+    setpos = setx = sety = home = circle = _missing
+    penup = pendown = pencolor = pensize = _missing
+    clear = hideturtle = showturtle = _missing
+    createTurtles = tell = tellAll = addressed = _missing
+
+    def speed(self, value):
+        pass
+
+    def refresh(self):
+        pass
+
+    def repeatMoves(self, times, moves):
+        """
+        Esegue `times` volte i movimenti `moves`, coppie `(metodo, parametro)` con metodo `forward`, `back`, `right` o `left`.
+        Per default i comandi vengono eseguiti uno alla volta.
+        """
+        commands = [(getattr(self, name), value) for name, value in moves]
+        for _ in range(times):
+            for command, value in commands:
+                command(value)
+
+    def penState(self):
+        return None
+
+    def close(self):
+        return None
+
+#===screen===
+"""
+Valori di default del refresh a blocchi di **ScreenBackend**: la finestra viene aggiornata
+ogni `REFRESH_COMMANDS` comandi oppure quando sono passati `REFRESH_INTERVAL` millisecondi dall'ultimo aggiornamento.
+"""
+REFRESH_COMMANDS = 500
+REFRESH_INTERVAL = 40
+
+class ScreenBackend(Backend):
+    """
+    Disegna sullo schermo con **turtle**, che viene importato solo al primo comando grafico.
+    Con `speed` tra 1 e 10 ogni comando viene animato con la velocita' di **turtle**, con `speed` 0 l'animazione
+    e' disattivata e la finestra viene aggiornata a blocchi, ogni `commands` comandi oppure ogni `interval` millisecondi.
+    Con `speed` `None` viene usata l'animazione di default di **turtle**.
+    """
+
+    def __init__(self, speed=None, commands=REFRESH_COMMANDS, interval=REFRESH_INTERVAL):
+        self.turtle = None
+        self.color = None
+        self.width = None
+        self.batched = False
+        self.initialSpeed = speed
+        self.commands = commands
+        self.interval = interval / 1000
+        self.pending = 0
+        self.refreshed = 0.0
+
+    def _turtle(self):
+        if self.turtle is None:
+            import turtle
+            self.turtle = turtle
+            if self.initialSpeed is not None:
+                self.speed(self.initialSpeed)
+        return self.turtle
+
+    def _changed(self):
+        """
+        Chiamata dopo ogni comando che modifica il disegno, in modalita' a blocchi aggiorna la finestra quando serve.
+        """
+        if self.batched:
+            self.pending += 1
+            if self.pending >= self.commands or time.monotonic() - self.refreshed >= self.interval:
+                self.refresh()
+
+    def forward(self, distance):
+        self._turtle().forward(distance)
+        self._changed()
+
+    def back(self, distance):
+        self._turtle().back(distance)
+        self._changed()
+
+    def right(self, angle):
+        self._turtle().right(angle)
+        self._changed()
+
+    def left(self, angle):
+        self._turtle().left(angle)
+        self._changed()
+
+    def setheading(self, angle):
+        self._turtle().setheading(angle)
+        self._changed()
+
+    def setpos(self, x, y=None):
+        self._turtle().setpos(x, y)
+        self._changed()
+
+    def setx(self, x):
+        self._turtle().setx(x)
+        self._changed()
+
+    def sety(self, y):
+        self._turtle().sety(y)
+        self._changed()
+
+    def home(self):
+        self._turtle().home()
+        self._changed()
+
+    def circle(self, radius, extent=None):
+        self._turtle().circle(radius, extent)
+        self._changed()
+
+    def penup(self):
+        self._turtle().penup()
+
+    def pendown(self):
+        self._turtle().pendown()
+
+    def pencolor(self, r, g, b):
+        """
+        Il colore viene inviato a **turtle** solo se e' diverso da quello attuale, `colormode` viene impostato una sola volta.
+        """
+        if (r, g, b) == self.color:
+            return
+        turtle = self._turtle()
+        if self.color is None:
+            turtle.colormode(255)
+        turtle.pencolor(r, g, b)
+        self.color = (r, g, b)
+        self._changed()
+
+    def pensize(self, width):
+        if width == self.width:
+            return
+        self._turtle().pensize(width)
+        self.width = width
+        self._changed()
+
+    def clear(self):
+        self._turtle().clear()
+        self._changed()
+
+    def hideturtle(self):
+        self._turtle().hideturtle()
+        self._changed()
+
+    def showturtle(self):
+        self._turtle().showturtle()
+        self._changed()
+
+    def speed(self, value):
+        """
+        Con 0 passa al refresh a blocchi, con un valore tra 1 e 10 torna ad animare ogni comando.
+        """
+        if not 0 <= value <= 10:
+            raise ValueError("La velocita' deve essere compresa tra 0 e 10")
+        turtle = self._turtle()
+        if value == 0:
+            turtle.tracer(0)
+            self.batched = True
+            self.pending = 0
+            self.refreshed = time.monotonic()
+        else:
+            self.refresh()
+            self.batched = False
+            turtle.tracer(1)
+            turtle.speed(value)
+
+    def refresh(self):
+        """
+        Aggiorna subito la finestra con i comandi non ancora visualizzati.
+        """
+        if self.turtle is not None:
+            self.turtle.update()
+        self.pending = 0
+        self.refreshed = time.monotonic()
+
+    def close(self):
+        """
+        Visualizza gli ultimi comandi e chiude la finestra, se il programma ha eseguito almeno un comando grafico.
+        """
+        turtle = self.turtle
+        if turtle is None:
+            return None
+        try:
+            if self.batched:
+                self.refresh()
+            turtle.bye()
+        except turtle.Terminator:
+            pass
+
+class BatchedScreenBackend(ScreenBackend):
+    """
+    **ScreenBackend** che parte senza animazione, con il refresh a blocchi.
+    """
+
+    def __init__(self, commands=REFRESH_COMMANDS, interval=REFRESH_INTERVAL):
+        ScreenBackend.__init__(self, 0, commands, interval)
+
+#===numpy===
+"""
+Limiti di **HeadlessBackend.repeatMoves**: i cicli con meno di `MOVES_MIN` movimenti vengono eseguiti un comando alla volta,
+quelli piu' lunghi vengono calcolati a blocchi di circa `MOVES_CHUNK` movimenti.
+"""
+MOVES_MIN = 64
+MOVES_CHUNK = 1 << 16
+
+_NUMPY = None
+
+def _numpy():
+    """
+    Importa **numpy** solo quando serve, restituisce `None` se non e' installato.
+    """
+    global _NUMPY
+    if _NUMPY is None:
+        try:
+            import numpy as np
+            _NUMPY = np
+        except ImportError:
+            _NUMPY = False
+    return _NUMPY or None
+
+#===headless===
+class HeadlessBackend(Backend):
+    """
+    Tartaruga calcolata in python: posizione, direzione, penna, colore e spessore seguono le regole di **turtle**
+    (direzione 0 verso est, angoli in gradi in senso antiorario).
+    Ogni tratto disegnato passa per **drawSegment** o **drawArc**, che lo aggiungono a `displayList`:
+    una sottoclasse puo' ridefinirli per consumare i tratti in un altro modo, come [[svg.py#svg backend]].
+
+    Tra **beginFragment** e **endFragment** i tratti vengono anche aggiunti a `recorded`, indipendentemente da come
+    li consuma la sottoclasse, cosi' che **endFragment** possa restituirli come **Fragment**.
+    Le registrazioni possono essere annidate e condividono la stessa lista, che esiste solo finche' ce n'e' una in corso.
+
+    Se `budget` e' un [[budget.py#budget]], assegnato dall'interprete, i tratti gli vengono segnalati prima di essere disegnati.
+    """
+
+    def __init__(self):
+        self.x = 0.0
+        self.y = 0.0
+        self.heading = 0.0
+        self.down = True
+        self.visible = True
+        self.color = (0, 0, 0)
+        self.width = 1
+        self.displayList = []
+        self.recorded = None
+        self.recordings = 0
+        self.budget = None
+
+    def drawSegment(self, x1, y1, x2, y2):
+        self.displayList.append(Segment(x1, y1, x2, y2, self.color, self.width))
+
+    def drawArc(self, x, y, radius, start, extent):
+        self.displayList.append(Arc(x, y, radius, start, extent, self.color, self.width))
+
+    def drawSegments(self, x1, y1, x2, y2):
+        """
+        Disegna i segmenti con estremi nelle liste `x1`, `y1`, `x2`, `y2`.
+        """
+        color, width = self.color, self.width
+        self.displayList.extend([Segment(*coordinates, color, width) for coordinates in zip(x1, y1, x2, y2)])
+
+    def _moveTo(self, x, y):
+        if self.down:
+            if self.budget is not None:
+                self.budget.draw()
+            self.drawSegment(self.x, self.y, x, y)
+            if self.recorded is not None:
+                self.recorded.append(Segment(self.x, self.y, x, y, self.color, self.width))
+        self.x, self.y = x, y
+
+    def forward(self, distance):
+        angle = math.radians(self.heading)
+        self._moveTo(self.x + distance * math.cos(angle), self.y + distance * math.sin(angle))
+
+    def back(self, distance):
+        self.forward(-distance)
+
+    def right(self, angle):
+        self.heading = (self.heading - angle) % 360
+
+    def left(self, angle):
+        self.heading = (self.heading + angle) % 360
+
+    def setheading(self, angle):
+        self.heading = angle % 360
+
+    def setpos(self, x, y=None):
+        if y is None:
+            x, y = x
+        self._moveTo(x, y)
+
+    def setx(self, x):
+        self._moveTo(x, self.y)
+
+    def sety(self, y):
+        self._moveTo(self.x, y)
+
+    def home(self):
+        self._moveTo(0.0, 0.0)
+        self.heading = 0.0
+
+    def circle(self, radius, extent=None):
+        """
+        Il centro e' a sinistra della tartaruga se `radius` e' positivo, a destra se e' negativo.
+        La tartaruga termina sulla circonferenza, ruotata di `extent` gradi.
+        """
+        extent = 360 if extent is None else extent
+        turn = extent if radius >= 0 else -extent
+        normal = math.radians(self.heading + 90)
+        cx, cy = self.x + radius * math.cos(normal), self.y + radius * math.sin(normal)
+        start = (self.heading - 90 if radius >= 0 else self.heading + 90) % 360
+
+        if self.down and radius != 0:
+            if self.budget is not None:
+                self.budget.draw()
+            self.drawArc(cx, cy, abs(radius), start, turn)
+            if self.recorded is not None:
+                self.recorded.append(Arc(cx, cy, abs(radius), start, turn, self.color, self.width))
+        end = math.radians(start + turn)
+        self.x, self.y = cx + abs(radius) * math.cos(end), cy + abs(radius) * math.sin(end)
+        self.heading = (self.heading + turn) % 360
+
+    def repeatMoves(self, times, moves):
+        """
+        Calcola con **numpy** tutte le direzioni e le posizioni del ciclo, a blocchi di `MOVES_CHUNK` movimenti,
+        e disegna i segmenti con **drawSegments**, le posizioni vengono passate anche a **trace**.
+        Per i cicli con meno di `MOVES_MIN` movimenti, o se **numpy** non e' installato, i comandi vengono eseguiti uno alla volta.
+        La direzione prima del movimento `k` dell'iterazione `i` e' la direzione iniziale piu' `i` volte la rotazione
+        dell'intero corpo piu' le rotazioni che precedono `k`, cosi' l'errore non si accumula con le iterazioni.
+        """
+        np = _numpy() if times * len(moves) >= MOVES_MIN else None
+        if np is None:
+            return Backend.repeatMoves(self, times, moves)
+
+        # spostamento e rotazione di ogni movimento del corpo
+        distances = np.array([value if name == 'forward' else -value if name == 'back' else 0 for name, value in moves], dtype=float)
+        turns = np.array([value if name == 'left' else -value if name == 'right' else 0 for name, value in moves], dtype=float)
+        steps = np.array([name in ('forward', 'back') for name, _ in moves])
+        before = np.concatenate(([0.0], np.cumsum(turns)[:-1]))
+        total = float(turns.sum())
+        distances, before = distances[steps], before[steps]
+
+        heading = self.heading
+        chunk = max(1, MOVES_CHUNK // len(moves))
+        for first in range(0, times, chunk):
+            count = min(chunk, times - first)
+            if len(distances):
+                degrees = ((heading + np.arange(count)[:, None] * total + before) % 360).ravel()
+                headings = np.radians(degrees)
+                xs = self.x + np.cumsum(np.tile(distances, count) * np.cos(headings))
+                ys = self.y + np.cumsum(np.tile(distances, count) * np.sin(headings))
+                self.trace(xs, ys, degrees)
+                if self.down:
+                    x1, y1 = np.concatenate(([self.x], xs[:-1])).tolist(), np.concatenate(([self.y], ys[:-1])).tolist()
+                    x2, y2 = xs.tolist(), ys.tolist()
+                    if self.budget is not None:
+                        self.budget.draw(len(x1))
+                    self.drawSegments(x1, y1, x2, y2)
+                    if self.recorded is not None:
+                        color, width = self.color, self.width
+                        self.recorded.extend([Segment(*coordinates, color, width) for coordinates in zip(x1, y1, x2, y2)])
+                self.x, self.y = float(xs[-1]), float(ys[-1])
+            heading = (heading + count * total) % 360
+        self.heading = heading
+
+    def trace(self, xs, ys, headings):
+        """
+        Riceve gli array delle posizioni raggiunte da **repeatMoves** e delle direzioni dei movimenti, anche con la penna alzata:
+        per default non fa nulla, una sottoclasse puo' ridefinirlo per seguire il percorso della tartaruga come [[trajectory.py]].
+        """
+        pass
+
+    def penState(self):
+        """
+        Stato della penna da cui dipendono i tratti di una procedura, oltre alla posizione e alla direzione.
+        """
+        return self.down, self.color, self.width
+
+    def beginFragment(self):
+        """
+        Inizia a registrare i tratti, restituisce il valore da passare a **endFragment**.
+        """
+        if self.recorded is None:
+            self.recorded = []
+        self.recordings += 1
+        return self.x, self.y, self.heading, len(self.recorded)
+
+    def endFragment(self, token, limit=None):
+        """
+        Termina la registrazione iniziata da **beginFragment** e restituisce i tratti disegnati nel frattempo come **Fragment**,
+        oppure `None` se sono piu' di `limit`.
+        """
+        x0, y0, heading, start = token
+        strokes = self.recorded[start:] if limit is None or len(self.recorded) - start <= limit else None
+        self.recordings -= 1
+        if self.recordings == 0:
+            self.recorded = None
+        if strokes is None:
+            return None
+
+        angle = math.radians(heading)
+        cos, sin = math.cos(angle), math.sin(angle)
+        runs = []
+        for stroke in strokes:
+            segment = isinstance(stroke, Segment)
+            if not runs or runs[-1][0] != stroke.color or runs[-1][1] != stroke.width or (runs[-1][2] is not None) != segment:
+                runs.append((stroke.color, stroke.width, ([], [], [], []) if segment else None, None if segment else []))
+            if segment:
+                x1, y1, x2, y2 = runs[-1][2]
+                dx, dy = stroke.x1 - x0, stroke.y1 - y0
+                x1.append(dx * cos + dy * sin)
+                y1.append(dy * cos - dx * sin)
+                dx, dy = stroke.x2 - x0, stroke.y2 - y0
+                x2.append(dx * cos + dy * sin)
+                y2.append(dy * cos - dx * sin)
+            else:
+                dx, dy = stroke.x - x0, stroke.y - y0
+                runs[-1][3].append((dx * cos + dy * sin, dy * cos - dx * sin, stroke.radius, (stroke.start - heading) % 360, stroke.extent))
+
+        dx, dy = self.x - x0, self.y - y0
+        return Fragment(runs, dx * cos + dy * sin, dy * cos - dx * sin, (self.heading - heading) % 360,
+                        self.down, self.color, self.width, len(strokes))
+
+    def replayFragment(self, fragment):
+        """
+        Ridisegna il **Fragment** a partire dalla posizione e dalla direzione attuali, passando i tratti
+        per **drawSegments** e **drawArc**, poi porta la tartaruga e la penna nello stato finale del frammento.
+        """
+        if self.budget is not None:
+            self.budget.draw(fragment.strokes)
+        x0, y0, heading = self.x, self.y, self.heading
+        angle = math.radians(heading)
+        cos, sin = math.cos(angle), math.sin(angle)
+        for color, width, segments, arcs in fragment.runs:
+            self.color, self.width = color, width
+            if segments is not None:
+                x1, y1, x2, y2 = segments
+                wx1 = [x0 + x * cos - y * sin for x, y in zip(x1, y1)]
+                wy1 = [y0 + x * sin + y * cos for x, y in zip(x1, y1)]
+                wx2 = [x0 + x * cos - y * sin for x, y in zip(x2, y2)]
+                wy2 = [y0 + x * sin + y * cos for x, y in zip(x2, y2)]
+                self.drawSegments(wx1, wy1, wx2, wy2)
+                if self.recorded is not None:
+                    self.recorded.extend([Segment(*coordinates, color, width) for coordinates in zip(wx1, wy1, wx2, wy2)])
+            else:
+                for x, y, radius, start, extent in arcs:
+                    cx, cy, start = x0 + x * cos - y * sin, y0 + x * sin + y * cos, (start + heading) % 360
+                    self.drawArc(cx, cy, radius, start, extent)
+                    if self.recorded is not None:
+                        self.recorded.append(Arc(cx, cy, radius, start, extent, color, width))
+
+        self.x, self.y = x0 + fragment.x * cos - fragment.y * sin, y0 + fragment.x * sin + fragment.y * cos
+        self.heading = (heading + fragment.turn) % 360
+        self.down, self.color, self.width = fragment.down, fragment.color, fragment.width
+
+    def penup(self):
+        self.down = False
+
+    def pendown(self):
+        self.down = True
+
+    def pencolor(self, r, g, b):
+        """
+        Se il colore non cambia i tratti successivi continuano a condividere la stessa tupla.
+        """
+        if not all(0 <= value <= 255 for value in (r, g, b)):
+            raise ValueError("I valori di un colore devono essere compresi tra 0 e 255")
+        if (r, g, b) != self.color:
+            self.color = (r, g, b)
+
+    def pensize(self, width):
+        self.width = width
+
+    def clear(self):
+        self.displayList = []
+
+    def hideturtle(self):
+        self.visible = False
+
+    def showturtle(self):
+        self.visible = True
+
+    def close(self):
+        """
+        Restituisce la display list.
+        """
+        return self.displayList
+
+#===swarm===
+def _swarm():
+    """
+    Crea il backend di [[swarm.py#swarm backend]], il modulo viene importato solo quando serve perche' richiede **numpy**,
+    come quello di [[trajectory.py#trajectory backend]].
+    """
+    from swarm import SwarmBackend
+    return SwarmBackend()
+
+def _trajectory():
+    from trajectory import TrajectoryBackend
+    return TrajectoryBackend()
+
+"""
+Dispatch table dei backend disponibili, indicizzata con il nome usato da [[interpreter.py#run]].
+"""
+BACKENDS = {
+    'screen':   ScreenBackend,
+    'batched':  BatchedScreenBackend,
+    'headless': HeadlessBackend,
+    'swarm':    _swarm,
+    'trajectory': _trajectory
+}
+
+"""
+Backend usato di default, puo' essere cambiato con `LOGO_GRAPHICS`.
+"""
+BACKEND = os.environ.get('LOGO_GRAPHICS', 'screen')
+
+#===create backend===
+def createBackend(graphics=None):
+    """
+    Restituisce un nuovo backend a partire dal nome, se `graphics` e' gia' un backend lo restituisce invariato.
+    """
+    graphics = BACKEND if graphics is None else graphics
+    if isinstance(graphics, Backend):
+        return graphics
+    if graphics not in BACKENDS:
+        raise ValueError("Backend grafico `" + str(graphics) + "` sconosciuto")
+    return BACKENDS[graphics]()
@@ -1,14 +1,59 @@
-from liblet import ANTLR, Tree, AnnotatedTreeWalker, Stack, show_calls
 from parser import parse
+from logoAst import NodeWalker, Block
+from frames import resolve, topFrame, ProcedureReturn, LOCAL, GLOBAL, UNBOUND
+from tailcalls import TailCall, OUTPUT
 import math
 import random as rd
 import operator as op
 import functools as fs
-from turtle import *
+from graphics import createBackend, MOVES_CHUNK
+import procedureCache
+from budget import Budget
+from contextlib import contextmanager
+from contextvars import ContextVar
+import builtins
+import os
 import sys
 sys.tracebacklimit = 0
 
-interpreter = AnnotatedTreeWalker('type')
+interpreter = NodeWalker()
+
+"""
+Motore di esecuzione usato di default da `run`:
+
+    - `tree`, l'albero viene visitato tramite `interpreter`
+    - `closure`, l'albero viene prima compilato in closure da [[compiler.py]]
+    - `python`, il programma viene tradotto in un modulo python da [[transpiler.py]]
+    - `stack`, l'albero viene valutato da [[stackMachine.py]] con una pila esplicita, senza limiti di ricorsione python
+"""
+ENGINES = ('tree', 'closure', 'python', 'stack')
+ENGINE = os.environ.get('LOGO_ENGINE', 'tree')
+
+"""
+Se vero, prima dell'esecuzione l'albero viene ottimizzato da [[optimizer.py]].
+Puo' essere disabilitato con `LOGO_OPTIMIZE=0`.
+"""
+OPTIMIZE = os.environ.get('LOGO_OPTIMIZE', '1') != '0'
+
+"""
+**Interpreter** in esecuzione nel contesto corrente, impostato da **Interpreter.active**.
+Le funzioni di supporto condivise dai motori (comandi grafici, `random`, `print`, `readword`, cache delle procedure)
+usano il backend, il generatore di numeri casuali, l'uscita e l'ingresso dell'interprete corrente:
+essendo una `ContextVar`, thread diversi possono eseguire ciascuno il proprio programma.
+"""
+CURRENT = ContextVar('interpreter')
+
+def current():
+    """
+    Restituisce l'**Interpreter** in esecuzione, se non ce n'e' nessuno solleva **LookupError**.
+    """
+    return CURRENT.get()
+
+def backend():
+    """
+    Backend grafico dell'interprete in esecuzione, su cui vengono eseguiti i comandi di `DT_GRAPHICS`.
+    """
+    return CURRENT.get().graphics
 
 #===and===
 def _and(visit, ast):
@@ -60,10 +105,11 @@ def random(listParams):
     Se e' uno solo lo utilizza come limite massimo.
     Se sono due li utilizza come numero minimo e numero massimo tra i quali generare il numero random.
     """
+    generator = CURRENT.get().random
     if len(listParams) == 1 :
-        return rd.randrange(listParams[0])
+        return generator.randrange(listParams[0])
     else:
-        return rd.randint(listParams[0], listParams[1])
+        return generator.randint(listParams[0], listParams[1])
 
 #===rerandom===
 def rerandom(listParams):
@@ -71,11 +117,12 @@ def rerandom(listParams):
     Rende riproducibili i numeri randomici nell'esecuzione multipla del programma.
     Se non viene passato nessun seed viene usato uno di default che è 0.
     Altrimenti viene usato il seed indicato come parametro.
+    Il seed vale solo per l'interprete in esecuzione.
     """
     if len(listParams) == 0:
-        rd.seed(0)
+        CURRENT.get().random.seed(0)
     else:
-        rd.seed(listParams[0])
+        CURRENT.get().random.seed(listParams[0])
 
 #===quotient===
 def quotient(listParams):
@@ -128,8 +175,7 @@ def setPenColor(listParams):
     if not all(isinstance(ele, (int, float)) for ele in listParams):
         raise TypeError("I parametri di un comando graphics devono essere tutti dei numeri")
     
-    colormode(255)
-    pencolor(listParams[0], listParams[1], listParams[2])
+    backend().pencolor(listParams[0], listParams[1], listParams[2])
 
 """
 Disppatch table contenente le funzioni riguardanti operazioni aritmetico-logice
@@ -176,80 +222,162 @@ DT_OPERATORS = {
 }
 
 """
-Dispatch table contenente tutte le operazioni di tipo grafico, e'stata utilizzata la libreria **turtle**
+Dispatch table contenente tutte le operazioni di tipo grafico, eseguite sul backend dell'interprete in esecuzione
 """
 DT_GRAPHICS = {
-    'rw':           lambda: input(),
-   	'fd':           lambda x: forward(x[0]),
-   	'bk':           lambda x: bk(x[0]),
-   	'rt':           lambda x: rt(x[0]),
-   	'lt':           lambda x: lt(x[0]),
-   	'setxy':        lambda x: setpos(x[0], x[1]),
-   	'setpos':       lambda x: setpos(x[0]),
-   	'setx':         lambda x: setx(x[0]),
-   	'sety':         lambda x: sety(x[0]),
-   	'seth':         lambda x: seth(x[0]),
-   	'arc':          lambda x: circle(x[0], x[1]),
+    'rw':           lambda: readword(),
+   	'fd':           lambda x: backend().forward(x[0]),
+   	'bk':           lambda x: backend().back(x[0]),
+   	'rt':           lambda x: backend().right(x[0]),
+   	'lt':           lambda x: backend().left(x[0]),
+   	'setxy':        lambda x: backend().setpos(x[0], x[1]),
+   	'setpos':       lambda x: backend().setpos(x[0]),
+   	'setx':         lambda x: backend().setx(x[0]),
+   	'sety':         lambda x: backend().sety(x[0]),
+   	'seth':         lambda x: backend().setheading(x[0]),
+   	'arc':          lambda x: backend().circle(x[0], x[1]),
    	'setpc':        setPenColor,
-   	'setpensize':   lambda x: pensize(x[0]),
-   	'cs':           clear,
-   	'pu':           pu,
-   	'pd':           pd,
-   	'ht':           ht,
-   	'st':           st,
-   	'home':         home,
-   	'clean':        clear
+   	'setpensize':   lambda x: backend().pensize(x[0]),
+   	'cs':           lambda: backend().clear(),
+   	'pu':           lambda: backend().penup(),
+   	'pd':           lambda: backend().pendown(),
+   	'ht':           lambda: backend().hideturtle(),
+   	'st':           lambda: backend().showturtle(),
+   	'home':         lambda: backend().home(),
+   	'clean':        lambda: backend().clear(),
+   	'setspeed':     lambda x: backend().speed(x[0]),
+   	'refresh':      lambda: backend().refresh(),
+   	'crt':          lambda x: backend().createTurtles(x[0]),
+   	'tell':         lambda x: backend().tell(x),
+   	'tellall':      lambda: backend().tellAll()
 }
 
+"""
+Dispatch table dei comandi grafici che possono far parte del corpo di un `TurtleRepeat`, con il metodo del backend che li esegue.
+"""
+DT_MOVES = {
+    'fd': 'forward',
+    'bk': 'back',
+    'rt': 'right',
+    'lt': 'left'
+}
+
+#===turtle moves===
+def turtleMoves(moves, values):
+    """
+    Restituisce le coppie `(metodo, parametro)` di un `TurtleRepeat` a partire dai parametri del corpo, valutati una sola volta.
+    Se un parametro non e' un numero restituisce `None`: il corpo va eseguito un comando alla volta,
+    cosi' che l'errore venga segnalato dopo aver eseguito i comandi che lo precedono.
+    """
+    if not all(isinstance(value, (int, float)) for value in values):
+        return None
+    return list(zip(moves, values))
+
+def repeatMoves(times, moves):
+    """
+    Esegue `times` volte i movimenti `moves` con un solo comando del backend grafico, contando `times` passi del **Budget**.
+    Se il budget ha un limite di tempo il ciclo viene eseguito a blocchi di circa `MOVES_CHUNK` movimenti,
+    cosi' che il tempo venga controllato anche durante il disegno.
+    """
+    runtime = CURRENT.get()
+    budget = runtime.budget
+    if budget.deadline is None:
+        budget.step(times)
+        runtime.graphics.repeatMoves(times, moves)
+        return
+    chunk = max(1, MOVES_CHUNK // len(moves))
+    for start in range(0, times, chunk):
+        count = min(chunk, times - start)
+        budget.step(count)
+        runtime.graphics.repeatMoves(count, moves)
+
+#===cached call===
+def cachedCall(function, values, body, depth=None):
+    """
+    Esegue la chiamata di una procedura segnata da [[optimizer.py#cacheable]] tramite la cache di [[procedureCache.py]]
+    e il backend dell'interprete in esecuzione. `body` esegue il corpo e restituisce il valore della chiamata.
+    `depth` e' la profondita' della chiamata passata a **Budget.call**, se `None` quella contata da **Budget.enter**.
+    """
+    runtime = CURRENT.get()
+    budget = runtime.budget
+    return runtime.procedures.call(runtime.graphics, function, values, body, budget, budget.level + 1 if depth is None else depth)
+
+def enterProcedure(function, values, depth):
+    """
+    Come **cachedCall**, per i motori che non possono passare il corpo come funzione: vedi [[procedureCache.py#procedure cache]].
+    """
+    runtime = CURRENT.get()
+    return runtime.procedures.enter(runtime.graphics, function, values, runtime.budget, depth)
+
+def leaveProcedure(recording, completed=True):
+    runtime = CURRENT.get()
+    runtime.procedures.leave(runtime.graphics, recording, completed)
+
+#===ask===
+def beginAsk(turtles):
+    """
+    Invia i comandi successivi alle tartarughe `turtles` del backend grafico, come `TELL`,
+    e restituisce le tartarughe a cui erano inviati prima, da passare a **endAsk** al termine del corpo di `ASK`.
+    Effettua un controllo sui tipi, se le tartarughe non sono numeri lancia un eccezione di tipo **TypeError**.
+    """
+    if not all(isinstance(ele, (int, float)) for ele in turtles):
+        raise TypeError("In un espressione gli operandi devono essere int o float")
+    graphics = backend()
+    previous = graphics.addressed()
+    graphics.tell(turtles)
+    return previous
+
+def endAsk(previous):
+    backend().tell(previous)
+
+#===write===
+def write(value):
+    """
+    Stampa il valore tramite **Interpreter.write** dell'interprete in esecuzione, usata da `print` in tutti i motori.
+    """
+    CURRENT.get().write(value)
+
+#===readword===
+def toWord(value):
+    """
+    Converte una riga letta da `READWORD` in numero se rappresenta un numero, altrimenti la restituisce come stringa.
+    """
+    try:
+        return int(value) if float(value).is_integer() else float(value)
+    except ValueError:
+        return str(value)
+
+def readword():
+    """
+    Legge una riga dall'ingresso dell'interprete in esecuzione e la restituisce convertita da **toWord**.
+    """
+    return toWord(CURRENT.get().input())
+
 #===zero parameters functions===
 def zeroPrarameterFunctions(visit, ast):
     """
     Viene richiamata da **graphics** definita in [[interpreter.py#graphic]].
     Tramite il nome del nodo accede alla dispatch table ed esegue la funzione selezionata non passando nessun parametro alla funzione chiamata.
     """
-    DT_GRAPHICS[ast.root['name']]
+    DT_GRAPHICS[ast.name]()
 
 #===more parameter functions===
 def morePrarameterFunctions(visit, ast):
     """
     Viene richiamata da **graphics** definita in [[interpreter.py#graphic]].
     Tramite il nome del nodo accede alla dispatch table ed esegue la funzione selezionata.
-    Passa come parametri alla funzione un array contente i risultati della visita ricorsiva di tutti i figli del nodo.
+    Passa come parametri alla funzione un array contente i risultati della visita ricorsiva di tutti i figli del nodo,
+    se il primo figlio e' un blocco (come in `setpc [255 0 0]`) i parametri sono i valori degli elementi del blocco.
     """
     params = []
-    if ast.children[0].root['type'] == 'block':
-        params = visit(ast.children[0])
+    if isinstance(ast.children[0], Block):
+        params = [visit(child) for child in ast.children[0].children]
     else:
         params = [visit(child) for child in ast.children]
 
     if not all(isinstance(ele, (int, float)) for ele in params):
         raise TypeError("In un espressione gli operandi devono essere int o float")
-    DT_GRAPHICS[ast.root['name']](params)
-
-#===operations===
-def operations(visit, ast):
-    """
-    Viene richiamata da **exceptions** definita in [[interpreter.py#expression]].
-    Visita ricorsivamente tutti i figli dispari per prendere tutti i segni dell'espressione.
-    Visita ricorsivamente tutti i figli pari per prendere tutti i valori numerici dell'espressione.
-    Iterazione per iterazione applico all'accumulatore e al numero l'operazione e restituisco l'accumulatore.
-    Controllo che tutti i tipi all'interno di numbers siano umerici altrimenti lancio un' eccezione **TypeError**
-    """
-    
-    numbers = [visit(child) for child in ast.children[::2]]
-
-    if not all(not isinstance(ele, bool) and isinstance(ele, (int, float)) for ele in numbers):
-        raise TypeError("In un espressione gli operandi devono essere int o float")
-    
-    signs = [visit(child) for child in ast.children[1::2]]
-
-    acc = numbers[0]
-    signIndex = 0
-    for number in numbers[1:]:
-        acc = DT_OPERATORS[signs[signIndex]](acc, number)
-        signIndex += 1
-    
-    return acc
+    DT_GRAPHICS[ast.name](params)
 
 #===prog===
 @interpreter.register
@@ -264,51 +392,39 @@ def prog(visit, ast):
 def line(visit, ast):
     """
     Non esegue alcuna operazione, visita ricorsivamente tutti i suoi figli.
+    Restituisce il valore dell'ultimo figlio, che in coda al corpo di una procedura puo' essere una **TailCall**.
     """
+    result = None
     for child in ast.children:
-        visit(child)
+        result = visit(child)
+    return result
 
-#===expression===
+#===operations===
 @interpreter.register
-def expression(visit, ast):
+def operation(visit, ast):
     """
-    Se ha un unico figlio restituisce il valore della chiamata ricorsiva su quest'ultimo.
-    Altrimenti restituisce il valore della chiamata della funzione **operations**.
-    Se presente applica al risultato il segno dell'espressione
-    """
-    result = None
+    Visita ricorsivamente i due figli per prendere i valori numerici dell'espressione
+    e applica l'operatore salvato nel nodo tramite la dispatch table `DT_OPERATORS`.
+    I possibili operatori sono:
 
-    if len(ast.children) == 1:
-        result = visit(ast.children[0])
-    else:    
-        result = operations(visit, ast)
+    `[+, -, *, /, <, >, =, >=, <=]`
 
-    if 'sign' in ast.root:
-        return int(ast.root['sign']+str(1))*result
-    else:
-        return result
-
-#===operators===
-@interpreter.register
-def Op(visit, ast):
+    Controllo che tutti i tipi all'interno di numbers siano umerici altrimenti lancio un' eccezione **TypeError**
     """
-    Restituisce il valore dell'operatore.
-    I possibili operatori sono:
+    numbers = [visit(child) for child in ast.children]
 
-    `[+, -, *, /]`
-    """
-    return ast.root['value']
+    if not all(not isinstance(ele, bool) and isinstance(ele, (int, float)) for ele in numbers):
+        raise TypeError("In un espressione gli operandi devono essere int o float")
 
-#===comparison operator===
+    return (ast.function or DT_OPERATORS[ast.op])(numbers[0], numbers[1])
+
+#===sign===
 @interpreter.register
-def comparisonOperator(visit, ast):
+def sign(visit, ast):
     """
-    Restituisce il valore dell'operatore.
-    I possibili operatori sono:
-
-    `[<, >, =, >=, <=]`
+    Applica il segno dell'espressione al valore della chiamata ricorsiva sull'unico figlio.
     """
-    return ast.root['value']
+    return ast.factor*visit(ast.children[0])
 
 #===print===
 @interpreter.register
@@ -318,7 +434,7 @@ def pr(visit, ast):
     """
     
     for child in ast.children:
-        print(visit(child))
+        write(visit(child))
 
 #===arithmetic and boolean operations===
 @interpreter.register
@@ -327,25 +443,26 @@ def arithmBoolOperations(visit, ast):
     Gestisce tutti i tipi di operazioni aritmetiche e logiche tramite la dispatch table `DT_TABLE`.
     Effettua un controllo sui tipi delle operazioni aritmetiche, se non sono numeri lancia un eccezione di tipo **TypeError**.
     """
-    if ast.root['name'] in ['and', 'or', 'not']:
-        return DT_OPERATORS[ast.root['name']](visit, ast)
+    if ast.name in ['and', 'or', 'not']:
+        return DT_OPERATORS[ast.name](visit, ast)
 
     params = [visit(child) for child in ast.children]
     if not all(not isinstance(ele, bool) and isinstance(ele, (int, float)) for ele in params):
         raise TypeError("In un espressione gli operandi devono essere int o float")
 
-    return DT_OPERATORS[ast.root['name']](params)
+    return (ast.function or DT_OPERATORS[ast.name])(params)
 
 #===make===
 @interpreter.register
 def make(visit, ast):
     """
-    Salva nel activation record corrente il una coppia con chiave il nome della variabile contenuto 
-    nel primo figlio e come valore il valore della variabile contenuto nel secondo figlio.
+    Salva nella memoria globale il valore della variabile contenuto nel secondo figlio,
+    con il nome della variabile contenuto nel primo figlio.
+    Se il nome e' costante la variabile ha uno slot fisso, assegnato da [[frames.py#resolve]].
     Controllo che il nome della variabile sia una stringa altrimenti lancio
     un eccezione di tipo **TypeError**
     """
-    memory = interpreter.GLOBAL_MEMORY
+    memory = visit.GLOBAL_MEMORY
     name = visit(ast.children[0])
     value = visit(ast.children[1])
 
@@ -354,7 +471,10 @@ def make(visit, ast):
     if value == None:
         raise TypeError("Non posso assegnare ad una variabile un valore nullo")
 
-    memory[visit(ast.children[0])] = value
+    if ast.slot is None:
+        memory[name] = value
+    else:
+        memory.values[ast.slot] = value
 
 #===deref===
 @interpreter.register
@@ -363,24 +483,29 @@ def deref(visit, ast):
     Cerca all interno dell'activation record corrente il nome della variabile di cui si vuole conosce il valore, 
     e lo restituisce se presente, altrimenti cerca nella GLOBEL_MEMORY, se il valore non e' presente neanche li,
     lancia un eccezzione di tipo **NameError**.
-    Se e' un numero controlla che ci sia il segno e lo aggiunge al numero che restituisce.
+    Se la variabile e' stata risolta da [[frames.py#resolve]] il valore viene letto direttamente dal suo slot.
     """
+    if ast.scope == LOCAL:
+        return visit.ACTIVATION_RECORDS[-1].slots[ast.slot]
+
+    memory_global = visit.GLOBAL_MEMORY
+    if ast.scope == GLOBAL:
+        res = memory_global.values[ast.slot]
+        if res is UNBOUND:
+            raise NameError("La variabile " + visit(ast.children[0]) + " non è stata dichiarata")
+        return res
 
-    memory_stack = interpreter.ACTIVATION_RECORDS.peek()
-    memory_global = interpreter.GLOBAL_MEMORY
+    memory_stack = visit.ACTIVATION_RECORDS[-1]
     name = visit(ast.children[0])
-    res=''
 
-    if name in memory_stack:
-        res = memory_stack[name]
+    if name in memory_stack.index:
+        res = memory_stack.slots[memory_stack.index[name]]
     elif name in memory_global:
         res = memory_global[name]
     else:
         raise NameError("La variabile " + name + " non è stata dichiarata")
-    
-    if not isinstance(res, str) and 'sign' in ast.root:
-        return int(ast.root['sign']+"1")*res
-    return res   
+
+    return res
 
 
 
@@ -393,7 +518,7 @@ def graphic(visit, ast):
         - `zeroPrarameterFunctions` 
         - `morePrarameterFunctions` 
 
-    Le operazioni svolta da questa funzione sono di tipo grafico, ed e' utilizzata la libreria **turtle**
+    Le operazioni svolta da questa funzione sono di tipo grafico, eseguite sul backend `GRAPHICS`
     """
     if (len(ast.children) == 0):
         return zeroPrarameterFunctions(visit, ast)
@@ -440,56 +565,100 @@ def ifelseState(visit, ast):
 def repeatState(visit, ast):
     """
     Esegue il blocco contenuto nel secondo figlio per un numero di volte che e' specificato nel primo figlio del nodo.
-    Controlla ogni ciclo se e' stata effettuata un operazione di `output`oppure `stop` se cosi fosse interrompe il ciclo.
+    Un operazione di `output` oppure `stop` interrompe il ciclo sollevando **ProcedureReturn**.
     Effettua un controllo sul tipo del parametro di repeat, se non è un int lancia un eccezione di tipo **TypeError**
     """
-    memory = interpreter.ACTIVATION_RECORDS.peek()
     value = visit(ast.children[0])
 
     if not isinstance(value, int):
         raise TypeError("REPEAT deve avere un int come parametro")
 
+    body = ast.children[1]
+    step = visit.BUDGET.step
     for _ in range(value):
-        if 'retval' in memory or 'stop' in memory:
-            return
-        visit(ast.children[1])
+        step()
+        visit(body)
+
+#===turtle repeat===
+@interpreter.register
+def turtleRepeat(visit, ast):
+    """
+    Come `repeatState`, ma i parametri del corpo vengono valutati una sola volta e i movimenti vengono eseguiti
+    da **repeatMoves**. Se la valutazione dei parametri fallisce il corpo viene eseguito un comando alla volta.
+    """
+    value = visit(ast.children[0])
+
+    if not isinstance(value, int):
+        raise TypeError("REPEAT deve avere un int come parametro")
+
+    body = ast.children[1]
+    moves = None
+    if value > 0:
+        try:
+            moves = turtleMoves(ast.moves, [visit(child.children[0]) for child in body.children])
+        except Exception:
+            moves = None
+    if moves is None:
+        step = visit.BUDGET.step
+        for _ in range(value):
+            step()
+            visit(body)
+    else:
+        repeatMoves(value, moves)
 
 #===while===
 @interpreter.register
 def whileState(visit, ast):
     """
     Esegue il blocco contenuto nel secondo figlio finche la condizione specificata nel primo figlio del nodo non si falsifica.
-    Controlla ogni ciclo se e' stata effettuata un operazione di `output`oppure `stop` se cosi fosse interrompe il ciclo.
+    Un operazione di `output` oppure `stop` interrompe il ciclo sollevando **ProcedureReturn**.
     Effettuo un controllo sul fatto che la condizione sia di tipo boolean, altrimenti lancio un eccezzione di tipo **TypeError**
     """
-    memory = interpreter.ACTIVATION_RECORDS.peek()
+    condition, body = ast.children
+    step = visit.BUDGET.step
 
-    while visit(ast.children[0]):
-        if 'retval' in memory or 'stop' in memory:
-            return
-        visit(ast.children[1])
+    while visit(condition):
+        step()
+        visit(body)
+
+#===ask===
+@interpreter.register
+def askState(visit, ast):
+    """
+    Esegue il blocco contenuto nel secondo figlio inviando i comandi grafici alle tartarughe indicate dal primo figlio,
+    un numero oppure un blocco di numeri come in `setpc`, poi torna alle tartarughe a cui erano inviati prima,
+    anche se il corpo viene interrotto da un eccezione o da **ProcedureReturn**.
+    I comandi vengono eseguiti da tutte le tartarughe insieme, vedi [[swarm.py]].
+    """
+    turtles, body = ast.children
+    if isinstance(turtles, Block):
+        previous = beginAsk([visit(child) for child in turtles.children])
+    else:
+        previous = beginAsk([visit(turtles)])
+    try:
+        visit(body)
+    finally:
+        endAsk(previous)
 
 #===procedure declaration===
 @interpreter.register
 def procedureDeclaration(visit, ast):
     """
     Salva il sottoalbero della funzione all interno del dizionario `FUNCTIONS` e come chiave il nome della funzione.
-    Modifica il nome del tipo del nodo cosi che quanto verra richiamata la funzione e quindi interpretata, possa essere fatto cio' tramite un apposita funzione.
+    L'albero non viene modificato, quando la funzione viene invocata il corpo e' interpretato da **procedureExec**.
     """
-    ast.root['type'] = 'procedureExec'
-    interpreter.FUNCTIONS[ast.root['name']] = ast
+    visit.FUNCTIONS[ast.name] = ast
 
 #===procedure execution===
-@interpreter.register
 def procedureExec(visit, ast):
     """
-    Interpreta la funzione.
+    Viene richiamata da **procedureInvocation** definita in [[interpreter.py#procedure invocation]].
+    Interpreta il corpo della funzione e restituisce il valore dell'ultima linea.
     """
-    memory = interpreter.ACTIVATION_RECORDS.peek()
+    result = None
     for child in ast.children:
-        if 'retval' in memory or 'stop' in memory:
-            return
-        visit(child)
+        result = visit(child)
+    return result
 
 #===procedure invocation===
 @interpreter.register
@@ -497,54 +666,85 @@ def procedureInvocation(visit, ast):
     """
     Cerca la funzione all'interno di `FUNCTIONS`.
     Aggiunge un nuovo activation record allo stack, esegue la funzione, fa il pop del record nello stack.
-    Come ultima cosa restituisce il valore della funzione.
+    L'activation record viene preso dal `FramePool` della funzione e rilasciato al termine.
+    Come ultima cosa restituisce il valore della funzione, ricevuto tramite **ProcedureReturn** da `output`.
+
+    Una chiamata in coda, segnata da [[frames.py#resolve]], non esegue la funzione ma restituisce una **TailCall**,
+    che diventa il valore del corpo: l'invocazione in corso rilascia il proprio activation record ed esegue
+    la funzione chiamata nello stesso ciclo, senza annidare le visite.
+    Le procedure con `cache` vengono eseguite tramite **cachedCall**.
     """
-    name = ast.root['name']
-    if name in interpreter.FUNCTIONS:
-        function = interpreter.FUNCTIONS[name]
+    name = ast.name
+    if name in visit.FUNCTIONS:
+        function = visit.FUNCTIONS[name]
     else:
         raise NameError("La funzione non è stata dichiarata")
     
-    paramsName = function.root['params']
+    paramsName = function.params
     paramsValue = [visit(child) for child in ast.children]
 
     if len(paramsName) != len(paramsValue):
         raise TypeError("Numero di parametri per la funzione `" +  name + "` non corretto")
-    
-    interpreter.ACTIVATION_RECORDS.push(dict(zip(paramsName, paramsValue)))
-    visit(function)
-
-    memory = interpreter.ACTIVATION_RECORDS.peek()
 
-    if 'retval' in memory:
-        return interpreter.ACTIVATION_RECORDS.pop()['retval']
-    interpreter.ACTIVATION_RECORDS.pop()
+    if ast.tail is not None:
+        return TailCall(function, paramsValue, ast.tail == OUTPUT)
+    if function.cache:
+        return cachedCall(function, paramsValue, lambda: invoke(visit, function, paramsValue), len(visit.ACTIVATION_RECORDS))
+    return invoke(visit, function, paramsValue)
+
+#===invoke===
+def invoke(visit, function, paramsValue):
+    """
+    Esegue la procedura e le eventuali chiamate in coda, come descritto in **procedureInvocation**.
+    """
+    records = visit.ACTIVATION_RECORDS
+    call = visit.BUDGET.call
+    keep = True
+    while True:
+        call(len(records))
+        frame = function.frames.acquire(paramsValue)
+        records.append(frame)
+        try:
+            result = procedureExec(visit, function)
+            if result.__class__ is not TailCall:
+                result = None
+        except ProcedureReturn as signal:
+            result = signal.value
+
+        records.pop()
+        function.frames.release(frame)
+        if result.__class__ is not TailCall:
+            return result if keep else None
+        function, paramsValue = result.function, result.values
+        keep = keep and result.keep
 
 #===output===
 @interpreter.register
 def opState(visit, ast):
     """
     Simula il ritorno con valore di una funzione.
-    Salva nello stack con il nome di `retval` il valore della chiamata ricorsiva sul primo figlio.
+    Termina la funzione sollevando **ProcedureReturn** con il valore della chiamata ricorsiva sul primo figlio.
+    Se il figlio e' una chiamata in coda la **TailCall** viene restituita, cosi' da diventare il valore del corpo.
     """
-    if len(interpreter.ACTIVATION_RECORDS) == 1:
+    if len(visit.ACTIVATION_RECORDS) == 1:
         raise SyntaxError("Non si può avere un output state al di fuori di una funzione")
     
-    memory = interpreter.ACTIVATION_RECORDS.peek()
-    memory['retval'] = visit(ast.children[0])
+    value = visit(ast.children[0])
+    if value.__class__ is TailCall:
+        return value
+    raise ProcedureReturn(value)
 
 #===stop===
 @interpreter.register
 def stopState(vist, ast):
     """
     Simula il ritorno senza valore di una funzione.
-    Salva nello stack con il nome di `retval` il valore `None`.
+    Termina la funzione sollevando **ProcedureReturn** senza valore.
     """
-    if len(interpreter.ACTIVATION_RECORDS) == 1:
+    if len(vist.ACTIVATION_RECORDS) == 1:
         raise SyntaxError("Non si può avere uno stop state al di fuori di una funzione")
 
-    memory = interpreter.ACTIVATION_RECORDS.peek()
-    memory['stop'] = None
+    raise ProcedureReturn()
 
 #===block===
 @interpreter.register
@@ -553,11 +753,8 @@ def block(visit, ast):
     Visita ricorsivamente tutti i figli del nodo e restituisce con risultato una lista contenente i valori di ritorno
     delle sole funzioni che restituiscono effettivamente qualcosa.
     """
-    memory = interpreter.ACTIVATION_RECORDS.peek()
     result = []
     for child in ast.children:
-        if 'retval' in memory or 'stop' in memory:
-            return
         result.append(visit(child))
 
     result = [ele for ele in result if ele != None]
@@ -571,49 +768,148 @@ def rw(visit, ast):
     Aspetta un input da tastiera e lo restituisce.
     Se l'input è un numero lo converte in numero.
     """
-
-    value = input()
-
-    try:
-        return int(value) if float(value).is_integer() else float(value)
-    except ValueError:
-        return str(value)
+    return readword()
 
 @interpreter.register
 def Boolean_(visit, ast):
-    return ast.root['value']
+    return ast.value
 
 @interpreter.register
 def STRINGLITERAL(visit, ast):
-    return str(ast.root['value'])
+    return str(ast.value)
 
 @interpreter.register
 def STRING(visit, ast):
-    return str(ast.root['value'].replace('"', ''))
+    return str(ast.value.replace('"', ''))
 
 @interpreter.register
-def FLOAT(visit, ast):
-    if 'sign' in ast.root:
-        return float(ast.root['sign'] + str(ast.root['value']))
-    return float(ast.root['value'])
+def number(visit, ast):
+    """
+    I numeri con il punto decimale sono `FLOAT`, gli altri `INT`.
+    """
+    if '.' in ast.value:
+        return float(ast.value)
+    return int(ast.value)
 
 @interpreter.register
-def INT(visit, ast):
-    if 'sign' in ast.root:
-        return int(ast.root['sign'] + str(ast.root['value']))
-    return int(ast.root['value'])
+def constant(visit, ast):
+    return ast.value
+
+#===interpreter===
+class Interpreter:
+    """
+    Stato di esecuzione dei programmi: motore, ottimizzazione, backend grafico `graphics`, generatore di numeri casuali
+    `random`, inizializzato con `seed`, uscita `output` su cui scrive `print` (`None` e' lo `sys.stdout` del momento),
+    funzione `input` che legge una riga per `readword`, cache dei disegni delle procedure `procedures`
+    e limiti di esecuzione `budget`, un [[budget.py#budget]] azzerato a ogni esecuzione, illimitato se non indicato:
+    dopo l'esecuzione `budget.report()` restituisce le risorse consumate.
+
+    L'albero ricevuto non viene mai modificato: ogni esecuzione lo risolve in una copia e salva funzioni, activation record
+    e memoria globale in un walker creato per l'esecuzione, vedi [[logoAst.py]] `fork`.
+    Piu' istanze possono quindi eseguire lo stesso albero contemporaneamente su thread diversi.
+    Un istanza esegue un programma alla volta, i programmi eseguiti di seguito disegnano sullo stesso backend.
+    """
+
+    def __init__(self, engine=None, optimize=None, graphics=None, output=None, input=None, seed=None, budget=None):
+        self.engine = ENGINE if engine is None else engine
+        self.optimize = OPTIMIZE if optimize is None else optimize
+        if self.engine not in ENGINES:
+            raise ValueError("Motore di esecuzione `" + str(self.engine) + "` sconosciuto")
+        self.graphics = createBackend(graphics)
+        self.random = rd.Random(seed)
+        self.output = output
+        self.input = builtins.input if input is None else input
+        self.procedures = procedureCache.ProcedureCache(procedureCache.CACHE_SIZE, procedureCache.CACHE_STROKES)
+        self.budget = Budget() if budget is None else budget
+
+    @contextmanager
+    def active(self):
+        """
+        Rende l'istanza l'interprete corrente fino all'uscita dal blocco `with`, con una cache delle procedure vuota
+        e i contatori del `budget` azzerati.
+        """
+        self.procedures = procedureCache.ProcedureCache(procedureCache.CACHE_SIZE, procedureCache.CACHE_STROKES)
+        self.budget.start(self.graphics)
+        token = CURRENT.set(self)
+        try:
+            yield self
+        finally:
+            CURRENT.reset(token)
+            self.budget.stop()
+
+    def write(self, value):
+        """
+        Stampa il valore su `output`.
+        """
+        print(value, file=self.output)
+
+    def execute(self, ast):
+        """
+        Esegue l'albero, se `optimize` e' vero l'albero viene prima ottimizzato.
+        Per il motore `tree` risolve le variabili tramite [[frames.py#resolve]] e inizializza un nuovo spazio di memoria
+        per i nomi di funzioni, uno stack vuoto e la memoria globale.
+        """
+        with self.active():
+            if self.optimize:
+                # import ritardato, optimizer.py importa a sua volta questo modulo
+                import optimizer
+                ast = optimizer.optimize(ast)
+
+            if self.engine == 'closure':
+                # import ritardato, compiler.py importa a sua volta questo modulo
+                from compiler import compileProgram
+                return compileProgram(ast)()
+            if self.engine == 'python':
+                import transpiler
+                return transpiler.execute(compile(transpiler.transpile(ast), '<logo>', 'exec'))
+            if self.engine == 'stack':
+                from stackMachine import runProgram
+                return runProgram(ast)
+
+            ast, memory = resolve(ast)
+            walker = interpreter.fork()
+            walker.FUNCTIONS = {}
+            walker.ACTIVATION_RECORDS = [topFrame()]
+            walker.GLOBAL_MEMORY = memory
+            walker.BUDGET = self.budget
+            return walker(ast)
+
+    def run(self, code):
+        """
+        Interpreta il codice e restituisce il risultato del backend grafico, come **run**.
+        Con il motore `python` il modulo generato viene cercato nella cache del transpiler, senza effettuare il parsing.
+        Se il codice non e' valido solleva **SyntaxError**.
+        """
+        if self.engine == 'python':
+            import transpiler
+            compiled = transpiler.loadProgram(code, optimize=self.optimize)
+            with self.active():
+                transpiler.execute(compiled)
+        else:
+            ast = parse(code)
+            if ast is None:
+                raise SyntaxError("Errore di parsing")
+            self.execute(ast)
+        return self.graphics.close()
+
+#===execute===
+def execute(ast, engine=None, optimize=None):
+    """
+    Esegue l'albero con il motore indicato, se non specificato viene usato `ENGINE`,
+    in un nuovo **Interpreter** con il backend grafico di default.
+    Se `optimize`, o in sua assenza `OPTIMIZE`, e' vero l'albero viene prima ottimizzato.
+    """
+    return Interpreter(engine, optimize).execute(ast)
 
 #===run===
-def run(code):
+def run(code, engine=None, optimize=None, graphics=None):
     """
-    Inizializza un nuovo spazio di memoria per i nomi di funzioni e uno stack vuoto.
-    Interpreta il codice datogli in ingresso, e restituisce il risultato se presente.
+    Interpreta il codice datogli in ingresso con il motore indicato, e restituisce il risultato del backend grafico.
+    `graphics` e' il nome di un backend di [[graphics.py]] oppure un backend gia' creato, se non specificato
+    viene usato `graphics.BACKEND`: con `screen` la finestra viene chiusa e il risultato e' `None`,
+    con `headless` il risultato e' la display list del disegno e con `trajectory` il percorso della tartaruga
+    come array **numpy**, vedi [[trajectory.py]].
+    Il programma viene eseguito da un nuovo **Interpreter**, per controllare uscita, ingresso e numeri casuali
+    oppure eseguire piu' programmi insieme si puo' usare direttamente la classe.
     """
-    interpreter.FUNCTIONS = {}
-    interpreter.ACTIVATION_RECORDS = Stack([{}])
-    interpreter.GLOBAL_MEMORY = {}
-    interpreter(parse(code))
-    try:
-        bye()
-    except Terminator:
-        pass
+    return Interpreter(engine, optimize, graphics).run(code)
@@ -0,0 +1,314 @@
+from liblet import Tree
+
+"""
+Nodi dell'albero prodotto da [[parser.py#parse]].
+Ogni tipo di nodo e' una classe con `__slots__`: i campi sono attributi dell'oggetto invece che chiavi
+di un dizionario, cosi' l'albero occupa meno memoria e l'accesso ai campi e' piu' veloce.
+I figli sono salvati in una tupla, le foglie condividono tutte la tupla vuota.
+L'attributo di classe `TYPE` e' il nome con cui le funzioni vengono registrate in un `NodeWalker`.
+"""
+
+class Node:
+    __slots__ = ('children',)
+    TYPE = None
+    FIELDS = ()
+
+    def __init__(self, *values, children=()):
+        for field, value in zip(self.FIELDS, values):
+            setattr(self, field, value)
+        self.children = tuple(children)
+
+    def fields(self):
+        """
+        Restituisce i valori dei campi del nodo, nell'ordine di `FIELDS`.
+        """
+        return tuple(getattr(self, field) for field in self.FIELDS)
+
+    def replace(self, children):
+        """
+        Restituisce una copia del nodo con gli stessi attributi, compresi quelli aggiunti dai passi
+        di [[optimizer.py]] e [[frames.py]], e con i figli indicati.
+        """
+        node = type(self).__new__(type(self))
+        for cls in type(self).__mro__[:-1]:
+            for slot in cls.__slots__:
+                setattr(node, slot, getattr(self, slot))
+        node.children = tuple(children)
+        return node
+
+    def __repr__(self):
+        fields = ', '.join(field + '=' + repr(getattr(self, field)) for field in self.FIELDS)
+        children = ', '.join(repr(child) for child in self.children)
+        return type(self).__name__ + '(' + fields + (': ' + children if children else '') + ')'
+
+class Program(Node):
+    __slots__ = ()
+    TYPE = 'prog'
+
+class Line(Node):
+    __slots__ = ()
+    TYPE = 'line'
+
+class Block(Node):
+    __slots__ = ()
+    TYPE = 'block'
+
+class Print(Node):
+    __slots__ = ()
+    TYPE = 'pr'
+
+class Make(Node):
+    """
+    Il primo figlio e' il nome della variabile, il secondo il valore.
+    `slot` e' lo slot della variabile nella memoria globale, assegnato da [[frames.py#resolve]] se il nome e' costante.
+    """
+    __slots__ = ('slot',)
+    TYPE = 'make'
+
+    def __init__(self, *values, children=()):
+        Node.__init__(self, *values, children=children)
+        self.slot = None
+
+class Primitive(Node):
+    """
+    Operazione aritmetica o logica, `name` e' la chiave in `DT_OPERATORS`.
+    `function` e' la funzione dell'operazione, legata al nodo da [[optimizer.py]], altrimenti `None`.
+    """
+    __slots__ = ('name', 'function')
+    TYPE = 'arithmBoolOperations'
+    FIELDS = ('name',)
+
+    def __init__(self, *values, children=()):
+        Node.__init__(self, *values, children=children)
+        self.function = None
+
+class Graphic(Node):
+    """
+    Comando grafico, `name` e' la chiave in `DT_GRAPHICS`.
+    """
+    __slots__ = ('name',)
+    TYPE = 'graphic'
+    FIELDS = ('name',)
+
+class Sign(Node):
+    """
+    Segno applicato all'unico figlio, `sign` vale `+` oppure `-`.
+    `factor` e' il fattore moltiplicativo corrispondente al segno.
+    """
+    __slots__ = ('sign', 'factor')
+    TYPE = 'sign'
+    FIELDS = ('sign',)
+
+    def __init__(self, *values, children=()):
+        Node.__init__(self, *values, children=children)
+        self.factor = int(self.sign + '1')
+
+class BinOp(Node):
+    """
+    Operazione infissa tra i due figli, `op` e' la chiave dell'operatore in `DT_OPERATORS`.
+    `function` e' la funzione dell'operatore, legata al nodo da [[optimizer.py]], altrimenti `None`.
+    """
+    __slots__ = ('op', 'function')
+    TYPE = 'operation'
+    FIELDS = ('op',)
+
+    def __init__(self, *values, children=()):
+        Node.__init__(self, *values, children=children)
+        self.function = None
+
+class Number(Node):
+    """
+    Valore numerico, `value` e' il testo del numero.
+    """
+    __slots__ = ('value',)
+    TYPE = 'number'
+    FIELDS = ('value',)
+
+class Constant(Node):
+    """
+    Valore gia' calcolato da [[optimizer.py]]: un numero decodificato, un boolean
+    oppure il risultato di un espressione costante.
+    """
+    __slots__ = ('value',)
+    TYPE = 'constant'
+    FIELDS = ('value',)
+
+class Word(Node):
+    """
+    Stringa usata come nome di variabile o di procedura.
+    """
+    __slots__ = ('value',)
+    TYPE = 'STRING'
+    FIELDS = ('value',)
+
+class StringLiteral(Node):
+    __slots__ = ('value',)
+    TYPE = 'STRINGLITERAL'
+    FIELDS = ('value',)
+
+class Boolean(Node):
+    __slots__ = ('value',)
+    TYPE = 'Boolean_'
+    FIELDS = ('value',)
+
+class Deref(Node):
+    """
+    Il figlio e' l'espressione che produce il nome della variabile.
+    Se il nome e' costante [[frames.py#resolve]] assegna `scope`, che vale `LOCAL` per un parametro
+    della procedura e `GLOBAL` per una variabile globale, e `slot`, l'indice della variabile nel frame o nella memoria globale.
+    """
+    __slots__ = ('scope', 'slot')
+    TYPE = 'deref'
+
+    def __init__(self, *values, children=()):
+        Node.__init__(self, *values, children=children)
+        self.scope = None
+        self.slot = None
+
+class ReadWord(Node):
+    __slots__ = ()
+    TYPE = 'rw'
+
+class If(Node):
+    __slots__ = ()
+    TYPE = 'ifState'
+
+class IfElse(Node):
+    __slots__ = ()
+    TYPE = 'ifelseState'
+
+class Repeat(Node):
+    __slots__ = ()
+    TYPE = 'repeatState'
+
+class TurtleRepeat(Node):
+    """
+    `REPEAT` il cui corpo contiene solo movimenti della tartaruga con parametri invarianti, prodotto da [[optimizer.py]].
+    I figli sono gli stessi di `Repeat`, `moves` e' la lista dei metodi del backend grafico corrispondenti ai comandi del corpo.
+    """
+    __slots__ = ('moves',)
+    TYPE = 'turtleRepeat'
+    FIELDS = ('moves',)
+
+class While(Node):
+    __slots__ = ()
+    TYPE = 'whileState'
+
+class Output(Node):
+    __slots__ = ()
+    TYPE = 'opState'
+
+class Stop(Node):
+    __slots__ = ()
+    TYPE = 'stopState'
+
+class Ask(Node):
+    """
+    Il primo figlio e' la tartaruga o il blocco delle tartarughe a cui vengono inviati i comandi del secondo figlio,
+    come descritto in [[interpreter.py#ask]].
+    """
+    __slots__ = ()
+    TYPE = 'askState'
+
+class ProcDecl(Node):
+    """
+    Dichiarazione di procedura, i figli sono le linee del corpo.
+    `frames` e' il `FramePool` della procedura, assegnato da [[frames.py#resolve]].
+    `cache` e' vero se le chiamate della procedura possono essere ridisegnate da [[procedureCache.py]], assegnato da [[optimizer.py]].
+    """
+    __slots__ = ('name', 'params', 'frames', 'cache')
+    TYPE = 'procedureDeclaration'
+    FIELDS = ('name', 'params')
+
+    def __init__(self, *values, children=()):
+        Node.__init__(self, *values, children=children)
+        self.frames = None
+        self.cache = False
+
+class ProcCall(Node):
+    """
+    Invocazione di procedura, i figli sono i parametri attuali.
+    Se la chiamata e' in posizione di coda [[frames.py#resolve]] assegna `tail`, definito in [[tailcalls.py]].
+    """
+    __slots__ = ('name', 'tail')
+    TYPE = 'procedureInvocation'
+    FIELDS = ('name',)
+
+    def __init__(self, *values, children=()):
+        Node.__init__(self, *values, children=children)
+        self.tail = None
+
+"""
+Dispatch table che associa ad ogni `TYPE` la classe del nodo corrispondente.
+"""
+NODE_TYPES = {cls.TYPE: cls for cls in Node.__subclasses__()}
+
+"""
+Dispatch table usata dal parser per i nodi delle strutture di controllo, indicizzata con il nome del comando.
+"""
+CONTROL_STRUCTURES = {
+    'if':     If,
+    'ifelse': IfElse,
+    'repeat': Repeat,
+    'while':  While,
+    'op':     Output,
+    'stop':   Stop,
+    'ask':    Ask
+}
+
+class NodeWalker:
+    """
+    Equivalente di `AnnotatedTreeWalker` di liblet per gli alberi composti da `Node`:
+    la funzione registrata viene scelta in base all'attributo `TYPE` del nodo.
+    Le funzioni sono invocate con il walker come primo argomento e il nodo come secondo.
+    """
+
+    @staticmethod
+    def RAISE_CATCHALL(visit, node):
+        raise TypeError("Nessuna funzione registrata per il nodo `" + str(node.TYPE) + "`")
+
+    def __init__(self, catchall_func=None):
+        self.catchall_func = catchall_func if catchall_func is not None else NodeWalker.RAISE_CATCHALL
+        self.dispatch_table = {}
+
+    def register(self, func, name=None):
+        self.dispatch_table[func.__name__ if name is None else name] = func
+        return func
+
+    def fork(self):
+        """
+        Restituisce un nuovo walker con la stessa dispatch table, su cui salvare lo stato di una singola visita:
+        visite diverse, anche in thread diversi, non condividono gli attributi assegnati al walker.
+        """
+        walker = NodeWalker(self.catchall_func)
+        walker.dispatch_table = self.dispatch_table
+        return walker
+
+    def __call__(self, node):
+        return self.dispatch_table.get(node.TYPE, self.catchall_func)(self, node)
+
+#===encode===
+def encode(node):
+    """
+    Trasforma l'albero in una struttura di tuple annidate `(TYPE, campi, figli)` serializzabile con `marshal`.
+    """
+    return (node.TYPE, node.fields(), tuple(encode(child) for child in node.children))
+
+#===decode===
+def decode(data):
+    """
+    Ricostruisce l'albero a partire dalla struttura prodotta da **encode**.
+    """
+    kind, fields, children = data
+    return NODE_TYPES[kind](*fields, children=[decode(child) for child in children])
+
+#===to tree===
+def toTree(node):
+    """
+    Converte l'albero in un `Tree` di liblet con la radice di ogni nodo in un dizionario,
+    utile per visualizzare l'albero e per confrontarlo con la rappresentazione precedente.
+    """
+    root = {'type': node.TYPE}
+    for field in node.FIELDS:
+        root[field] = getattr(node, field)
+    return Tree(root, [toTree(child) for child in node.children])
@@ -30,6 +30,11 @@ graphic:
 	| setpencolor
 	| setpensize
 	| clean
+	| setspeed
+	| refresh
+	| createturtles
+	| tell
+	| tellall
     ;
 
 controlStructure:
@@ -39,6 +44,7 @@ controlStructure:
 	| while_	
 	| stop	
 	| output
+	| ask
 	;
 
 arithmBoolOperations:
@@ -236,6 +242,18 @@ pu: ('PU' | 'pu' | 'PENUP' | 'penup');
 
 pd: ('PD' | 'pd' | 'PENDOWN' | 'pendown');
 
+/* SCREEN REFRESH */
+setspeed: ('SETSPEED' | 'setspeed') EOL* expression;
+
+refresh: ('REFRESH' | 'refresh');
+
+/* MULTIPLE TURTLES */
+createturtles: ('CREATETURTLES' | 'createturtles' | 'CRT' | 'crt') EOL* expression;
+
+tell: ('TELL' | 'tell') EOL* (expression | block);
+
+tellall: ('TELLALL' | 'tellall');
+
 /****************** WORKSPACE MANAGEMENT *******************/
 /* VARIABLE DEFINITION */
 make: ('MAKE' | 'make') (STRINGLITERAL | deref) EOL* (expression  | graphic);
@@ -273,6 +291,8 @@ stop: ('STOP' | 'stop');
 
 output: ('OUTPUT' | 'output' | 'OP' | 'op' ) EOL* (expression | graphic);
 
+ask: ('ASK' | 'ask') EOL* (expression | block) EOL* block;
+
 /****************** PRIMITIVE STRUCTURE ********************/
 block:
 	'[' EOL* (( graphic | expression | sys) EOL* )+ EOL* ']';
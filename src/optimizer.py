@@ -0,0 +1,298 @@
+from logoAst import (NodeWalker, Constant, BinOp, Primitive, Sign, Word, StringLiteral, Deref, Block, Graphic, TurtleRepeat,
+                     Line, If, IfElse, Repeat, While, Stop, ProcDecl, ProcCall)
+from parser import parse
+from interpreter import DT_OPERATORS, DT_MOVES
+from frames import _staticName
+import sys
+import threading
+
+"""
+Passo di ottimizzazione eseguito tra [[parser.py#parse]] e l'esecuzione del programma.
+Restituisce un nuovo albero, quello ricevuto non viene modificato:
+
+    - i numeri vengono decodificati una sola volta e diventano nodi `Constant`, cosi' come i boolean
+    - le espressioni con operandi costanti (`sum 2 3`, `3 * 4 + 1`, ...) vengono calcolate e sostituite da un `Constant`
+    - ai nodi `BinOp` e `Primitive` viene legata la funzione di `DT_OPERATORS` che li implementa
+    - i `REPEAT` il cui corpo contiene solo movimenti della tartaruga con parametri invarianti diventano `TurtleRepeat`,
+      che i motori eseguono con un solo comando del backend grafico, come descritto in [[interpreter.py#turtle repeat]]
+    - le procedure il cui disegno dipende solo dai parametri e dallo stato iniziale della tartaruga vengono segnate con `cache`,
+      cosi' che i motori possano ridisegnare le chiamate ripetute con la cache di [[procedureCache.py]]
+
+Un espressione viene calcolata solo se il calcolo non solleva eccezioni e produce un valore,
+altrimenti resta invariata e l'eventuale errore viene segnalato durante l'esecuzione, come senza ottimizzazione.
+Anche le espressioni con interi troppo grandi restano invariate, vedi `MAX_FOLD_BITS`.
+"""
+
+"""
+Versione dell'ottimizzazione, fa parte della chiave della cache di [[transpiler.py#load program]].
+"""
+OPTIMIZER_VERSION = 4
+
+"""
+Operazioni che non vengono mai calcolate in anticipo perche' hanno effetti collaterali.
+"""
+IMPURE = ['random', 'rerandom']
+
+"""
+Comandi grafici ammessi nelle procedure con `cache`: il loro effetto dipende solo dalla posizione, dalla direzione
+e dalla penna della tartaruga, non dalla loro posizione assoluta.
+"""
+CACHED_GRAPHICS = ['fd', 'bk', 'rt', 'lt', 'arc', 'pu', 'pd', 'setpc', 'setpensize']
+
+"""
+Numero massimo di bit degli interi calcolati in anticipo. Un operazione con un operando o un risultato piu' grande,
+o un `power` il cui risultato lo sarebbe, resta nell'albero: anche in un ramo mai eseguito verrebbe calcolata
+prima dell'avvio del programma, fuori dai limiti del [[budget.py#budget]] e dal tempo massimo di un esecuzione.
+"""
+MAX_FOLD_BITS = 1024
+
+#===rebuild===
+def _rebuild(visit, ast):
+    """
+    Copia il nodo ottimizzando ricorsivamente i figli.
+    """
+    return ast.replace([visit(child) for child in ast.children])
+
+optimizer = NodeWalker(_rebuild)
+
+#===numbers===
+def _isNumber(value):
+    return not isinstance(value, bool) and isinstance(value, (int, float))
+
+#===constants===
+def _constants(children):
+    """
+    Restituisce i valori dei figli se sono tutti `Constant`, altrimenti `None`.
+    """
+    if all(isinstance(child, Constant) for child in children):
+        return [child.value for child in children]
+    return None
+
+#===too large===
+def _tooLarge(value):
+    return isinstance(value, int) and value.bit_length() > MAX_FOLD_BITS
+
+#===expensive===
+def _expensive(name, values):
+    """
+    Vero se `power` tra due interi produrrebbe un intero di piu' di `MAX_FOLD_BITS` bit:
+    e' l'unica operazione il cui costo non e' limitato dalla dimensione degli operandi.
+    """
+    if name != 'power' or len(values) != 2 or not all(isinstance(ele, int) for ele in values):
+        return False
+    base, exponent = values
+    return exponent > 0 and abs(base).bit_length() * exponent > MAX_FOLD_BITS
+
+#===fold===
+def _fold(node, function, values=()):
+    """
+    Sostituisce il nodo con il valore calcolato da `function` a partire dagli operandi `values`.
+    Se il calcolo solleva un eccezione o il valore e' `None` restituisce il nodo invariato,
+    cosi' come se un operando o il valore sono interi troppo grandi.
+    """
+    if any(_tooLarge(ele) for ele in values):
+        optimizer.STATS['skipped'] += 1
+        return node
+    try:
+        value = function()
+    except Exception:
+        return node
+    if value is None:
+        return node
+    if _tooLarge(value):
+        optimizer.STATS['skipped'] += 1
+        return node
+    optimizer.STATS['folded'] += 1
+    return Constant(value)
+
+#===number===
+@optimizer.register
+def number(visit, ast):
+    optimizer.STATS['decoded'] += 1
+    if '.' in ast.value:
+        return Constant(float(ast.value))
+    return Constant(int(ast.value))
+
+@optimizer.register
+def Boolean_(visit, ast):
+    optimizer.STATS['decoded'] += 1
+    return Constant(ast.value)
+
+#===sign===
+@optimizer.register
+def sign(visit, ast):
+    node = Sign(ast.sign, children=[visit(ast.children[0])])
+    values = _constants(node.children)
+    if values is None:
+        return node
+    return _fold(node, lambda: node.factor * values[0], values)
+
+#===operations===
+@optimizer.register
+def operation(visit, ast):
+    """
+    Come `operation` definita in [[interpreter.py#operations]].
+    """
+    node = BinOp(ast.op, children=[visit(child) for child in ast.children])
+    node.function = DT_OPERATORS.get(ast.op)
+    optimizer.STATS['bound'] += 1
+
+    values = _constants(node.children)
+    if values is None:
+        return node
+
+    def value():
+        if not all(_isNumber(ele) for ele in values):
+            raise TypeError("In un espressione gli operandi devono essere int o float")
+        return node.function(values[0], values[1])
+    return _fold(node, value, values)
+
+#===logic===
+def _logic(name, values):
+    """
+    Calcola un connettivo logico con operandi costanti, come `_and`, `_or` e `_not` definite in [[interpreter.py]].
+    """
+    if not all(isinstance(ele, bool) for ele in values):
+        raise TypeError("Gli input dei connettivi logici devono essere dei boolean")
+    if name == 'and':
+        return all(values)
+    if name == 'or':
+        return any(values)
+    return not values[0]
+
+#===arithmetic and boolean operations===
+@optimizer.register
+def arithmBoolOperations(visit, ast):
+    """
+    Come `arithmBoolOperations` definita in [[interpreter.py#arithmetic and boolean operations]].
+    Le operazioni in `IMPURE` non vengono mai calcolate.
+    """
+    node = Primitive(ast.name, children=[visit(child) for child in ast.children])
+    values = _constants(node.children)
+
+    if ast.name in ['and', 'or', 'not']:
+        if values is None:
+            return node
+        return _fold(node, lambda: _logic(ast.name, values))
+
+    node.function = DT_OPERATORS.get(ast.name)
+    optimizer.STATS['bound'] += 1
+    if values is None or ast.name in IMPURE:
+        return node
+    if _expensive(ast.name, values):
+        optimizer.STATS['skipped'] += 1
+        return node
+
+    def value():
+        if not all(_isNumber(ele) for ele in values):
+            raise TypeError("In un espressione gli operandi devono essere int o float")
+        return node.function(values)
+    return _fold(node, value, values)
+
+#===invariant===
+def _isInvariant(ast):
+    """
+    Vero se l'espressione ha lo stesso valore ad ogni iterazione di un corpo che contiene solo movimenti della tartaruga,
+    che non modificano le variabili: costanti, variabili e operazioni che non sono in `IMPURE`.
+    """
+    if isinstance(ast, (Constant, Word, StringLiteral)):
+        return True
+    if isinstance(ast, (Deref, BinOp, Sign)) or (isinstance(ast, Primitive) and ast.name not in IMPURE):
+        return all(_isInvariant(child) for child in ast.children)
+    return False
+
+#===repeat===
+@optimizer.register
+def repeatState(visit, ast):
+    """
+    Un `REPEAT` il cui corpo contiene solo comandi di `DT_MOVES` con parametri invarianti diventa un `TurtleRepeat`.
+    """
+    node = _rebuild(visit, ast)
+    body = node.children[1]
+    if not isinstance(body, Block) or not body.children:
+        return node
+    for child in body.children:
+        if not (isinstance(child, Graphic) and child.name in DT_MOVES and len(child.children) == 1 and _isInvariant(child.children[0])):
+            return node
+    optimizer.STATS['vectorized'] += 1
+    return TurtleRepeat([DT_MOVES[child.name] for child in body.children], children=node.children)
+
+#===cacheable===
+def _drawingOnly(ast, params, calls):
+    """
+    Vero se il nodo usa solo i parametri `params`, costanti, operazioni che non sono in `IMPURE`, strutture di controllo,
+    `STOP` e comandi di `CACHED_GRAPHICS`. I nomi delle procedure chiamate vengono aggiunti a `calls`.
+    """
+    if isinstance(ast, Deref):
+        return _staticName(ast.children[0]) in params
+    if isinstance(ast, Primitive):
+        ok = ast.name not in IMPURE
+    elif isinstance(ast, Graphic):
+        ok = ast.name in CACHED_GRAPHICS
+    elif isinstance(ast, ProcCall):
+        calls.add(ast.name)
+        ok = True
+    else:
+        ok = isinstance(ast, (Line, Block, Constant, Word, StringLiteral, Sign, BinOp, If, IfElse, Repeat, TurtleRepeat, While, Stop))
+    return ok and all(_drawingOnly(child, params, calls) for child in ast.children)
+
+def _declarations(ast):
+    if isinstance(ast, ProcDecl):
+        yield ast
+    for child in ast.children:
+        yield from _declarations(child)
+
+def _markCacheable(ast):
+    """
+    Assegna `cache` alle procedure il cui corpo soddisfa **_drawingOnly** e che chiamano solo procedure con `cache`.
+    Una procedura dichiarata piu' volte non viene mai segnata, perche' le chiamate non sapranno quale dichiarazione eseguono.
+    """
+    declarations = list(_declarations(ast))
+    names = [declaration.name for declaration in declarations]
+    calls = {}
+    for declaration in declarations:
+        callees = set()
+        if names.count(declaration.name) == 1 and _drawingOnly(Block(children=declaration.children), set(declaration.params), callees):
+            calls[declaration.name] = callees
+
+    # si tolgono le procedure che chiamano procedure senza `cache` finche' l'insieme non cambia piu'
+    changed = True
+    while changed:
+        changed = False
+        for name, callees in list(calls.items()):
+            if not callees <= calls.keys():
+                del calls[name]
+                changed = True
+
+    for declaration in declarations:
+        declaration.cache = declaration.name in calls
+    optimizer.STATS['cached'] = len(calls)
+
+"""
+I contatori sono un attributo di `optimizer`, quindi un solo thread alla volta puo' ottimizzare un albero.
+"""
+LOCK = threading.Lock()
+
+#===optimize===
+def optimize(ast):
+    """
+    Restituisce l'albero ottimizzato, i contatori dell'ultima ottimizzazione sono disponibili tramite **report**.
+    """
+    with LOCK:
+        optimizer.STATS = {'decoded': 0, 'folded': 0, 'skipped': 0, 'bound': 0, 'vectorized': 0, 'cached': 0}
+        ast = optimizer(ast)
+        _markCacheable(ast)
+        return ast
+
+#===report===
+def report():
+    """
+    Restituisce il numero di letterali decodificati, di nodi calcolati, di calcoli evitati per `MAX_FOLD_BITS`, di operatori legati,
+    di `REPEAT` trasformati in `TurtleRepeat` e di procedure con `cache` dall'ultima ottimizzazione.
+    """
+    return dict(optimizer.STATS)
+
+if __name__ == '__main__':
+    with open(sys.argv[1]) as inf:
+        optimize(parse(inf.read()))
+    print(report())
@@ -1,4 +1,7 @@
-from liblet import ANTLR, Tree, AnnotatedTreeWalker
+from liblet import AnnotatedTreeWalker
+from grammarCache import loadGrammar, grammarHash
+from astCache import ASTCache
+from logoAst import *
 import os
 
 class UndefinedNodeException(Exception):
@@ -7,9 +10,16 @@ class UndefinedNodeException(Exception):
 with open('logoGrammar.g4') as inf:
         grammar = inf.read()
 
-ANTLR_GRAMMAR = ANTLR(grammar)
+ANTLR_GRAMMAR = loadGrammar(grammar)
 logoToAst = AnnotatedTreeWalker('name')
 
+"""
+Versione della trasformazione `logoToAst`, va incrementata ogni volta che cambia la forma dell'albero prodotto
+cosi' che gli alberi salvati nella cache di `parse` non vengano piu' utilizzati.
+"""
+LOGO_TO_AST_VERSION = 2
+AST_CACHE = ASTCache(grammarHash(grammar) + ':' + str(LOGO_TO_AST_VERSION))
+
 """
 Dispatch table che viene usata per standardizzare i nomi dei comandi che hanno anche un abbreviazione.
 """
@@ -26,6 +36,7 @@ DT_COMMAND = {
     'setpencolor': 'setpc',
     'penup': 'pu',
     'pendown': 'pd',
+    'createturtles': 'crt',
     'output': 'op',
     'less?': 'lessp',
     'greater?': 'greaterp',
@@ -39,10 +50,6 @@ DT_COMMAND = {
 def children_filter(key,filter_elem, children):
     return list(filter(lambda child: child.root[key] not in filter_elem, children))
 
-OPERATORSNAME_TYPE = 'Op'
-NAME_TYPE = 'STRING'
-ARBOOLOPERATIONS_TYPE = 'arithmBoolOperations'
-
 #===prog===
 @logoToAst.register
 def prog(visit, tree):
@@ -51,7 +58,7 @@ def prog(visit, tree):
     Ogni figlio rappresenta una linea del programma
     La funzione ripulisce da tutti i nodi non necessari e restituisce l'albero che ha per figli la visita ricorsiva di ognuno di essi.
     """
-    return Tree({'type': tree.root['name']}, [visit(child) for child in tree.children if child.root["name"] != "EOL"])
+    return Program(children=[visit(child) for child in tree.children if child.root["name"] != "EOL"])
 
 #===line===
 @logoToAst.register
@@ -60,7 +67,7 @@ def line(visit, tree):
     Ogni figlio di line rappresenta una linea del programma.
     Una line può contenere più espressioni o comandi e sono reppresentati dai figli.
     """
-    return Tree({'type': tree.root['name']},[visit(child) for child in tree.children])
+    return Line(children=[visit(child) for child in tree.children])
 
 # ===arithmetic and boolean operations===
 @logoToAst.register
@@ -77,7 +84,7 @@ def arithmBoolOperations(visit, tree):
 
     name = DT_COMMAND.get(children[0].root['name'].lower()) if children[0].root['name'].lower() in DT_COMMAND.keys() else children[0].root['name'].lower()
 
-    return Tree({'type': tree.root['name'], 'name': name}, [visit(child) for child in children[1:]])
+    return Primitive(name, children=[visit(child) for child in children[1:]])
 
 #===control structure===
 @logoToAst.register
@@ -85,15 +92,14 @@ def controlStructure(visit, tree):
     """
     Definisce tutte le strutture di controllo.
     I nomi delle strutture di controllo che hanno delle abbreviazioni vengono standardizzati tramite la dispatch table.
-    Al nome di ognuna di essi viene agginta la parola **State** per non creare conflitto con python.
-    L'albero è definito in base al comando.
+    La classe del nodo viene scelta in base al comando tramite `CONTROL_STRUCTURES` definita in [[logoAst.py]].
     """
     child = tree.children[0]
     children = children_filter('name', ['(',')', 'EOL'], child.children)
 
     name = DT_COMMAND.get(children[0].root['name'].lower()) if children[0].root['name'].lower() in DT_COMMAND.keys() else children[0].root['name'].lower()
 
-    return Tree({'type': name+"State"}, [visit(child) for child in children[1:]])
+    return CONTROL_STRUCTURES[name](children=[visit(child) for child in children[1:]])
 
 #===graphic===
 @logoToAst.register
@@ -108,7 +114,7 @@ def graphic(visit, tree):
 
     name = DT_COMMAND.get(children[0].root['name'].lower()) if children[0].root['name'].lower() in DT_COMMAND.keys() else children[0].root['name'].lower()
 
-    return Tree({'type': tree.root['name'], 'name': name}, [visit(child) for child in children[1:]])
+    return Graphic(name, children=[visit(child) for child in children[1:]])
 
 #===sys===
 @logoToAst.register
@@ -124,8 +130,8 @@ def sys(visit, tree):
 
     name = DT_COMMAND.get(children[0].root['name'].lower()) if children[0].root['name'].lower() in DT_COMMAND.keys() else children[0].root['name'].lower()
 
-    return Tree({'type': name}, [visit(child) for child in children[1:]])
-    
+    return (Print if name == 'pr' else Make)(children=[visit(child) for child in children[1:]])
+
 #===expression===
 @logoToAst.register
 def expression(visit, tree):
@@ -152,25 +158,30 @@ def expression(visit, tree):
     Non tutte le operazioni tra i componenti delle espressioni sono lecite.
     Sono presenti controlli a tal proposito che lanciano un eccezione di **TypeError** se vengono fatte
     operazioni non permesse tra i vari tipi.
+
+    L'espressione non produce un nodo proprio: un operazione tra due espressioni diventa un nodo `BinOp`,
+    un espressione con segno un nodo `Sign`, altrimenti viene restituita direttamente la visita dell'unico figlio.
     """
     sign = []
     children = children_filter('name',['(',')', 'EOL'], tree.children)
 
     for child in children:
-        if child.root['name'] in ['+', '-']: 
+        if child.root['name'] in ['+', '-']:
             sign.append(child.root['name'])
         else: break
 
-    if len(sign) != 0: 
+    if len(sign) != 0:
         if sign.count('-') % 2 != 0:
             sign = '-'
         else:
             sign = '+'
 
-        return Tree({'type': tree.root['name'], 'sign': sign}, [visit(child) for child in children if child.root['name'] not in ['+', '-']])
+        return Sign(sign, children=[visit(child) for child in children if child.root['name'] not in ['+', '-']])
 
+    if len(children) == 3:
+        return BinOp(visit(children[1]), children=[visit(children[0]), visit(children[2])])
 
-    return Tree({'type': tree.root['name']}, [visit(child) for child in children])
+    return visit(children[0])
 
 #===number===
 @logoToAst.register
@@ -179,16 +190,16 @@ def number(visit, tree):
     Nodo che rappresenta un valore numerico che puo' essere o `INT` oppure `FLOAT`.
     Non ha nessun figlio.
     """
-    return Tree({'type': tree.children[0].root['name'], 'value': tree.children[0].root['value']})
+    return Number(tree.children[0].root['value'])
 
 #===muldivOperator
 @logoToAst.register
 def muldivoperators(visit, tree): 
     """
     Rappresenta gli operatori di **moltipolicazione** e **divisione**.
-    Non ha nessun figlio.
+    Restituisce il valore dell'operatore, che viene salvato nel nodo `BinOp`.
     """
-    return Tree({'type': OPERATORSNAME_TYPE, 'value': tree.children[0].root['value']})
+    return tree.children[0].root['value']
 
 
 #===addSubOperator
@@ -196,9 +207,9 @@ def muldivoperators(visit, tree):
 def addsuboperators(visit, tree):
     """
     Rappresenta gli operatori di **somma** e **sottrazione**.
-    Non ha nessun figlio.
+    Restituisce il valore dell'operatore, che viene salvato nel nodo `BinOp`.
     """
-    return Tree({'type': OPERATORSNAME_TYPE, 'value': tree.children[0].root['value']})
+    return tree.children[0].root['value']
 
 #===stringliteral===
 @logoToAst.register
@@ -207,7 +218,7 @@ def STRINGLITERAL(visit, tree):
     Rappresenta una stringa.
     Il valore all interno del nodo viene salvato senza il carattere `"`
     """
-    return Tree({'type': tree.root['name'], 'value': tree.root['value'].replace('"', '')})
+    return StringLiteral(tree.root['value'].replace('"', ''))
 
 #===value===
 @logoToAst.register
@@ -226,19 +237,18 @@ def procedureDeclaration(visit, tree):
     Come campo del nodo c'è un array con i nomi dei parametri.
     I figli invece rappresentano il corpo della funzione.
     """
-    children = children_filter('name', ['EOL'], tree.children)
-    children = [visit(child) for child in children[1:-1]]
-    name = children[0].root['value']
-    params = [child.root['value'] for child in children if child.root['type'] == 'parameterDeclarations']
-    return Tree({'type': tree.root['name'], 'name': name, 'params': params}, [child for child in children if child.root['type'] != 'parameterDeclarations'])
+    children = children_filter('name', ['EOL'], tree.children)[1:-1]
+    name = visit(children[0]).value
+    params = [visit(child).value for child in children[1:] if child.root['name'] == 'parameterDeclarations']
+    return ProcDecl(name, params, children=[visit(child) for child in children[1:] if child.root['name'] != 'parameterDeclarations'])
 
 #===parameterDeclaration===
 @logoToAst.register
 def parameterDeclarations(visit, tree):
     """
-    Rappresenta la dichiarazione dei parametri della funzione
+    Rappresenta la dichiarazione dei parametri della funzione, restituisce il nome del parametro.
     """
-    return Tree({'type': tree.root['name'], 'value': visit(tree.children[1]).root['value']})
+    return visit(tree.children[1])
     
 #===procedureInvocation===
 @logoToAst.register
@@ -249,7 +259,7 @@ def procedureInvocation(visit, tree):
     """
     children = children_filter('name', ['(',')', 'EOL'], tree.children)
 
-    return Tree({'type': tree.root['name'], 'name': children[0].children[0].root['value']}, [visit(child) for child in children[1:]])
+    return ProcCall(children[0].children[0].root['value'], children=[visit(child) for child in children[1:]])
 
 #===parameters===
 @logoToAst.register
@@ -267,27 +277,16 @@ def block(visit, tree):
     Definisce un blocco di istruzioni.
     Ogni figlio del blocco rappresenta un istruzione.
     """
-    return Tree({'type': tree.root['name']}, [visit(child) for child in tree.children[1:-1] if child.root['name'] != 'EOL'])
-
-#===comparison===
-@logoToAst.register
-def comparison(visit, tree):
-    """
-    Definisce l'operazione di comparazione tra due valori comparabili.
-    Vengono eliminatei i nodi rappresentanti le parentesi se presenti.
-    Contiene tre figli i quali rappresentano l'operazione e i due operandi.
-    """
-    children = children_filter('name', ['(',')','EOL'], tree.children)
-
-    return Tree({'type': tree.root['name']}, [visit(child) for child in children])
+    return Block(children=[visit(child) for child in tree.children[1:-1] if child.root['name'] != 'EOL'])
 
 #===comparisonOperator===
 @logoToAst.register
 def comparisonOperator(visit, tree):
     """
     Definisce gli operatori booleani di comparazione `[>, <, =, >=, <=]`
+    Restituisce il valore dell'operatore, che viene salvato nel nodo `BinOp`.
     """
-    return Tree({'type': tree.root['name'], 'value': tree.children[0].root['name']})
+    return tree.children[0].root['name']
 
 #===boolean===
 @logoToAst.register
@@ -299,9 +298,9 @@ def Boolean_(visit, tree):
     """
     value = tree.root['value'].replace('"', '').lower()
     if (value == 'false'):
-        return Tree({'type': tree.root['name'], 'value': False})
+        return Boolean(False)
     else:
-        return Tree({'type': tree.root['name'], 'value': True})
+        return Boolean(True)
 
 #===deref===
 @logoToAst.register
@@ -311,9 +310,9 @@ def deref(visit, tree):
     Il nodo padre ha sempre un figlio che rappresenta il nome della variabile da referenziare
     """
     if (tree.children[0].root['name'] == ':'):
-        return Tree({'type': tree.root['name']}, [visit(tree.children[1].children[0])])
-    
-    return Tree({'type': tree.root['name']}, [visit(tree.children[1])])
+        return Deref(children=[visit(tree.children[1].children[0])])
+
+    return Deref(children=[visit(tree.children[1])])
 
 #===readword===
 @logoToAst.register
@@ -321,11 +320,11 @@ def rw(visit, tree):
     """
     Definisce il nome dell procedure Read Word
     """
-    return Tree({'type': tree.root['name']})
+    return ReadWord()
 
 @logoToAst.register
 def name(visit, tree):
-    return Tree({'type': NAME_TYPE, 'value': tree.children[0].root['value']})
+    return Word(tree.children[0].root['value'])
 
 #===and===
 @logoToAst.register
@@ -336,7 +335,7 @@ def and_(visit, tree):
     """
     children = children_filter('name', ['(',')', 'EOL'], tree.children)
     
-    return Tree({'type': ARBOOLOPERATIONS_TYPE, 'name': DT_COMMAND.get(children[0].root['name'].lower())}, [visit(child) for child in children[1:]])
+    return Primitive(DT_COMMAND.get(children[0].root['name'].lower()), children=[visit(child) for child in children[1:]])
 
 #===or===
 @logoToAst.register
@@ -347,7 +346,7 @@ def or_(visit, tree):
     """
     children = children_filter('name', ['(',')', 'EOL'],tree.children)
     
-    return Tree({'type': ARBOOLOPERATIONS_TYPE, 'name': DT_COMMAND.get(children[0].root['name'].lower())}, [visit(child) for child in children[1:]])
+    return Primitive(DT_COMMAND.get(children[0].root['name'].lower()), children=[visit(child) for child in children[1:]])
 
 #===not===
 @logoToAst.register
@@ -356,7 +355,7 @@ def not_(visit, tree):
     Rappresenta l'operazione logica di and, il figlo rappresenta il parametro dell'istruzione.
     """
     children = tree.children
-    return Tree({'type': ARBOOLOPERATIONS_TYPE, 'name': DT_COMMAND.get(children[0].root['name'].lower())}, [visit(child) for child in children[1:]])
+    return Primitive(DT_COMMAND.get(children[0].root['name'].lower()), children=[visit(child) for child in children[1:]])
 
 #===string===
 @logoToAst.register
@@ -364,14 +363,25 @@ def STRING(visit, tree):
     """
     Definisce una stringa, il valore viene salvato all'interno del nodo senza il carattere `"`
     """
-    return Tree({'type': tree.root['name'], 'value': tree.root['value'].replace('"', '')})
+    return Word(tree.root['value'].replace('"', ''))
 
 #===parse===
-def parse(code):
+def parse(code, cache=True):
     """
     La funzione prende in input il codice **logo** da parsare, e ristruttura l'albero di parsing generato da ANTLR che restituira' come output.
+    Se `cache` e' vero l'albero viene cercato prima in `AST_CACHE` e, se non presente, salvato dopo il parsing.
     """
+    if cache:
+        tree = AST_CACHE.get(code)
+        if tree is not None:
+            return tree
+
     try:
-        return logoToAst(ANTLR_GRAMMAR.tree(code, 'prog'))
+        tree = logoToAst(ANTLR_GRAMMAR.tree(code, 'prog'))
     except Exception:
         print("---Errore di parsing---")
+        return
+
+    if cache:
+        AST_CACHE.put(code, tree)
+    return tree
@@ -0,0 +1,158 @@
+from collections import OrderedDict
+import os
+import sys
+
+"""
+Cache dei disegni delle procedure.
+Una procedura segnata da [[optimizer.py#cacheable]] disegna sempre gli stessi tratti, nel sistema di riferimento della tartaruga,
+quando viene chiamata con gli stessi parametri e con la penna nello stesso stato: non legge variabili globali,
+non usa comandi assoluti come `setxy` o `home`, non stampa, non restituisce valori e chiama solo procedure con le stesse proprieta'.
+Per queste procedure l'invocazione passa da **enter** e **leave**:
+
+    - se la chiamata e' gia' nella cache il suo **Fragment** viene ridisegnato dal backend con una rototraslazione,
+      senza eseguire il corpo
+    - altrimenti il corpo viene eseguito e, dalla seconda volta che la chiamata viene vista, i tratti che disegna
+      vengono registrati dal backend e salvati nella cache
+
+Registrare solo le chiamate gia' viste evita di convertire i tratti delle chiamate eseguite una sola volta,
+come una procedura principale che disegna tutto il programma.
+Una chiamata ridisegnata consuma comunque il [[budget.py#budget]] dell'interprete: mentre registra un **Fragment** la cache
+conta i passi e la profondita' raggiunti dal corpo, e li addebita di nuovo con **Budget.replay** a ogni chiamata ridisegnata.
+La cache contiene al piu' `CACHE_SIZE` chiamate e `CACHE_STROKES` tratti, quando li supera elimina le chiamate usate meno di recente.
+La chiave e' la procedura, il valore e il tipo dei parametri e lo stato della penna. Ogni [[interpreter.py#interpreter]]
+ha la propria cache, `procedures`, che viene svuotata all'inizio di ogni programma. Funziona solo con i backend che calcolano la tartaruga, come `headless`, e non con la finestra di **turtle**.
+"""
+
+"""
+Numero massimo di chiamate nella cache, puo' essere cambiato con `LOGO_PROCEDURE_CACHE`: con 0 la cache e' disabilitata.
+"""
+CACHE_SIZE = int(os.environ.get('LOGO_PROCEDURE_CACHE', '1024'))
+
+"""
+Numero massimo di tratti salvati nella cache, somma dei tratti di tutti i **Fragment**.
+"""
+CACHE_STROKES = 1 << 20
+
+"""
+Valore restituito da **enter** quando la chiamata e' stata ridisegnata dalla cache.
+"""
+REPLAYED = object()
+
+#===procedure cache===
+class ProcedureCache:
+    """
+    Cache LRU dei **Fragment** di [[graphics.py#fragment]].
+    `seen` contiene le chiavi delle chiamate eseguite una volta senza registrarle, con lo stesso limite di `CACHE_SIZE`.
+    """
+
+    def __init__(self, size=CACHE_SIZE, strokes=CACHE_STROKES):
+        self.size = size
+        self.strokes = strokes
+        self.fragments = OrderedDict()
+        self.seen = OrderedDict()
+        self.stored = 0
+        self.stats = {'hits': 0, 'misses': 0, 'recorded': 0, 'evicted': 0, 'rejected': 0, 'replayed': 0}
+
+    def enter(self, backend, function, values, budget=None, depth=1):
+        """
+        Restituisce **REPLAYED** se la chiamata e' stata ridisegnata, altrimenti `None` oppure, se la chiamata
+        va registrata, il valore da passare a **leave** dopo aver eseguito il corpo.
+        `depth` e' la profondita' che la chiamata raggiunge, usata con `budget` per contare le chiamate ridisegnate.
+        """
+        if self.size <= 0:
+            return None
+        state = backend.penState()
+        if state is None:
+            return None
+        key = (function, tuple(values), tuple(type(value) for value in values), state)
+        try:
+            fragment = self.fragments.get(key)
+        except TypeError:
+            return None
+
+        stats = self.stats
+        if fragment is not None:
+            self.fragments.move_to_end(key)
+            if budget is not None:
+                budget.replay(depth + fragment.depth, fragment.steps)
+            stats['hits'] += 1
+            stats['replayed'] += fragment.strokes
+            backend.replayFragment(fragment)
+            return REPLAYED
+
+        stats['misses'] += 1
+        if key not in self.seen:
+            self.seen[key] = None
+            if len(self.seen) > self.size:
+                self.seen.popitem(last=False)
+            return None
+        if budget is None:
+            return key, backend.beginFragment(), None
+        # la profondita' massima ricomincia da zero, per misurare quella raggiunta dal corpo
+        usage = (budget, depth, budget.steps, budget.depth)
+        budget.depth = 0
+        return key, backend.beginFragment(), usage
+
+    def leave(self, backend, recording, completed=True):
+        """
+        Termina la registrazione restituita da **enter** e salva il **Fragment** nella cache, se il corpo e' stato eseguito
+        fino alla fine e non supera `CACHE_STROKES` tratti.
+        """
+        key, token, usage = recording
+        fragment = backend.endFragment(token, self.strokes if completed else -1)
+        if usage is not None:
+            budget, depth, steps, maxDepth = usage
+            if fragment is not None:
+                fragment.steps, fragment.depth = budget.steps - steps, max(0, budget.depth - depth)
+            budget.depth = max(budget.depth, maxDepth)
+        if fragment is None:
+            if completed:
+                self.stats['rejected'] += 1
+            return
+
+        self.seen.pop(key, None)
+        self.fragments[key] = fragment
+        self.stored += fragment.strokes
+        self.stats['recorded'] += 1
+        while len(self.fragments) > self.size or self.stored > self.strokes:
+            _, evicted = self.fragments.popitem(last=False)
+            self.stored -= evicted.strokes
+            self.stats['evicted'] += 1
+
+    def call(self, backend, function, values, body, budget=None, depth=1):
+        """
+        Esegue la chiamata tramite la cache, `body` e' la funzione senza parametri che esegue il corpo.
+        """
+        recording = self.enter(backend, function, values, budget, depth)
+        if recording is REPLAYED:
+            return None
+        if recording is None:
+            return body()
+        try:
+            result = body()
+        except BaseException:
+            self.leave(backend, recording, False)
+            raise
+        self.leave(backend, recording)
+        return result
+
+#===report===
+def report(cache):
+    """
+    Restituisce i contatori di `cache`, ad esempio la cache `procedures` di un interprete: chiamate ridisegnate dalla cache
+    e chiamate eseguite, chiamate registrate, eliminate o scartate perche' troppo grandi, tratti ridisegnati,
+    frazione di chiamate ridisegnate e numero di chiamate e di tratti nella cache.
+    """
+    stats = dict(cache.stats)
+    calls = stats['hits'] + stats['misses']
+    stats['hitRate'] = stats['hits'] / calls if calls else 0.0
+    stats['entries'] = len(cache.fragments)
+    stats['strokes'] = cache.stored
+    return stats
+
+if __name__ == '__main__':
+    from interpreter import Interpreter
+    interpreter = Interpreter(graphics='headless')
+    with open(sys.argv[1]) as inf:
+        interpreter.run(inf.read())
+    print(report(interpreter.procedures))
@@ -0,0 +1,260 @@
+from graphics import HeadlessBackend, Segment
+from drawing import optimizeDrawing
+import math
+import struct
+import sys
+import zlib
+
+import numpy as np
+
+"""
+Rasterizzazione con **numpy** della display list del backend `headless` di [[graphics.py]] e codifica in PNG,
+senza **turtle** ne' **tkinter**.
+
+Gli archi vengono approssimati con segmenti lunghi al piu' qualche pixel, poi i segmenti consecutivi con la stessa penna
+vengono disegnati insieme, a gruppi di al piu' `BATCH` pixel candidati: per ogni colonna (o riga, se il segmento e'
+piu' alto che largo) attraversata da un segmento si considerano i pixel vicini alla linea e la loro copertura e'
+calcolata dalla distanza del centro del pixel dal segmento, con operazioni vettoriali su tutti i segmenti del gruppo.
+I pixel coperti da piu' segmenti dello stesso gruppo prendono la copertura massima, poi il gruppo viene sovrapposto
+all'immagine usando la copertura come opacita', quindi le linee hanno i bordi sfumati e gli estremi arrotondati.
+
+Lo spessore della penna e' in pixel dell'immagine, come sullo schermo di **turtle**.
+"""
+
+"""
+Numero massimo di pixel candidati elaborati insieme, limita la memoria usata da **render**.
+"""
+BATCH = 1 << 16
+
+#===arc points===
+def _arcPoints(arc, step):
+    """
+    Punti dell'arco, a distanza angolare di al piu' `step` radianti.
+    """
+    extent = math.radians(arc.extent)
+    pieces = max(1, math.ceil(abs(extent) / step))
+    angles = math.radians(arc.start) + np.linspace(0, extent, pieces + 1)
+    return arc.x + arc.radius * np.cos(angles), arc.y + arc.radius * np.sin(angles)
+
+#===bounds===
+def bounds(displayList):
+    """
+    Restituisce `(xmin, ymin, xmax, ymax)` del disegno, `None` se la display list e' vuota.
+    """
+    xs, ys = [], []
+    for shape in displayList:
+        if isinstance(shape, Segment):
+            xs += (shape.x1, shape.x2)
+            ys += (shape.y1, shape.y2)
+        else:
+            x, y = _arcPoints(shape, math.radians(1))
+            xs += (x.min(), x.max())
+            ys += (y.min(), y.max())
+    if not xs:
+        return None
+    return min(xs), min(ys), max(xs), max(ys)
+
+#===transform===
+def _transform(displayList, width, height, fit, margin, scale):
+    """
+    Restituisce la scala e l'origine che portano le coordinate della tartaruga in pixel dell'immagine.
+    Con `fit` il disegno viene ingrandito o ridotto per occupare l'immagine lasciando `margin` pixel per lato,
+    altrimenti l'origine e' al centro dell'immagine e un passo della tartaruga vale `scale` pixel.
+    """
+    box = bounds(displayList) if fit else None
+    if box is None:
+        return scale, width / 2, height / 2
+
+    xmin, ymin, xmax, ymax = box
+    available = max(1, width - 2 * margin), max(1, height - 2 * margin)
+    spans = xmax - xmin, ymax - ymin
+    scale = min(side / span for side, span in zip(available, spans) if span > 0) if any(spans) else 1
+    return scale, width / 2 - scale * (xmin + xmax) / 2, height / 2 + scale * (ymin + ymax) / 2
+
+#===runs===
+def _runs(displayList, scale):
+    """
+    Generatore dei gruppi di segmenti consecutivi con la stessa penna, come `(colore, spessore, coordinate)`:
+    le coordinate sono una matrice con una riga `x1, y1, x2, y2` per segmento, nelle coordinate della tartaruga.
+    Gli archi sono divisi in base a `scale`, in modo che ogni segmento sia lungo al piu' 2 pixel.
+    """
+    pen, coordinates = None, []
+    for shape in displayList:
+        if (shape.color, shape.width) != pen:
+            if coordinates:
+                yield pen + (np.concatenate(coordinates),)
+            pen, coordinates = (shape.color, shape.width), []
+
+        if isinstance(shape, Segment):
+            coordinates.append(np.array([[shape.x1, shape.y1, shape.x2, shape.y2]], dtype=float))
+        else:
+            # almeno 72 segmenti per una circonferenza completa
+            radius = max(shape.radius * scale, 1e-9)
+            x, y = _arcPoints(shape, min(math.radians(5), 2 / radius))
+            coordinates.append(np.column_stack((x[:-1], y[:-1], x[1:], y[1:])))
+    if coordinates:
+        yield pen + (np.concatenate(coordinates),)
+
+#===clip===
+def _clip(lines, xmin, ymin, xmax, ymax):
+    """
+    Restituisce le parti dei segmenti `lines` contenute nel rettangolo, con l'algoritmo di Liang-Barsky,
+    eliminando i segmenti che ne sono completamente fuori.
+    """
+    x1, y1, x2, y2 = lines.T
+    dx, dy = x2 - x1, y2 - y1
+    t0, t1 = np.zeros(len(lines)), np.ones(len(lines))
+    outside = np.zeros(len(lines), dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for p, q in ((-dx, x1 - xmin), (dx, xmax - x1), (-dy, y1 - ymin), (dy, ymax - y1)):
+            ratio = q / p
+            t0 = np.where(p < 0, np.maximum(t0, ratio), t0)
+            t1 = np.where(p > 0, np.minimum(t1, ratio), t1)
+            outside |= (p == 0) & (q < 0)
+    keep = ~outside & (t0 <= t1)
+    t0, t1 = t0[keep, None], t1[keep, None]
+    start, delta = lines[keep, :2], lines[keep, 2:] - lines[keep, :2]
+    return np.hstack((start + t0 * delta, start + t1 * delta))
+
+#===cover===
+def _cover(coverage, lines, penWidth, height, columns):
+    """
+    Aggiunge a `coverage`, la copertura dei pixel di un immagine `height x columns`, quella dei segmenti `lines` gia' in pixel,
+    tenendo per ogni pixel il valore massimo.
+    I segmenti vengono prima ritagliati attorno all'immagine, cosi' che un segmento molto lungo che la attraversa
+    non produca pixel candidati al di fuori.
+    """
+    half = max(penWidth, 1) / 2
+    pad = half + 2
+    lines = _clip(lines, -pad, -pad, columns + pad, height + pad)
+    if not len(lines):
+        return
+    x1, y1, x2, y2 = lines.T
+
+    # asse principale: quello lungo cui il segmento avanza di piu', su cui si scorre un pixel alla volta
+    steep = np.abs(y2 - y1) > np.abs(x2 - x1)
+    a1, b1 = np.where(steep, y1, x1), np.where(steep, x1, y1)
+    a2, b2 = np.where(steep, y2, x2), np.where(steep, x2, y2)
+    start = np.floor(np.minimum(a1, a2) - half - 1).astype(np.int64)
+    counts = np.floor(np.maximum(a1, a2) + half + 1).astype(np.int64) - start + 1
+
+    # sul secondo asse la linea si sposta di al piu' un pixel per pixel, quindi basta una finestra fissa
+    reach = int(math.ceil((half + 1) * math.sqrt(2))) + 1
+    window = np.arange(-reach, reach + 1)
+    perStep = len(window)
+    limit = max(1, BATCH // perStep)
+
+    ends = np.cumsum(counts)
+    first = 0
+    while first < len(lines):
+        # gruppo di segmenti consecutivi che non supera `BATCH` pixel candidati
+        done = ends[first] - counts[first]
+        last = max(first + 1, int(np.searchsorted(ends, done + limit, side='right')))
+        segment = np.repeat(np.arange(first, last), counts[first:last])
+        offsets = np.arange(len(segment)) - np.repeat(ends[first:last] - counts[first:last] - done, counts[first:last])
+        a = (start[segment] + offsets + 0.5)[:, None]
+
+        sa1, sb1, sa2, sb2 = a1[segment, None], b1[segment, None], a2[segment, None], b2[segment, None]
+        da, db = sa2 - sa1, sb2 - sb1
+        t = np.clip(np.divide(a - sa1, da, out=np.zeros(a.shape), where=da != 0), 0, 1)
+        b = np.floor(sb1 + t * db) + window + 0.5
+        length = da * da + db * db
+
+        # distanza del centro del pixel dal segmento
+        t = np.clip(np.divide((a - sa1) * da + (b - sb1) * db, length, out=np.zeros(b.shape), where=length > 0), 0, 1)
+        distance = np.hypot(a - (sa1 + t * da), b - (sb1 + t * db))
+        alpha = np.clip(half + 0.5 - distance, 0, 1)
+
+        # floor e non la conversione diretta, che arrotonda verso zero e porterebbe la colonna -1 sulla colonna 0
+        column = np.floor(np.where(steep[segment, None], b, a)).astype(np.int64)
+        row = np.floor(np.where(steep[segment, None], a, b)).astype(np.int64)
+        inside = (alpha > 0) & (column >= 0) & (column < columns) & (row >= 0) & (row < height)
+        np.maximum.at(coverage, row[inside] * columns + column[inside], alpha[inside])
+        first = last
+
+#===composite===
+def _composite(image, coverage, color):
+    """
+    Sovrappone a `image` il colore `color` usando la copertura come opacita', poi azzera la copertura.
+    """
+    touched = np.flatnonzero(coverage)
+    alpha = coverage[touched, None]
+    pixels = image.reshape(-1, image.shape[2])
+    pixels[touched] = pixels[touched] * (1 - alpha) + np.asarray(color, dtype=float) * alpha
+    coverage[touched] = 0
+
+#===draw===
+def _draw(image, coverage, lines, color, width):
+    """
+    Disegna i segmenti `lines`, gia' in pixel, sovrapponendoli a `image` con la copertura calcolata in `coverage`.
+    """
+    _cover(coverage, lines, width, *image.shape[:2])
+    _composite(image, coverage, color)
+
+#===render===
+def render(displayList, width=256, height=256, background=(255, 255, 255), fit=True, margin=4, scale=1, tolerance=None):
+    """
+    Restituisce l'immagine della display list come array **numpy** `height x width x 3` di `uint8`.
+    `background` e' il colore di sfondo, `fit`, `margin` e `scale` sono descritti in **_transform**.
+    Se `tolerance` non e' `None` la display list viene prima ottimizzata come in [[svg.py#write svg]].
+    """
+    if tolerance is not None:
+        displayList = optimizeDrawing(displayList, tolerance)
+    scale, ox, oy = _transform(displayList, width, height, fit, margin, scale)
+    image = np.empty((height, width, 3), dtype=float)
+    image[:] = background
+    coverage = np.zeros(height * width)
+
+    for color, penWidth, lines in _runs(displayList, scale):
+        lines = lines * [scale, -scale, scale, -scale] + [ox, oy, ox, oy]
+        _draw(image, coverage, lines, color, penWidth)
+    return np.rint(image).astype(np.uint8)
+
+#===encode png===
+def _chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+def encodePng(image):
+    """
+    Codifica in PNG un immagine RGB restituita da **render**.
+    """
+    height, width = image.shape[:2]
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 1:] = image.reshape(height, width * 3)
+    return (b'\x89PNG\r\n\x1a\n'
+            + _chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + _chunk(b'IDAT', zlib.compress(rows.tobytes(), 6))
+            + _chunk(b'IEND', b''))
+
+#===write png===
+def writePng(displayList, out, **options):
+    """
+    Scrive il PNG della display list su `out`, il nome di un file oppure un file binario.
+    `options` sono passate a **render**.
+    """
+    data = encodePng(render(displayList, **options))
+    if isinstance(out, str):
+        with open(out, 'wb') as outf:
+            outf.write(data)
+    else:
+        out.write(data)
+
+#===raster backend===
+class RasterBackend(HeadlessBackend):
+    """
+    Backend `headless` il cui risultato e' l'immagine del disegno invece della display list.
+    Si usa passandolo a [[interpreter.py#run]]: `run(code, graphics=RasterBackend(width=128, height=128))`.
+    """
+
+    def __init__(self, **options):
+        HeadlessBackend.__init__(self)
+        self.options = options
+
+    def close(self):
+        return render(self.displayList, **self.options)
+
+if __name__ == '__main__':
+    from interpreter import run
+    with open(sys.argv[1]) as inf:
+        code = inf.read()
+    writePng(run(code, graphics='headless'), sys.argv[2] if len(sys.argv) > 2 else sys.argv[1].rsplit('.', 1)[0] + '.png')
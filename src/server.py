@@ -0,0 +1,405 @@
+from batch import warmUp, runCode, addLimits, limitsOf
+from interpreter import ENGINES
+from svg import writeSvg
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from io import StringIO
+from urllib import request as urlrequest, error as urlerror
+import argparse
+import base64
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+
+"""
+Server di esecuzione di programmi Logo per un servizio web interattivo.
+All'avvio il processo principale carica la grammatica, i motori e il programma di riscaldamento di [[batch.py#warm up]],
+poi crea un pool di `WORKERS` processi con `fork`: ogni worker parte con la grammatica e le tabelle di ANTLR gia' pronte
+e le richieste non pagano ne' `ANTLR(grammar)` ne' gli import dell'interprete.
+
+Il server ascolta in HTTP solo su `HOST`, di default `127.0.0.1`, con due indirizzi:
+
+    - `POST /run` con un oggetto JSON: `code`, il sorgente Logo, `input`, le righe lette da `READWORD` (una stringa
+      oppure una lista), `drawing`, `svg` o `png` per ricevere anche il disegno, `width` e `height` del PNG,
+      `tolerance`, per ottimizzare il disegno con [[drawing.py#optimize drawing]] prima di esportarlo,
+      `engine`, `timeout`, in secondi, che non puo' superare `TIMEOUT`, e `limits`, un oggetto con `steps`, `depth`
+      e `segments` del [[budget.py#budget]], che possono solo restringere i limiti del server.
+      La risposta contiene `status`, `stdout`, `error`, `seconds`, `strokes` e `usage` come in [[batch.py]] e, se richiesto,
+      `drawing`: il documento SVG oppure il PNG codificato in base64
+    - `GET /health` con i contatori di **report**
+
+Limiti e code:
+
+    - le richieste in esecuzione o in attesa sono al piu' `WORKERS + QUEUE_SIZE`, oltre questo numero il server
+      risponde subito `503` con `Retry-After`, invece di accodare richieste che scadrebbero comunque
+    - un sorgente piu' lungo di `MAX_SOURCE` byte riceve `413`, l'output oltre `MAX_OUTPUT` caratteri viene troncato
+      e segnalato con `truncated`, il PNG e' al piu' `MAX_SIZE` pixel per lato
+    - il tempo massimo e' applicato nel worker con `SIGALRM`; se il worker non risponde entro `GRACE` secondi
+      oltre il tempo massimo, ad esempio perche' bloccato in un calcolo di python che il segnale non interrompe,
+      il server risponde `504` e termina il worker, che il pool sostituisce con uno nuovo.
+      Una richiesta che scade mentre e' ancora in coda non viene piu' eseguita
+    - ogni worker viene sostituito dopo `RECYCLE` richieste, al termine di quella in corso: il nuovo worker
+      viene creato con `fork` dal processo principale e quindi parte gia' pronto
+"""
+
+"""
+Indirizzo e porta di default, la porta puo' essere cambiata con `LOGO_SERVER_PORT`.
+"""
+HOST = '127.0.0.1'
+PORT = int(os.environ.get('LOGO_SERVER_PORT', '8765'))
+
+"""
+Numero di worker e richieste che possono attendere un worker libero.
+"""
+WORKERS = os.cpu_count() or 1
+QUEUE_SIZE = 64
+
+"""
+Limiti di una richiesta: byte del sorgente, caratteri dell'output restituito, secondi di esecuzione e pixel per lato del PNG.
+"""
+MAX_SOURCE = 64 * 1024
+MAX_OUTPUT = 64 * 1024
+TIMEOUT = 5.0
+MAX_SIZE = 2048
+
+"""
+Limiti del [[budget.py#budget]] che una richiesta puo' restringere con `limits`.
+"""
+LIMITS = ('steps', 'depth', 'segments')
+
+"""
+Secondi concessi a un worker oltre il tempo massimo prima di rispondere `504`.
+"""
+GRACE = 2.0
+
+"""
+Richieste eseguite da un worker prima di essere sostituito.
+"""
+RECYCLE = 1000
+
+#===input===
+def _reader(lines):
+    """
+    Funzione di ingresso per `READWORD` che restituisce una riga alla volta di `lines`.
+    """
+    lines = iter(lines)
+    def read(prompt=''):
+        try:
+            return next(lines)
+        except StopIteration:
+            raise EOFError("Non ci sono altre righe in input per READWORD")
+    return read
+
+"""
+Posti delle richieste in esecuzione, condivisi con i worker: per ogni posto il numero della richiesta che lo occupa
+e il pid del worker che la sta eseguendo. Vengono assegnati da **_attach** all'avvio di ogni worker.
+"""
+TOKENS = None
+PIDS = None
+
+def _attach(tokens, pids):
+    global TOKENS, PIDS
+    TOKENS, PIDS = tokens, pids
+
+#===serve===
+def _serve(request):
+    """
+    Esegue nel worker una richiesta gia' validata da **LogoServer.submit** e restituisce la risposta.
+    Prima di eseguirla registra il proprio pid nel posto della richiesta, cosi' che il server possa terminarlo
+    se non risponde in tempo; se nel frattempo la richiesta e' stata abbandonata restituisce `None` senza eseguirla.
+    """
+    slot = request['slot']
+    if TOKENS[slot] != request['token']:
+        return None
+    PIDS[slot] = os.getpid()
+    try:
+        return _execute(request)
+    finally:
+        PIDS[slot] = 0
+
+def _execute(request):
+    """
+    Esegue la richiesta con **runCode** e aggiunge alla risposta il disegno richiesto.
+    """
+    result, displayList = runCode(request['code'], request['engine'], request['timeout'], _reader(request['input']), request['limits'])
+    if len(result['stdout']) > MAX_OUTPUT:
+        result['stdout'] = result['stdout'][:MAX_OUTPUT]
+        result['truncated'] = True
+    if displayList is not None and request['drawing'] == 'svg':
+        out = StringIO()
+        writeSvg(displayList, out, tolerance=request['tolerance'])
+        result['drawing'] = out.getvalue()
+    elif displayList is not None and request['drawing'] == 'png':
+        # import ritardato, raster.py importa numpy
+        from raster import render, encodePng
+        image = render(displayList, request['width'], request['height'], tolerance=request['tolerance'])
+        result['drawing'] = base64.b64encode(encodePng(image)).decode('ascii')
+    return result
+
+#===bad request===
+class BadRequest(Exception):
+    """
+    Richiesta non valida, `status` e' il codice HTTP della risposta.
+    """
+    def __init__(self, message, status=400):
+        Exception.__init__(self, message)
+        self.status = status
+
+#===logo server===
+class LogoServer:
+    """
+    Pool di worker e server HTTP che gli inoltra le richieste, vedi [[server.py]].
+    Con `port` uguale a 0 viene scelta una porta libera, disponibile in `port` dopo la creazione.
+    `limits` e' il dizionario dei limiti `steps`, `depth` e `segments` applicati a ogni richiesta, `None` se illimitati.
+    """
+
+    def __init__(self, host=HOST, port=PORT, workers=WORKERS, queueSize=QUEUE_SIZE, recycle=RECYCLE, timeout=TIMEOUT, engine=None,
+                 limits=None):
+        self.timeout = timeout
+        self.engine = engine
+        self.limits = dict.fromkeys(LIMITS)
+        self.limits.update(limits or {})
+        self.workers = workers
+        warmUp(engine)
+        context = multiprocessing.get_context('fork')
+        self.tokens = context.Array('q', workers + queueSize, lock=False)
+        self.pids = context.Array('q', workers + queueSize, lock=False)
+        self.free = list(range(workers + queueSize))
+        self.requests = 0
+        self.pool = context.Pool(workers, _attach, (self.tokens, self.pids), maxtasksperchild=recycle)
+        self.slots = threading.BoundedSemaphore(workers + queueSize)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'completed': 0, 'errors': 0, 'timeouts': 0, 'limits': 0, 'rejected': 0, 'invalid': 0, 'inFlight': 0,
+                      'killed': 0}
+        self.http = ThreadingHTTPServer((host, port), _Handler)
+        self.http.daemon_threads = True
+        self.http.logo = self
+        self.host, self.port = self.http.server_address[:2]
+
+    def _count(self, name, delta=1):
+        with self.lock:
+            self.stats[name] += delta
+
+    def _reserve(self):
+        """
+        Assegna un posto libero a una richiesta e restituisce il posto e il numero della richiesta.
+        Va chiamata dopo aver acquisito `slots`, che garantisce che ci sia un posto libero.
+        """
+        with self.lock:
+            slot = self.free.pop()
+            self.requests += 1
+            self.tokens[slot] = self.requests
+            self.pids[slot] = 0
+            return slot, self.requests
+
+    def _abandon(self, slot, token):
+        """
+        Abbandona una richiesta scaduta: se e' ancora in coda non verra' eseguita, se un worker la sta eseguendo
+        il worker viene terminato e il pool lo sostituisce.
+        """
+        with self.lock:
+            if self.tokens[slot] != token:
+                return
+            self.tokens[slot] = 0
+            pid = self.pids[slot]
+        if pid:
+            try:
+                os.kill(pid, signal.SIGKILL)
+                self._count('killed')
+            except OSError:
+                pass
+
+    def _release(self, slot):
+        with self.lock:
+            self.tokens[slot] = 0
+            self.free.append(slot)
+
+    def _validate(self, request):
+        """
+        Controlla la richiesta e restituisce quella da passare al worker, con i valori di default.
+        """
+        if not isinstance(request, dict) or not isinstance(request.get('code'), str):
+            raise BadRequest("La richiesta deve essere un oggetto JSON con il sorgente in `code`")
+        if len(request['code'].encode('utf-8')) > MAX_SOURCE:
+            raise BadRequest("Il sorgente supera " + str(MAX_SOURCE) + " byte", 413)
+        lines = request.get('input', [])
+        if isinstance(lines, str):
+            lines = lines.splitlines()
+        if not isinstance(lines, list) or not all(isinstance(line, str) for line in lines):
+            raise BadRequest("`input` deve essere una stringa oppure una lista di stringhe")
+        drawing = request.get('drawing')
+        if drawing not in (None, 'svg', 'png'):
+            raise BadRequest("`drawing` deve essere `svg` oppure `png`")
+        engine = request.get('engine', self.engine)
+        if engine is not None and engine not in ENGINES:
+            raise BadRequest("Motore di esecuzione `" + str(engine) + "` sconosciuto")
+        timeout = request.get('timeout', self.timeout)
+        if not isinstance(timeout, (int, float)) or isinstance(timeout, bool) or timeout <= 0:
+            raise BadRequest("`timeout` deve essere un numero positivo")
+        width, height = request.get('width', 512), request.get('height', 512)
+        if not all(isinstance(size, int) and 0 < size <= MAX_SIZE for size in (width, height)):
+            raise BadRequest("`width` e `height` devono essere interi tra 1 e " + str(MAX_SIZE))
+        tolerance = request.get('tolerance')
+        if tolerance is not None and (not isinstance(tolerance, (int, float)) or isinstance(tolerance, bool) or tolerance < 0):
+            raise BadRequest("`tolerance` deve essere un numero non negativo")
+        limits = request.get('limits', {})
+        if (not isinstance(limits, dict) or not set(limits) <= set(LIMITS)
+                or not all(isinstance(value, int) and not isinstance(value, bool) and value >= 0 for value in limits.values())):
+            raise BadRequest("`limits` deve essere un oggetto con valori interi non negativi per " + ', '.join('`' + name + '`' for name in LIMITS))
+        merged = {}
+        for name in LIMITS:
+            values = [value for value in (self.limits[name], limits.get(name)) if value is not None]
+            merged[name] = min(values) if values else None
+        return {'code': request['code'], 'input': lines, 'drawing': drawing, 'engine': engine,
+                'timeout': min(timeout, self.timeout), 'width': width, 'height': height, 'limits': merged,
+                'tolerance': tolerance}
+
+    def submit(self, request):
+        """
+        Esegue la richiesta, gia' decodificata dal JSON, e restituisce il codice HTTP e la risposta.
+        """
+        self._count('requests')
+        try:
+            request = self._validate(request)
+        except BadRequest as error:
+            self._count('invalid')
+            return error.status, {'error': str(error)}
+
+        if not self.slots.acquire(blocking=False):
+            self._count('rejected')
+            return 503, {'error': "Troppe richieste in coda, riprovare piu' tardi"}
+        self._count('inFlight')
+        slot, token = self._reserve()
+        try:
+            pending = self.pool.apply_async(_serve, (dict(request, slot=slot, token=token),))
+            result = pending.get(request['timeout'] + GRACE)
+        except multiprocessing.TimeoutError:
+            self._abandon(slot, token)
+            self._count('timeouts')
+            return 504, {'error': "Il worker non ha risposto entro il tempo massimo"}
+        finally:
+            self._release(slot)
+            self._count('inFlight', -1)
+            self.slots.release()
+
+        self._count('completed')
+        if result['status'] == 'timeout':
+            self._count('timeouts')
+        elif result['status'] == 'limit':
+            self._count('limits')
+        elif result['status'] == 'error':
+            self._count('errors')
+        return 200, result
+
+    def report(self):
+        """
+        Restituisce i contatori del server: richieste ricevute, completate, terminate con errore o per il tempo massimo,
+        rifiutate perche' la coda era piena, non valide, in esecuzione o in attesa e worker terminati perche' bloccati,
+        insieme al numero di worker.
+        """
+        with self.lock:
+            stats = dict(self.stats)
+        stats['workers'] = self.workers
+        return stats
+
+    def serveForever(self):
+        self.http.serve_forever()
+
+    def start(self):
+        """
+        Avvia il server in un thread e restituisce l'istanza, utile per usarlo dallo stesso processo.
+        """
+        threading.Thread(target=self.serveForever, daemon=True).start()
+        return self
+
+    def close(self):
+        """
+        Smette di accettare richieste, aspetta quelle in esecuzione e termina i worker.
+        Le richieste terminano tutte entro il tempo massimo, quindi il pool viene terminato invece di attendere
+        i risultati delle richieste abbandonate, che non arriveranno mai se il loro worker e' stato terminato.
+        """
+        self.http.shutdown()
+        self.http.server_close()
+        for _ in range(len(self.tokens)):
+            self.slots.acquire()
+        self.pool.terminate()
+        self.pool.join()
+
+    def url(self, path='/'):
+        return 'http://%s:%d%s' % (self.host, self.port, path)
+
+#===handler===
+class _Handler(BaseHTTPRequestHandler):
+
+    def _reply(self, status, body, headers=()):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._reply(200, self.server.logo.report())
+        else:
+            self._reply(404, {'error': "Indirizzo sconosciuto"})
+
+    def do_POST(self):
+        if self.path != '/run':
+            self._reply(404, {'error': "Indirizzo sconosciuto"})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        # il JSON puo' al massimo raddoppiare il sorgente con gli escape, piu' i campi della richiesta
+        if length > 2 * MAX_SOURCE + 4096:
+            self._reply(413, {'error': "Richiesta troppo grande"})
+            self.close_connection = True
+            return
+        try:
+            request = json.loads(self.rfile.read(length))
+        except ValueError:
+            self._reply(400, {'error': "La richiesta non e' un JSON valido"})
+            return
+        status, body = self.server.logo.submit(request)
+        self._reply(status, body, [('Retry-After', '1')] if status == 503 else [])
+
+    def log_message(self, format, *args):
+        pass
+
+#===request===
+def request(url, code, input=None, drawing=None, **options):
+    """
+    Client minimo: invia il sorgente a `url`, l'indirizzo `/run` di un server, e restituisce il codice HTTP e la risposta.
+    """
+    body = dict(options, code=code, input=input or [], drawing=drawing)
+    message = urlrequest.Request(url, json.dumps(body).encode('utf-8'), {'Content-Type': 'application/json'})
+    try:
+        with urlrequest.urlopen(message) as response:
+            return response.status, json.loads(response.read())
+    except urlerror.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(description='Server HTTP locale che esegue programmi Logo con un pool di worker.')
+    arguments.add_argument('-p', '--port', type=int, default=PORT, help='porta, 0 per una porta libera')
+    arguments.add_argument('-j', '--workers', type=int, default=WORKERS, help='numero di worker')
+    arguments.add_argument('-q', '--queue', type=int, default=QUEUE_SIZE, help='richieste in attesa oltre a quelle in esecuzione')
+    arguments.add_argument('-t', '--timeout', type=float, default=TIMEOUT, help='tempo massimo in secondi per richiesta')
+    arguments.add_argument('-r', '--recycle', type=int, default=RECYCLE, help='richieste per worker prima di sostituirlo')
+    arguments.add_argument('-e', '--engine', choices=ENGINES, default=None, help='motore di esecuzione')
+    addLimits(arguments)
+    options = arguments.parse_args()
+
+    server = LogoServer(HOST, options.port, options.workers, options.queue, options.recycle, options.timeout, options.engine,
+                        limitsOf(options))
+    print('Server Logo su', server.url('/run'), file=sys.stderr)
+    try:
+        server.serveForever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
@@ -0,0 +1,510 @@
+from logoAst import NodeWalker, Block
+from interpreter import DT_OPERATORS, DT_GRAPHICS, turtleMoves, repeatMoves, enterProcedure, leaveProcedure, beginAsk, endAsk, readword, write, current
+from frames import resolve, topFrame, ProcedureReturn, LOCAL, UNBOUND
+from tailcalls import TailCall, OUTPUT
+from procedureCache import REPLAYED
+import os
+
+"""
+Motore di esecuzione `stack`, con la stessa semantica di [[interpreter.py]] ma senza ricorsione python.
+Ogni funzione registrata in `machine` e' un generatore: per valutare un figlio lo restituisce con `yield` e riceve il suo valore
+come risultato dell'espressione `yield`.
+I generatori sospesi formano una pila di continuazioni allocata nello heap, gestita dal ciclo di **evaluate**,
+quindi la profondita' della ricorsione Logo e' limitata solo da `MAX_DEPTH` e non dallo stack di python.
+
+Le foglie (numeri, costanti, parole e variabili risolte) sono valutate direttamente da `DT_VALUES`,
+senza creare un generatore.
+"""
+
+"""
+Numero massimo di procedure in esecuzione contemporaneamente, puo' essere cambiato con `LOGO_MAX_DEPTH`.
+Superarlo solleva **RecursionError** con un messaggio Logo, invece di esaurire la memoria.
+"""
+MAX_DEPTH = int(os.environ.get('LOGO_MAX_DEPTH', '100000'))
+
+"""
+Passi del ciclo di **evaluateAsync** tra due attese di `pause`.
+"""
+STEPS = 1000
+
+machine = NodeWalker()
+
+#===evaluate===
+def evaluate(ast, walker):
+    """
+    Valuta il nodo con lo stato di `walker`, creato da **runProgram**, e restituisce il suo valore.
+    Un eccezione sollevata da un generatore viene rilanciata nel generatore che lo ha richiesto,
+    cosi' che **procedureInvocation** possa catturare `ProcedureReturn` come in [[interpreter.py]].
+    """
+    dispatch = walker.dispatch_table
+    catchall = walker.catchall_func
+    values = DT_VALUES
+    stack = [dispatch.get(ast.TYPE, catchall)(walker, ast)]
+    value = None
+    error = None
+
+    while stack:
+        try:
+            if error is None:
+                child = stack[-1].send(value)
+            else:
+                error, thrown = None, error
+                child = stack[-1].throw(thrown)
+        except StopIteration as stop:
+            stack.pop()
+            value = stop.value
+            continue
+        except Exception as exc:
+            stack.pop()
+            if not stack:
+                raise
+            error = exc
+            continue
+
+        direct = values.get(child.TYPE)
+        if direct is not None and (child.TYPE != 'deref' or child.scope is not None):
+            try:
+                value = direct(walker, child)
+            except Exception as exc:
+                error = exc
+            continue
+        stack.append(dispatch.get(child.TYPE, catchall)(walker, child))
+        value = None
+    return value
+
+#===evaluate async===
+async def evaluateAsync(ast, walker, read, pause, steps=STEPS):
+    """
+    Versione di **evaluate** per una coroutine: ogni `steps` passi del ciclo attende `pause()`, che deve restituire
+    il controllo all'event loop, e al posto di `readword` attende `read()`, che restituisce la parola letta.
+    Tra un attesa e l'altra l'esecuzione e' identica a **evaluate**.
+    """
+    dispatch = walker.dispatch_table
+    catchall = walker.catchall_func
+    values = DT_VALUES
+    stack = [dispatch.get(ast.TYPE, catchall)(walker, ast)]
+    value = None
+    error = None
+    countdown = steps
+
+    while stack:
+        countdown -= 1
+        if not countdown:
+            countdown = steps
+            await pause()
+        try:
+            if error is None:
+                child = stack[-1].send(value)
+            else:
+                error, thrown = None, error
+                child = stack[-1].throw(thrown)
+        except StopIteration as stop:
+            stack.pop()
+            value = stop.value
+            continue
+        except Exception as exc:
+            stack.pop()
+            if not stack:
+                raise
+            error = exc
+            continue
+
+        if child is READ:
+            try:
+                value = await read()
+            except Exception as exc:
+                error = exc
+            continue
+        direct = values.get(child.TYPE)
+        if direct is not None and (child.TYPE != 'deref' or child.scope is not None):
+            try:
+                value = direct(walker, child)
+            except Exception as exc:
+                error = exc
+            continue
+        stack.append(dispatch.get(child.TYPE, catchall)(walker, child))
+        value = None
+    return value
+
+#===numbers===
+def _isNumber(value):
+    return not isinstance(value, bool) and isinstance(value, (int, float))
+
+#===prog===
+@machine.register
+def prog(visit, ast):
+    for child in ast.children:
+        yield child
+
+#===line===
+@machine.register
+def line(visit, ast):
+    """
+    Restituisce il valore dell'ultimo figlio, come `line` definita in [[interpreter.py#line]].
+    """
+    result = None
+    for child in ast.children:
+        result = yield child
+    return result
+
+#===operations===
+@machine.register
+def operation(visit, ast):
+    x = yield ast.children[0]
+    y = yield ast.children[1]
+    if not (_isNumber(x) and _isNumber(y)):
+        raise TypeError("In un espressione gli operandi devono essere int o float")
+    return (ast.function or DT_OPERATORS[ast.op])(x, y)
+
+#===sign===
+@machine.register
+def sign(visit, ast):
+    value = yield ast.children[0]
+    return ast.factor * value
+
+#===print===
+@machine.register
+def pr(visit, ast):
+    for child in ast.children:
+        write((yield child))
+
+#===arithmetic and boolean operations===
+@machine.register
+def arithmBoolOperations(visit, ast):
+    """
+    I connettivi logici valutano gli operandi uno alla volta, con la short circuit evaluation di [[interpreter.py#and]].
+    """
+    name = ast.name
+    if name in ['and', 'or', 'not']:
+        for child in ast.children:
+            value = yield child
+            if not isinstance(value, bool):
+                raise TypeError("Gli input dei connettivi logici devono essere dei boolean")
+            if name == 'not':
+                return not value
+            if value == (name == 'or'):
+                return value
+        return name == 'and'
+
+    params = []
+    for child in ast.children:
+        params.append((yield child))
+    if not all(_isNumber(ele) for ele in params):
+        raise TypeError("In un espressione gli operandi devono essere int o float")
+    return (ast.function or DT_OPERATORS[name])(params)
+
+#===make===
+@machine.register
+def make(visit, ast):
+    memory = visit.GLOBAL_MEMORY
+    name = yield ast.children[0]
+    value = yield ast.children[1]
+
+    if not isinstance(name, str):
+        raise ValueError("Il nome di una variabile deve essere una stringa")
+    if value == None:
+        raise TypeError("Non posso assegnare ad una variabile un valore nullo")
+
+    if ast.slot is None:
+        memory[name] = value
+    else:
+        memory.values[ast.slot] = value
+
+#===deref===
+@machine.register
+def deref(visit, ast):
+    """
+    Variabile il cui nome viene calcolato a runtime, quelle risolte sono lette da **_resolvedDeref**.
+    """
+    name = yield ast.children[0]
+    memory_stack = visit.ACTIVATION_RECORDS[-1]
+    memory_global = visit.GLOBAL_MEMORY
+
+    if name in memory_stack.index:
+        return memory_stack.slots[memory_stack.index[name]]
+    if name in memory_global:
+        return memory_global[name]
+    raise NameError("La variabile " + name + " non è stata dichiarata")
+
+def _resolvedDeref(visit, ast):
+    if ast.scope == LOCAL:
+        return visit.ACTIVATION_RECORDS[-1].slots[ast.slot]
+    res = visit.GLOBAL_MEMORY.values[ast.slot]
+    if res is UNBOUND:
+        raise NameError("La variabile " + DT_VALUES[ast.children[0].TYPE](visit, ast.children[0]) + " non è stata dichiarata")
+    return res
+
+#===graphic operations===
+@machine.register
+def graphic(visit, ast):
+    """
+    Come `graphic` definita in [[interpreter.py#graphic]].
+    """
+    if len(ast.children) == 0:
+        DT_GRAPHICS[ast.name]()
+        return
+
+    children = ast.children[0].children if isinstance(ast.children[0], Block) else ast.children
+    params = []
+    for child in children:
+        params.append((yield child))
+
+    if not all(isinstance(ele, (int, float)) for ele in params):
+        raise TypeError("In un espressione gli operandi devono essere int o float")
+    DT_GRAPHICS[ast.name](params)
+
+#===if===
+@machine.register
+def ifState(visit, ast):
+    condition = yield ast.children[0]
+    if not isinstance(condition, bool):
+        raise TypeError("La condizione di un IF deve essere un boolean")
+    if condition:
+        return (yield ast.children[1])
+
+#===if else===
+@machine.register
+def ifelseState(visit, ast):
+    condition = yield ast.children[0]
+    if not isinstance(condition, bool):
+        raise TypeError("La condizione di un IF deve essere un boolean")
+    if condition:
+        return (yield ast.children[1])
+    return (yield ast.children[2])
+
+#===repeat===
+@machine.register
+def repeatState(visit, ast):
+    value = yield ast.children[0]
+    if not isinstance(value, int):
+        raise TypeError("REPEAT deve avere un int come parametro")
+
+    body = ast.children[1]
+    step = visit.BUDGET.step
+    for _ in range(value):
+        step()
+        yield body
+
+#===turtle repeat===
+@machine.register
+def turtleRepeat(visit, ast):
+    """
+    Come `turtleRepeat` definita in [[interpreter.py#turtle repeat]].
+    """
+    value = yield ast.children[0]
+    if not isinstance(value, int):
+        raise TypeError("REPEAT deve avere un int come parametro")
+
+    body = ast.children[1]
+    moves = None
+    if value > 0:
+        try:
+            values = []
+            for child in body.children:
+                values.append((yield child.children[0]))
+            moves = turtleMoves(ast.moves, values)
+        except Exception:
+            moves = None
+    if moves is None:
+        step = visit.BUDGET.step
+        for _ in range(value):
+            step()
+            yield body
+    else:
+        repeatMoves(value, moves)
+
+#===while===
+@machine.register
+def whileState(visit, ast):
+    condition, body = ast.children
+    step = visit.BUDGET.step
+    while (yield condition):
+        step()
+        yield body
+
+#===ask===
+@machine.register
+def askState(visit, ast):
+    """
+    Come `askState` definita in [[interpreter.py#ask]], le eccezioni rilanciate da **evaluate** nel generatore
+    passano dal `finally`.
+    """
+    turtles, body = ast.children
+    children = turtles.children if isinstance(turtles, Block) else [turtles]
+    params = []
+    for child in children:
+        params.append((yield child))
+    previous = beginAsk(params)
+    try:
+        yield body
+    finally:
+        endAsk(previous)
+
+#===procedure declaration===
+@machine.register
+def procedureDeclaration(visit, ast):
+    visit.FUNCTIONS[ast.name] = ast
+    return
+    yield
+
+#===procedure invocation===
+@machine.register
+def procedureInvocation(visit, ast):
+    """
+    Come `procedureInvocation` definita in [[interpreter.py#procedure invocation]].
+    Se le procedure in esecuzione sono gia' `MAX_DEPTH` solleva **RecursionError**.
+    Le procedure con `cache` passano da [[interpreter.py#cached call]]: la chiamata viene ridisegnata dalla cache
+    oppure eseguita da **_invoke**, registrandone i tratti se richiesto.
+    """
+    name = ast.name
+    if name in visit.FUNCTIONS:
+        function = visit.FUNCTIONS[name]
+    else:
+        raise NameError("La funzione non è stata dichiarata")
+
+    paramsValue = []
+    for child in ast.children:
+        paramsValue.append((yield child))
+
+    if len(function.params) != len(paramsValue):
+        raise TypeError("Numero di parametri per la funzione `" +  name + "` non corretto")
+
+    if ast.tail is not None:
+        return TailCall(function, paramsValue, ast.tail == OUTPUT)
+
+    records = visit.ACTIVATION_RECORDS
+    if len(records) > MAX_DEPTH:
+        raise RecursionError("Superata la profondità massima di " + str(MAX_DEPTH) + " chiamate nella funzione `" + name + "`")
+
+    recording = enterProcedure(function, paramsValue, len(records)) if function.cache else None
+    if recording is REPLAYED:
+        return None
+    if recording is None:
+        return (yield from _invoke(visit, function, paramsValue))
+    try:
+        result = yield from _invoke(visit, function, paramsValue)
+    except BaseException:
+        leaveProcedure(recording, False)
+        raise
+    leaveProcedure(recording)
+    return result
+
+#===invoke===
+def _invoke(visit, function, paramsValue):
+    """
+    Esegue la procedura e le eventuali chiamate in coda nello stesso ciclo.
+    """
+    records = visit.ACTIVATION_RECORDS
+    call = visit.BUDGET.call
+    keep = True
+    while True:
+        call(len(records))
+        frame = function.frames.acquire(paramsValue)
+        records.append(frame)
+        try:
+            result = None
+            for child in function.children:
+                result = yield child
+            if result.__class__ is not TailCall:
+                result = None
+        except ProcedureReturn as signal:
+            result = signal.value
+
+        records.pop()
+        function.frames.release(frame)
+        if result.__class__ is not TailCall:
+            return result if keep else None
+        function, paramsValue = result.function, result.values
+        keep = keep and result.keep
+
+#===output===
+@machine.register
+def opState(visit, ast):
+    if len(visit.ACTIVATION_RECORDS) == 1:
+        raise SyntaxError("Non si può avere un output state al di fuori di una funzione")
+
+    value = yield ast.children[0]
+    if value.__class__ is TailCall:
+        return value
+    raise ProcedureReturn(value)
+
+#===stop===
+@machine.register
+def stopState(visit, ast):
+    if len(visit.ACTIVATION_RECORDS) == 1:
+        raise SyntaxError("Non si può avere uno stop state al di fuori di una funzione")
+    raise ProcedureReturn()
+    yield
+
+#===block===
+@machine.register
+def block(visit, ast):
+    """
+    Restituisce l'ultimo valore diverso da `None` prodotto dai figli, come `block` definita in [[interpreter.py#block]].
+    """
+    result = None
+    for child in ast.children:
+        value = yield child
+        if value != None:
+            result = value
+    return result
+
+#===read word===
+class _Read:
+    """
+    Richiesta di una riga di input: **rw** la restituisce con `yield` al posto di un figlio.
+    **evaluate** la valuta come una foglia con `readword`, **evaluateAsync** attende l'ingresso asincrono.
+    """
+    __slots__ = ()
+    TYPE = 'readInput'
+
+READ = _Read()
+
+@machine.register
+def rw(visit, ast):
+    return (yield READ)
+
+#===number===
+def _number(visit, ast):
+    if '.' in ast.value:
+        return float(ast.value)
+    return int(ast.value)
+
+"""
+Dispatch table delle foglie, valutate direttamente da **evaluate**.
+`deref` vi compare solo per le variabili risolte da [[frames.py#resolve]].
+"""
+DT_VALUES = {
+    'Boolean_':      lambda visit, ast: ast.value,
+    'STRINGLITERAL': lambda visit, ast: str(ast.value),
+    'STRING':        lambda visit, ast: str(ast.value.replace('"', '')),
+    'number':        _number,
+    'constant':      lambda visit, ast: ast.value,
+    'deref':         _resolvedDeref,
+    'readInput':     lambda visit, ast: readword()
+}
+
+#===run program===
+def _prepare(ast):
+    ast, memory = resolve(ast)
+    walker = machine.fork()
+    walker.FUNCTIONS = {}
+    walker.ACTIVATION_RECORDS = [topFrame()]
+    walker.GLOBAL_MEMORY = memory
+    walker.BUDGET = current().budget
+    return ast, walker
+
+def runProgram(ast):
+    """
+    Risolve le variabili tramite [[frames.py#resolve]], inizializza un nuovo spazio di memoria per i nomi di funzioni,
+    uno stack vuoto, la memoria globale e il budget dell'interprete corrente in un walker creato per l'esecuzione,
+    poi valuta l'albero.
+    """
+    return evaluate(*_prepare(ast))
+
+async def runProgramAsync(ast, read, pause, steps=STEPS):
+    """
+    Come **runProgram**, ma valuta l'albero con **evaluateAsync**.
+    """
+    ast, walker = _prepare(ast)
+    return await evaluateAsync(ast, walker, read, pause, steps)
@@ -0,0 +1,180 @@
+from graphics import HeadlessBackend, Segment, Arc
+from drawing import optimizeDrawing
+import math
+import sys
+
+"""
+Esportazione in SVG dei disegni della tartaruga.
+**SvgWriter** scrive il documento un elemento alla volta su un file, senza conservare i tratti gia' scritti,
+quindi la memoria usata non dipende dalla dimensione del disegno:
+
+    - i segmenti e gli archi consecutivi con la stessa penna (colore e spessore) diventano un unico `<path>`,
+      se il tratto successivo non parte dal punto in cui termina il precedente il path prosegue con un comando `M`
+    - gli archi diventano comandi `A` di al piu' 180 gradi, quindi anche le circonferenze complete
+    - `cs` chiude il gruppo `<g>` in cui vengono scritti i tratti e ne apre uno nuovo,
+      alla fine del documento uno `<style>` nasconde tutti i gruppi tranne l'ultimo
+
+Le dimensioni del documento non sono note finche' il programma non termina, per questo il disegno viene scritto
+su una tela di dimensione fissa centrata nell'origine, come la finestra di **turtle**, con l'asse y rivolto verso l'alto.
+"""
+
+"""
+Dimensioni di default della tela, in pixel.
+"""
+WIDTH = 800
+HEIGHT = 600
+
+#===number===
+def _number(value):
+    """
+    Coordinata con al piu' due cifre decimali, senza zeri finali.
+    """
+    text = ('%.2f' % value).rstrip('0').rstrip('.')
+    return '0' if text == '-0' else text
+
+#===color===
+def _color(color):
+    return '#%02x%02x%02x' % tuple(int(round(value)) for value in color)
+
+#===svg writer===
+class SvgWriter:
+    """
+    Scrive un documento SVG su `out`, il nome di un file oppure un oggetto con il metodo `write`.
+    Un file aperto da **SvgWriter** viene chiuso da **close**, un oggetto ricevuto gia' aperto no.
+    """
+
+    def __init__(self, out, width=WIDTH, height=HEIGHT):
+        if isinstance(out, str):
+            self.out, self.owned = open(out, 'w'), True
+        else:
+            self.out, self.owned = out, False
+        self.write = self.out.write
+        self.pen = None
+        self.last = None
+        self.layer = 0
+        self.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                   '<svg xmlns="http://www.w3.org/2000/svg" width="%s" height="%s" viewBox="%s %s %s %s">\n'
+                   % (_number(width), _number(height), _number(-width / 2), _number(-height / 2), _number(width), _number(height)))
+        self.write('<g id="layer0">\n')
+
+    def _closePath(self):
+        if self.pen is not None:
+            self.write('"/>\n')
+            self.pen = None
+            self.last = None
+
+    def _moveTo(self, x, y, color, width):
+        """
+        Porta il path in `(x, y)`: ne apre uno nuovo se la penna e' cambiata, altrimenti aggiunge un comando `M`
+        se il punto non e' quello in cui termina il tratto precedente.
+        `last` e' l'ultimo punto gia' scritto, il confronto avviene sulle coordinate arrotondate.
+        """
+        pen = (color, width)
+        point = _number(x) + ' ' + _number(-y)
+        if pen != self.pen:
+            self._closePath()
+            self.write('<path fill="none" stroke="%s" stroke-width="%s" stroke-linecap="round" stroke-linejoin="round" d="M%s'
+                       % (_color(color), _number(width), point))
+            self.pen = pen
+        elif self.last != point:
+            self.write(' M' + point)
+
+    def segment(self, x1, y1, x2, y2, color, width):
+        self._moveTo(x1, y1, color, width)
+        self.last = _number(x2) + ' ' + _number(-y2)
+        self.write(' L' + self.last)
+
+    def arc(self, x, y, radius, start, extent, color, width):
+        """
+        Arco con centro, raggio e angoli come [[graphics.py#shape]] `Arc`, diviso in archi di al piu' 180 gradi.
+        L'asse y del documento e' rivolto verso il basso, quindi un arco antiorario ha `sweep-flag` 0.
+        """
+        if extent == 0:
+            return
+        angle = math.radians(start)
+        self._moveTo(x + radius * math.cos(angle), y + radius * math.sin(angle), color, width)
+
+        pieces = math.ceil(abs(extent) / 180)
+        prefix = ' A%s %s 0 0 %s ' % (_number(radius), _number(radius), '0' if extent > 0 else '1')
+        for piece in range(1, pieces + 1):
+            angle = math.radians(start + extent * piece / pieces)
+            self.last = _number(x + radius * math.cos(angle)) + ' ' + _number(-(y + radius * math.sin(angle)))
+            self.write(prefix + self.last)
+
+    def shape(self, shape):
+        """
+        Scrive un elemento della display list di [[graphics.py#headless]].
+        """
+        if isinstance(shape, Segment):
+            self.segment(*shape.fields())
+        elif isinstance(shape, Arc):
+            self.arc(*shape.fields())
+        else:
+            raise TypeError("Elemento della display list sconosciuto: " + repr(shape))
+
+    def clear(self):
+        self._closePath()
+        self.layer += 1
+        self.write('</g>\n<g id="layer%d">\n' % self.layer)
+
+    def close(self):
+        self._closePath()
+        self.write('</g>\n')
+        if self.layer > 0:
+            self.write('<style>svg > g:not(#layer%d) { display: none }</style>\n' % self.layer)
+        self.write('</svg>\n')
+        if self.owned:
+            self.out.close()
+        else:
+            self.out.flush()
+
+#===write svg===
+def writeSvg(displayList, out, width=WIDTH, height=HEIGHT, tolerance=None):
+    """
+    Esporta in SVG una display list prodotta dal backend `headless`.
+    Se `tolerance` non e' `None` la display list viene prima ottimizzata da [[drawing.py#optimize drawing]] con questa tolleranza.
+    """
+    if tolerance is not None:
+        displayList = optimizeDrawing(displayList, tolerance)
+    writer = SvgWriter(out, width, height)
+    for shape in displayList:
+        writer.shape(shape)
+    writer.close()
+
+#===svg backend===
+class SvgBackend(HeadlessBackend):
+    """
+    Backend che calcola la tartaruga come `headless` ma scrive ogni tratto con **SvgWriter** appena viene disegnato,
+    invece di aggiungerlo alla display list, che resta vuota.
+    Si usa passandolo a [[interpreter.py#run]]: `run(code, graphics=SvgBackend('disegno.svg'))`.
+    """
+
+    def __init__(self, out, width=WIDTH, height=HEIGHT):
+        HeadlessBackend.__init__(self)
+        self.writer = SvgWriter(out, width, height)
+
+    def drawSegment(self, x1, y1, x2, y2):
+        self.writer.segment(x1, y1, x2, y2, self.color, self.width)
+
+    def drawSegments(self, x1, y1, x2, y2):
+        for coordinates in zip(x1, y1, x2, y2):
+            self.writer.segment(*coordinates, self.color, self.width)
+
+    def drawArc(self, x, y, radius, start, extent):
+        self.writer.arc(x, y, radius, start, extent, self.color, self.width)
+
+    def clear(self):
+        self.writer.clear()
+
+    def close(self):
+        """
+        Completa il documento, il risultato e' `None`.
+        """
+        self.writer.close()
+        return None
+
+if __name__ == '__main__':
+    from interpreter import run
+    with open(sys.argv[1]) as inf:
+        code = inf.read()
+    run(code, graphics=SvgBackend(sys.argv[2] if len(sys.argv) > 2 else sys.argv[1].rsplit('.', 1)[0] + '.svg'))
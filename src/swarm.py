@@ -0,0 +1,297 @@
+from graphics import Backend, HeadlessBackend, MOVES_MIN, MOVES_CHUNK
+import sys
+
+import numpy as np
+
+"""
+Backend `swarm` di [[graphics.py]]: molte tartarughe che eseguono gli stessi comandi.
+
+Lo stato delle tartarughe e' salvato per colonne in array **numpy**: `xs`, `ys`, `headings`, `downs` e `pens`,
+l'indice nella tabella `penTable` delle coppie `(colore, spessore)` usate dalle tartarughe.
+Il programma indica a quali tartarughe inviare i comandi grafici:
+
+    - `CREATETURTLES n` (o `CRT n`) crea `n` nuove tartarughe al centro, con le direzioni distribuite uniformemente sull'angolo giro
+    - `TELL n` oppure `TELL [n m ...]` invia i comandi successivi alle tartarughe indicate
+    - `TELLALL` invia i comandi successivi a tutte le tartarughe esistenti
+    - `ASK n [...]` oppure `ASK [n m ...] [...]` esegue il blocco con le tartarughe indicate, poi torna a quelle precedenti
+
+All'inizio esiste solo la tartaruga 0, che riceve i comandi.
+Quando i comandi sono inviati a piu' tartarughe ogni comando aggiorna tutte insieme con operazioni vettoriali
+e i tratti finiscono nella display list del backend `headless`, raggruppati per penna.
+Quando sono inviati a una sola tartaruga il suo stato viene copiato negli attributi di **HeadlessBackend**
+e i comandi sono quelli del backend `headless`, compresi i **Fragment** di [[procedureCache.py]].
+"""
+
+#===swarm backend===
+class SwarmBackend(HeadlessBackend):
+    """
+    `ids` sono le tartarughe a cui vengono inviati i comandi. Se e' una sola, `current`, `active` vale `None`
+    e lo stato della tartaruga e' negli attributi di **HeadlessBackend**, altrimenti `active` e' l'array degli indici
+    e lo stato e' negli array. **_store** e **_load** copiano lo stato di `current` tra attributi e array.
+    """
+
+    def __init__(self):
+        HeadlessBackend.__init__(self)
+        self.penTable = []
+        self.penIds = {}
+        self.xs = np.zeros(1)
+        self.ys = np.zeros(1)
+        self.headings = np.zeros(1)
+        self.downs = np.ones(1, dtype=bool)
+        self.pens = np.full(1, self._pen(self.color, self.width), dtype=np.int64)
+        self.ids = [0]
+        self.current = 0
+        self.active = None
+
+    def _pen(self, color, width):
+        """
+        Indice della penna in `penTable`, aggiunta se non e' ancora stata usata.
+        """
+        key = (color, width)
+        pen = self.penIds.get(key)
+        if pen is None:
+            pen = self.penIds[key] = len(self.penTable)
+            self.penTable.append(key)
+        return pen
+
+    def _store(self):
+        if self.active is None:
+            index = self.current
+            self.xs[index], self.ys[index], self.headings[index] = self.x, self.y, self.heading
+            self.downs[index] = self.down
+            self.pens[index] = self._pen(self.color, self.width)
+
+    def _load(self, index):
+        self.x, self.y, self.heading = float(self.xs[index]), float(self.ys[index]), float(self.headings[index])
+        self.down = bool(self.downs[index])
+        self.color, self.width = self.penTable[self.pens[index]]
+
+    #===turtles===
+    def createTurtles(self, count):
+        """
+        Aggiunge `count` tartarughe con la penna abbassata, nera e di spessore 1, senza cambiare quelle che ricevono i comandi.
+        """
+        if count != int(count) or count < 0:
+            raise ValueError("Il numero di tartarughe da creare deve essere un intero non negativo")
+        count = int(count)
+        self.xs = np.concatenate((self.xs, np.zeros(count)))
+        self.ys = np.concatenate((self.ys, np.zeros(count)))
+        self.headings = np.concatenate((self.headings, np.arange(count) * (360 / max(count, 1))))
+        self.downs = np.concatenate((self.downs, np.ones(count, dtype=bool)))
+        self.pens = np.concatenate((self.pens, np.full(count, self._pen((0, 0, 0), 1), dtype=np.int64)))
+
+    def tell(self, turtles):
+        """
+        Invia i comandi successivi alle tartarughe `turtles`, una lista di indici: gli indici ripetuti vengono ignorati.
+        """
+        ids = []
+        for turtle in turtles:
+            if turtle != int(turtle) or not 0 <= turtle < len(self.xs):
+                raise ValueError("La tartaruga " + str(turtle) + " non esiste")
+            ids.append(int(turtle))
+        ids = list(dict.fromkeys(ids))
+
+        self._store()
+        self.ids = ids
+        if len(ids) == 1:
+            self.current, self.active = ids[0], None
+            self._load(ids[0])
+        else:
+            self.active = np.array(ids)
+
+    def tellAll(self):
+        self.tell(range(len(self.xs)))
+
+    def addressed(self):
+        return list(self.ids)
+
+    #===drawing===
+    def _drawAll(self, turtles, x1, y1, x2, y2):
+        """
+        Disegna i segmenti delle tartarughe `turtles` con **drawSegments**, un gruppo per ogni penna.
+        """
+        if self.budget is not None:
+            self.budget.draw(len(x1))
+        pens = self.pens[turtles]
+        color, width = self.color, self.width
+        groups = [(pens[0], None)] if pens.min() == pens.max() else [(pen, pens == pen) for pen in np.unique(pens)]
+        for pen, mask in groups:
+            self.color, self.width = self.penTable[pen]
+            if mask is None:
+                self.drawSegments(x1.tolist(), y1.tolist(), x2.tolist(), y2.tolist())
+            else:
+                self.drawSegments(x1[mask].tolist(), y1[mask].tolist(), x2[mask].tolist(), y2[mask].tolist())
+        self.color, self.width = color, width
+
+    def _moveAll(self, xs, ys):
+        """
+        Porta le tartarughe che ricevono i comandi nelle posizioni `xs`, `ys`, disegnando i segmenti di quelle con la penna abbassata.
+        """
+        active = self.active
+        down = self.downs[active]
+        if down.any():
+            self._drawAll(active[down], self.xs[active][down], self.ys[active][down], xs[down], ys[down])
+        self.xs[active], self.ys[active] = xs, ys
+
+    def _repen(self, change):
+        """
+        Sostituisce la penna delle tartarughe che ricevono i comandi con `change(colore, spessore)`, una volta per ogni penna diversa.
+        """
+        pens, inverse = np.unique(self.pens[self.active], return_inverse=True)
+        self.pens[self.active] = np.array([self._pen(*change(*self.penTable[pen])) for pen in pens], dtype=np.int64)[inverse]
+
+    #===commands===
+    def _moveTo(self, x, y):
+        if self.active is None:
+            return HeadlessBackend._moveTo(self, x, y)
+        count = len(self.active)
+        self._moveAll(np.full(count, float(x)), np.full(count, float(y)))
+
+    def forward(self, distance):
+        if self.active is None:
+            return HeadlessBackend.forward(self, distance)
+        angles = np.radians(self.headings[self.active])
+        self._moveAll(self.xs[self.active] + distance * np.cos(angles), self.ys[self.active] + distance * np.sin(angles))
+
+    def right(self, angle):
+        if self.active is None:
+            return HeadlessBackend.right(self, angle)
+        self.headings[self.active] = (self.headings[self.active] - angle) % 360
+
+    def left(self, angle):
+        if self.active is None:
+            return HeadlessBackend.left(self, angle)
+        self.headings[self.active] = (self.headings[self.active] + angle) % 360
+
+    def setheading(self, angle):
+        if self.active is None:
+            return HeadlessBackend.setheading(self, angle)
+        self.headings[self.active] = angle % 360
+
+    def setx(self, x):
+        if self.active is None:
+            return HeadlessBackend.setx(self, x)
+        self._moveAll(np.full(len(self.active), float(x)), self.ys[self.active])
+
+    def sety(self, y):
+        if self.active is None:
+            return HeadlessBackend.sety(self, y)
+        self._moveAll(self.xs[self.active], np.full(len(self.active), float(y)))
+
+    def home(self):
+        if self.active is None:
+            return HeadlessBackend.home(self)
+        self._moveTo(0.0, 0.0)
+        self.headings[self.active] = 0.0
+
+    def circle(self, radius, extent=None):
+        """
+        Come **HeadlessBackend.circle**, i centri e le posizioni finali sono calcolati per tutte le tartarughe insieme,
+        gli archi vengono aggiunti uno alla volta.
+        """
+        if self.active is None:
+            return HeadlessBackend.circle(self, radius, extent)
+        active = self.active
+        extent = 360 if extent is None else extent
+        turn = extent if radius >= 0 else -extent
+        headings = self.headings[active]
+        normals = np.radians(headings + 90)
+        cx, cy = self.xs[active] + radius * np.cos(normals), self.ys[active] + radius * np.sin(normals)
+        starts = (headings - 90 if radius >= 0 else headings + 90) % 360
+
+        if radius != 0:
+            color, width = self.color, self.width
+            down = self.downs[active]
+            if self.budget is not None:
+                self.budget.draw(int(down.sum()))
+            for x, y, start, pen in zip(cx[down].tolist(), cy[down].tolist(), starts[down].tolist(), self.pens[active][down].tolist()):
+                self.color, self.width = self.penTable[pen]
+                self.drawArc(x, y, abs(radius), start, turn)
+            self.color, self.width = color, width
+        ends = np.radians(starts + turn)
+        self.xs[active], self.ys[active] = cx + abs(radius) * np.cos(ends), cy + abs(radius) * np.sin(ends)
+        self.headings[active] = (headings + turn) % 360
+
+    def repeatMoves(self, times, moves):
+        """
+        Come **HeadlessBackend.repeatMoves**, con una riga per ogni tartaruga: le posizioni sono le somme cumulative
+        lungo le righe e i segmenti vengono disegnati nello stesso ordine dei comandi eseguiti uno alla volta.
+        Se le tartarughe con la penna abbassata non hanno tutte la stessa penna, o il ciclo e' corto, ogni comando
+        viene eseguito da tutte le tartarughe insieme.
+        """
+        if self.active is None:
+            return HeadlessBackend.repeatMoves(self, times, moves)
+        active = self.active
+        down = self.downs[active]
+        pens = self.pens[active][down]
+        if times * len(moves) * len(active) < MOVES_MIN or (len(pens) and pens.min() != pens.max()):
+            return Backend.repeatMoves(self, times, moves)
+
+        distances = np.array([value if name == 'forward' else -value if name == 'back' else 0 for name, value in moves], dtype=float)
+        turns = np.array([value if name == 'left' else -value if name == 'right' else 0 for name, value in moves], dtype=float)
+        steps = np.array([name in ('forward', 'back') for name, _ in moves])
+        before = np.concatenate(([0.0], np.cumsum(turns)[:-1]))
+        total = float(turns.sum())
+        distances, before = distances[steps], before[steps]
+
+        headings = self.headings[active]
+        xs, ys = self.xs[active], self.ys[active]
+        chunk = max(1, MOVES_CHUNK // (len(moves) * len(active)))
+        for first in range(0, times, chunk):
+            count = min(chunk, times - first)
+            if len(distances):
+                offsets = (np.arange(count)[:, None] * total + before).ravel()
+                angles = np.radians((headings[:, None] + offsets) % 360)
+                lengths = np.tile(distances, count)
+                x2 = xs[:, None] + np.cumsum(lengths * np.cos(angles), axis=1)
+                y2 = ys[:, None] + np.cumsum(lengths * np.sin(angles), axis=1)
+                if len(pens):
+                    # trasposti, cosi' i segmenti sono ordinati per passo e poi per tartaruga
+                    x1 = np.concatenate((xs[down, None], x2[down, :-1]), axis=1).T.ravel()
+                    y1 = np.concatenate((ys[down, None], y2[down, :-1]), axis=1).T.ravel()
+                    if self.budget is not None:
+                        self.budget.draw(len(x1))
+                    color, width = self.color, self.width
+                    self.color, self.width = self.penTable[pens[0]]
+                    self.drawSegments(x1.tolist(), y1.tolist(), x2[down].T.ravel().tolist(), y2[down].T.ravel().tolist())
+                    self.color, self.width = color, width
+                xs, ys = x2[:, -1], y2[:, -1]
+            headings = (headings + count * total) % 360
+        self.xs[active], self.ys[active] = xs, ys
+        self.headings[active] = headings
+
+    def penState(self):
+        """
+        I **Fragment** registrano i tratti di una sola tartaruga, con piu' tartarughe la cache delle procedure non viene usata.
+        """
+        if self.active is None:
+            return HeadlessBackend.penState(self)
+        return None
+
+    def penup(self):
+        if self.active is None:
+            return HeadlessBackend.penup(self)
+        self.downs[self.active] = False
+
+    def pendown(self):
+        if self.active is None:
+            return HeadlessBackend.pendown(self)
+        self.downs[self.active] = True
+
+    def pencolor(self, r, g, b):
+        if self.active is None:
+            return HeadlessBackend.pencolor(self, r, g, b)
+        if not all(0 <= value <= 255 for value in (r, g, b)):
+            raise ValueError("I valori di un colore devono essere compresi tra 0 e 255")
+        self._repen(lambda color, width: ((r, g, b), width))
+
+    def pensize(self, width):
+        if self.active is None:
+            return HeadlessBackend.pensize(self, width)
+        self._repen(lambda color, _: (color, width))
+
+if __name__ == '__main__':
+    from interpreter import run
+    with open(sys.argv[1]) as inf:
+        displayList = run(inf.read(), graphics=SwarmBackend())
+    print(len(displayList), 'tratti')
@@ -0,0 +1,64 @@
+from logoAst import If, IfElse, Output, ProcCall, Block
+
+"""
+Chiamate di procedura in posizione di coda.
+Una chiamata e' in coda quando e' l'ultima istruzione del corpo di una procedura, l'ultima istruzione
+del blocco di un `IF` o di un `IFELSE` in coda, oppure il valore di un `OUTPUT` in coda.
+Dopo una chiamata in coda la procedura non ha piu' nulla da eseguire, quindi il suo frame puo' essere rilasciato
+e la procedura chiamata puo' essere eseguita al suo posto invece che al suo interno:
+la ricorsione in coda non consuma stack python e non ha un limite di profondita'.
+"""
+
+"""
+Valori di `tail` assegnati ai nodi `ProcCall` in coda:
+con `STATEMENT` il valore della chiamata viene scartato, con `OUTPUT` diventa il valore della procedura.
+"""
+STATEMENT = 'statement'
+OUTPUT = 'output'
+
+class TailCall:
+    """
+    Restituita da una chiamata in coda al posto del suo valore: essendo l'ultima istruzione eseguita,
+    diventa il valore del corpo della procedura e l'invocazione in corso prosegue eseguendo `function` con i parametri `values`.
+    `keep` e' falso se il valore della chiamata deve essere scartato.
+    """
+    __slots__ = ('function', 'values', 'keep')
+
+    def __init__(self, function, values, keep):
+        self.function = function
+        self.values = values
+        self.keep = keep
+
+#===last statement===
+def _last(nodes):
+    """
+    Restituisce l'ultima istruzione di una sequenza di linee, `None` se sono tutte vuote.
+    """
+    for node in reversed(nodes):
+        if node.children:
+            return node.children[-1]
+    return None
+
+#===tail position===
+def _tailPosition(ast):
+    """
+    Generatore delle chiamate in coda a partire dall'istruzione `ast`, che e' in posizione di coda.
+    """
+    if isinstance(ast, ProcCall):
+        yield ast, STATEMENT
+    elif isinstance(ast, Output) and isinstance(ast.children[0], ProcCall):
+        yield ast.children[0], OUTPUT
+    elif isinstance(ast, (If, IfElse)):
+        for block in ast.children[1:]:
+            if isinstance(block, Block) and block.children:
+                yield from _tailPosition(block.children[-1])
+
+#===tail calls===
+def tailCalls(ast):
+    """
+    Restituisce le coppie `(nodo, tipo)` delle chiamate in coda nel corpo della procedura `ast`.
+    """
+    last = _last(ast.children)
+    if last is None:
+        return []
+    return list(_tailPosition(last))
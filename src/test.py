@@ -19,9 +19,14 @@
 
 from io import StringIO
 from contextlib import redirect_stdout, redirect_stderr
+import os
+import sys
+import tempfile
+import threading
+import time
 import unittest
 
-from interpreter import run
+from interpreter import run, Interpreter, ENGINES
 from parser import parse
 
 
@@ -53,6 +58,8 @@ PARSER_TESTS = {
         BK 1
         CLEAN
         CLEARSCREEN
+        CREATETURTLES 2
+        CRT 2
         CS
         FORWARD 1
         FD 1
@@ -69,6 +76,7 @@ PARSER_TESTS = {
         PRINT 1
         PR 1
         ( PRINT 1 2 )
+        REFRESH
         RERANDOM
         ( RERANDOM 1 )
         RIGHT 1
@@ -78,11 +86,15 @@ PARSER_TESTS = {
         SETPENCOLOR [ 1 2 3 ]
         SETPC [ 1 2 3 ]
         SETPENSIZE 1
+        SETSPEED 0
         SETX 1
         SETXY 1 2 
         SETY 1
         SHOWTURTLE
         ST
+        TELL 1
+        TELL [ 1 2 ]
+        TELLALL
     """, 'operations': r"""
     
         ( PRINT
@@ -142,6 +154,11 @@ PARSER_TESTS = {
     
         while :c < 1 [make "c :c + 1]
         
+    """, 'ask': r"""
+    
+        ask 1 [fd 100 rt 90]
+        ask [1 :a 3] [repeat 4 [fd 100 rt 90]]
+        
     """, 'koch': r"""
     
         to line :count :length
@@ -471,8 +488,51 @@ INTERPRETER_TESTS = {
             ifelse [true False and [not False] [5>4]] [pr 2] [pr 4]
         """,
         '2\n2\n'
+    ], 'constant_expressions': [
+        r"""
+            pr 3 * 4 + 1
+            pr sum 2 3
+            pr (sum 1 2 (product 2 -3))
+            pr 7 / 2
+            pr -(8 / 2)
+            pr 2 < 3
+            pr and True not False
+        """,
+        '13\n5\n-3\n3.5\n-4\nTrue\nTrue\n'
+    ], 'constant_error_not_reached': [
+        r"""
+            if 1 > 2 [pr 1 / 0]
+            pr 2
+        """,
+        '2\n'
+    ], 'tail_recursion': [
+        r"""
+            to down :n
+                if :n = 0 [pr "done stop]
+                down :n - 1
+            end
+            to sumto :n :acc
+                ifelse :n = 0 [output :acc] [output (sumto :n - 1 :acc + :n)]
+            end
+            down 5000
+            pr (sumto 5000 0)
+        """,
+        'done\n12502500\n'
+    ], 'tail_call_value': [
+        r"""
+            to f :n
+                if :n = 0 [output 5]
+                f :n - 1
+            end
+            to g :n
+                output f :n
+            end
+            pr f 0
+            pr g 2
+        """,
+        '5\nNone\n'
     ]
-    
+
 }
 
 TYPECHEKING_TESTS = {
@@ -685,9 +745,1059 @@ TYPECHEKING_TESTS = {
             pr 1 + not False
         """,
         TypeError
+    ],
+    'tell_word': [
+        r"""
+            tell "a
+        """,
+        TypeError
+    ],
+    'ask_word': [
+        r"""
+            ask [1 "a] [fd 1]
+        """,
+        TypeError
+    ]
+
+}
+# Test eseguiti con tutti i motori di esecuzione, viene verificato che sollevino
+# la stessa eccezione con lo stesso messaggio.
+
+ENGINE_ERROR_TESTS = {
+    'arity_more': [
+        r"""
+            to f :a
+                output :a
+            end
+            pr (f 1 2)
+        """,
+        TypeError,
+        "Numero di parametri per la funzione `f` non corretto"
+    ],
+    'arity_fewer': [
+        r"""
+            to f :a :b
+                output :a
+            end
+            pr (f 1)
+        """,
+        TypeError,
+        "Numero di parametri per la funzione `f` non corretto"
+    ],
+    'arity_tail_call': [
+        r"""
+            to g :n
+                output (f :n 2)
+            end
+            to f :a
+                output :a
+            end
+            pr g 1
+        """,
+        TypeError,
+        "Numero di parametri per la funzione `f` non corretto"
+    ],
+    'arity_redeclared': [
+        r"""
+            to f :a
+                output :a
+            end
+            to f :a :b
+                output :b
+            end
+            pr f 1
+        """,
+        TypeError,
+        "Numero di parametri per la funzione `f` non corretto"
+    ],
+    'undeclared_procedure': [
+        r"""
+            pr (h 1 2)
+        """,
+        NameError,
+        "La funzione non è stata dichiarata"
     ]
+}
+
+"""
+Programmi eseguiti con tutti i motori, che devono stampare e disegnare le stesse cose del motore `tree`.
+"""
+ENGINE_PROGRAMS = {
+    'fib': """
+        to fib :n
+            if :n < 2 [output :n]
+            output (fib :n - 1) + (fib :n - 2)
+        end
+        print fib 15
+    """,
+    'loops': """
+        make "i 0
+        while :i < 5 [make "i :i + 1 repeat :i [fd :i rt 360 / :i] print :i * :i]
+        ifelse :i = 5 [print "five] [print "other]
+    """,
+    'drawing': """
+        to flower :size
+            repeat 6 [arc 60 :size rt 60 setpc [200 0 100] fd :size / 2 bk :size / 2]
+        end
+        setpensize 2 flower 30 pu setxy 50 50 pd flower 10.5 print (sum 1 2 3)
+    """,
+    'procedures': """
+        to double :x
+            output :x * 2
+        end
+        to show :x :y
+            print :x print :y stop print "never
+        end
+        (show double 3 (double 4) + 1)
+        print quotient 7 2 print 7 / 2 print power 2 10
+    """
+}
+
+class TestEngines(unittest.TestCase):
+
+    def _execute(self, engine, code, optimize):
+        output = StringIO()
+        with redirect_stdout(output):
+            shapes = Interpreter(engine, optimize=optimize, graphics='headless').run(code)
+        return output.getvalue(), [shape.fields() for shape in shapes]
+
+    def test_closure_matches_tree(self):
+        for name, code in ENGINE_PROGRAMS.items():
+            for optimize in (True, False):
+                with self.subTest(name=name, optimize=optimize):
+                    expected = self._execute('tree', code, optimize)
+                    self.assertTrue(expected[0])
+                    self.assertEqual(expected, self._execute('closure', code, optimize))
+
+    def test_errors(self):
+        for name, (source, error, message) in ENGINE_ERROR_TESTS.items():
+            for engine in ENGINES:
+                with self.subTest(name=name, engine=engine):
+                    with self.assertRaises(error) as raised, redirect_stdout(StringIO()):
+                        Interpreter(engine, graphics='headless').run(source)
+                    self.assertEqual(message, str(raised.exception))
+
+DEEP_PROGRAM = r"""
+    to f :n
+        if :n = 0 [output 0]
+        output 1 + f :n - 1
+    end
+    print f %d
+"""
+
+class TestStackEngine(unittest.TestCase):
+
+    def test_deep_recursion(self):
+        # una ricorsione non in coda piu' profonda del limite di python
+        depth = 3 * sys.getrecursionlimit()
+        output = StringIO()
+        with redirect_stdout(output):
+            Interpreter('stack', graphics='headless').run(DEEP_PROGRAM % depth)
+        self.assertEqual(str(depth), output.getvalue().strip())
 
+    def test_max_depth(self):
+        import stackMachine
+        saved = stackMachine.MAX_DEPTH
+        stackMachine.MAX_DEPTH = 50
+        try:
+            with self.assertRaises(RecursionError) as raised, redirect_stdout(StringIO()):
+                Interpreter('stack', graphics='headless').run(DEEP_PROGRAM % 100)
+        finally:
+            stackMachine.MAX_DEPTH = saved
+        self.assertEqual("Superata la profondità massima di 50 chiamate nella funzione `f`", str(raised.exception))
+
+class TestProgramCache(unittest.TestCase):
+
+    def test_memory_limit(self):
+        import transpiler
+        with tempfile.TemporaryDirectory() as directory:
+            limit, transpiler.MAX_PROGRAMS = transpiler.MAX_PROGRAMS, 4
+            try:
+                for index in range(10):
+                    transpiler.loadProgram('pr "memory_limit_' + str(index), cacheDir=directory)
+                self.assertEqual(4, len(transpiler.CODE_CACHE))
+                self.assertIn(transpiler.programKey('pr "memory_limit_9'), transpiler.CODE_CACHE)
+            finally:
+                transpiler.MAX_PROGRAMS = limit
+
+    def test_disk_prune(self):
+        import transpiler
+        with tempfile.TemporaryDirectory() as directory:
+            for index in range(10):
+                transpiler.loadProgram('pr ' + str(index), cacheDir=directory)
+            programs = os.path.join(directory, 'python')
+            for age, name in enumerate(sorted(os.listdir(programs))):
+                os.utime(os.path.join(programs, name), (age, age))
+            newest = max(os.listdir(programs), key=lambda name: os.path.getmtime(os.path.join(programs, name)))
+            transpiler.pruneDisk(programs, maxPrograms=3)
+            names = os.listdir(programs)
+            self.assertEqual(3, len([name for name in names if name.endswith('.pyc')]))
+            self.assertEqual(6, len(names))
+            self.assertIn(newest, names)
+
+AST_PROGRAM = r"""
+    to shape :n :word
+        if :n < 0 [stop]
+        ifelse "true [output -:n] [output :word]
+    end
+    make "i 0
+    while :i < 2 [make "i :i + 1 repeat 2 [fd 10 rt 90]]
+    ask 0 [fd 5]
+    print (shape 3 "abc) print readword print (sum 1 2)
+"""
+
+class TestAst(unittest.TestCase):
+
+    def _assertSameTree(self, expected, actual):
+        self.assertIs(type(expected), type(actual))
+        self.assertEqual(expected.fields(), actual.fields())
+        self.assertIsInstance(actual.children, tuple)
+        self.assertFalse(hasattr(actual, '__dict__'))
+        self.assertEqual(len(expected.children), len(actual.children))
+        for child, other in zip(expected.children, actual.children):
+            self._assertSameTree(child, other)
+
+    def test_encode_decode(self):
+        import marshal
+        from logoAst import encode, decode
+        for name, code in dict(ENGINE_PROGRAMS, nodes=AST_PROGRAM).items():
+            with self.subTest(name=name):
+                tree = parse(code, cache=False)
+                data = encode(tree)
+                self.assertEqual(data, marshal.loads(marshal.dumps(data)))
+                decoded = decode(data)
+                self._assertSameTree(tree, decoded)
+                self.assertEqual(data, encode(decoded))
+
+    def test_node_types(self):
+        # AST_PROGRAM contiene ogni tipo di nodo prodotto dal parser, quelli che mancano sono creati solo da optimizer.py
+        from logoAst import encode, NODE_TYPES
+        kinds = set()
+        def collect(data):
+            kinds.add(data[0])
+            for child in data[2]:
+                collect(child)
+        collect(encode(parse(AST_PROGRAM, cache=False)))
+        self.assertEqual(set(NODE_TYPES) - {'constant', 'turtleRepeat'}, kinds)
+
+    def test_derived_slots(self):
+        from logoAst import encode, decode
+        tree = decode(encode(parse('print -3 + 4', cache=False)))
+        operation = tree.children[0].children[0].children[0]
+        self.assertEqual((None, -1), (operation.function, operation.children[0].factor))
+
+class TestOptimizer(unittest.TestCase):
+
+    def test_large_power_not_folded(self):
+        import optimizer
+        ast = parse('if 1 > 2 [pr power 10 10000000]\nmake "x (product 2 (power 3 1000) (power 3 1000))')
+        start = time.perf_counter()
+        optimizer.optimize(ast)
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(3, optimizer.report()['skipped'])
+
+    def test_small_power_folded(self):
+        import optimizer
+        optimizer.optimize(parse('pr power 2 10'))
+        self.assertEqual(1, optimizer.report()['folded'])
+        self.assertEqual(0, optimizer.report()['skipped'])
+
+class TestVectorizedMoves(unittest.TestCase):
+
+    def _draw(self, code, optimize, budget=None):
+        interpreter = Interpreter('tree', optimize=optimize, graphics='headless', budget=budget)
+        shapes = interpreter.run(code)
+        graphics = interpreter.graphics
+        return shapes, (graphics.x, graphics.y, graphics.heading)
+
+    def _assertClose(self, expected, actual):
+        (expectedShapes, (x, y, heading)), (shapes, (x2, y2, heading2)) = expected, actual
+        self.assertAlmostEqual(x, x2, places=6)
+        self.assertAlmostEqual(y, y2, places=6)
+        self.assertAlmostEqual(0, (heading - heading2 + 180) % 360 - 180, places=6)
+        self.assertEqual(len(expectedShapes), len(shapes))
+        for shape, other in zip(expectedShapes, shapes):
+            for value, otherValue in zip(shape.fields(), other.fields()):
+                if isinstance(value, float):
+                    self.assertAlmostEqual(value, otherValue, places=6)
+                else:
+                    self.assertEqual(value, otherValue)
+
+    def test_long_loop(self):
+        import optimizer
+        code = 'repeat 3600 [fd 1 rt 0.1] fd 1'
+        vectorized = self._draw(code, True)
+        self.assertEqual(1, optimizer.report()['vectorized'])
+        self._assertClose(self._draw(code, False), vectorized)
+
+    def test_moves_min(self):
+        # 62 movimenti vengono eseguiti un comando alla volta, 64 calcolati con numpy
+        from graphics import MOVES_MIN
+        for times in (MOVES_MIN // 2 - 1, MOVES_MIN // 2):
+            code = 'repeat %d [fd 3 rt 7] bk 2' % times
+            with self.subTest(times=times):
+                self._assertClose(self._draw(code, False), self._draw(code, True))
+
+    def test_chunks(self):
+        # con un limite di tempo il ciclo viene eseguito a blocchi di MOVES_CHUNK movimenti
+        from budget import Budget
+        import interpreter, graphics
+        code = 'repeat 3600 [fd 1 rt 0.1 bk 0.5 lt 0.05] fd 1'
+        expected = self._draw(code, False)
+        saved = interpreter.MOVES_CHUNK, graphics.MOVES_CHUNK
+        interpreter.MOVES_CHUNK = graphics.MOVES_CHUNK = 100
+        try:
+            self._assertClose(expected, self._draw(code, True, Budget(seconds=600)))
+        finally:
+            interpreter.MOVES_CHUNK, graphics.MOVES_CHUNK = saved
+
+SLOT_TESTS = {
+    'global': ('to setv :a :v\n make :a :v\n end\n make "x 1 (setv "x 42) print :x', '42\n'),
+    'parameter name': ('to g :name :n\n make :name 7\n print :n\n end\n (g "n 1) print :n', '1\n7\n'),
+    'own name': ('to r :name\n make :name 9\n print :name\n end\n r "name print :name', 'name\n9\n'),
+    'global name': ('make "v "z\n to s :w\n make :v :w\n end\n s 11 print :z', '11\n')
+}
+
+class TestSlots(unittest.TestCase):
+
+    def test_dynamic_make(self):
+        # make con un nome calcolato dentro una procedura assegna sempre una variabile globale, anche se ha il nome di un parametro
+        for name, (code, expected) in SLOT_TESTS.items():
+            for engine in ENGINES:
+                with self.subTest(name=name, engine=engine):
+                    output = StringIO()
+                    with redirect_stdout(output):
+                        Interpreter(engine, graphics='headless').run(code)
+                    self.assertEqual(expected, output.getvalue())
+
+    def test_resolve(self):
+        from frames import resolve, LOCAL, GLOBAL
+        from logoAst import Make, Deref
+        tree, memory = resolve(parse(SLOT_TESTS['global'][0], cache=False))
+        def nodes(node, kind):
+            if isinstance(node, kind):
+                yield node
+            for child in node.children:
+                yield from nodes(child, kind)
+        self.assertEqual([None, memory.index['x']], [make.slot for make in nodes(tree, Make)])
+        self.assertEqual([(LOCAL, 0), (LOCAL, 1), (GLOBAL, memory.index['x'])], [(deref.scope, deref.slot) for deref in nodes(tree, Deref)])
+
+LOOP_RETURN_TESTS = {
+    'output': ("""
+        to f :limit
+            make "i 0
+            repeat 10 [repeat 10 [make "i :i + 1 if :i > :limit [output :i]]]
+            output -1
+        end
+        print f 25 print :i
+    """, '26\n26\n'),
+    'stop': ("""
+        to g :x
+            make "k 0
+            repeat 5 [while :k < 100 [make "k :k + 1 if :k = 7 [stop]]]
+            make "k -1
+        end
+        g 0 print :k
+    """, '7\n'),
+    'same line': ("""
+        to h :x
+            repeat 2 [output :x * 2 print "never]
+        end
+        print (h 4) + 1
+    """, '9\n'),
+    'recursion': ("""
+        to c :n
+            if :n = 0 [output 0]
+            while "true [repeat 3 [output 1 + c :n - 1]]
+        end
+        to d :n
+            while "true [if :n = 0 [output "done] output d :n - 1]
+        end
+        print c 20 print d 30
+    """, '20\ndone\n')
 }
+
+class TestLoopReturn(unittest.TestCase):
+
+    def test_nested_loops(self):
+        # OUTPUT e STOP dentro REPEAT e WHILE annidati terminano la procedura, non solo il ciclo
+        for name, (code, expected) in LOOP_RETURN_TESTS.items():
+            for engine in ENGINES:
+                for optimize in (True, False):
+                    with self.subTest(name=name, engine=engine, optimize=optimize):
+                        output = StringIO()
+                        with redirect_stdout(output):
+                            Interpreter(engine, optimize=optimize, graphics='headless').run(code)
+                        self.assertEqual(expected, output.getvalue())
+
+class TestServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        import server
+        cls.server = server.LogoServer(port=0, workers=1, queueSize=0, timeout=1.0, limits={'depth': 100}).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+
+    def _run(self, code, **options):
+        import server
+        return server.request(self.server.url('/run'), code, **options)
+
+    def test_run(self):
+        status, result = self._run('repeat 4 [fd 10 rt 90] pr readword', input=['7'], drawing='svg')
+        self.assertEqual(200, status)
+        self.assertEqual(('ok', '7\n', 4), (result['status'], result['stdout'], result['strokes']))
+        self.assertTrue(result['drawing'].startswith('<?xml'))
+
+    def test_tolerance(self):
+        code = 'repeat 8 [fd 5] rt 90 fd 5 bk 5'
+        drawings = [self._run(code, drawing='svg', **options)[1]['drawing'] for options in ({}, {'tolerance': 0})]
+        self.assertLess(len(drawings[1]), len(drawings[0]))
+
+    def test_limit(self):
+        status, result = self._run('while "true [make "x 1]', limits={'steps': 10})
+        self.assertEqual((200, 'limit', 'steps'), (status, result['status'], result['error']['resource']))
+        self.assertEqual({'used': 11, 'limit': 10}, result['usage']['steps'])
+        self.assertEqual(100, result['usage']['depth']['limit'])
+
+    def test_invalid(self):
+        import server
+        self.assertEqual(400, self._run('pr 1', engine='unknown')[0])
+        self.assertEqual(400, self._run('pr 1', limits={'steps': -1})[0])
+        self.assertEqual(400, self._run('pr 1', drawing='svg', tolerance=-1)[0])
+        self.assertEqual(413, self._run('pr 1 ' * server.MAX_SOURCE)[0])
+
+    def test_queue_full(self):
+        running = threading.Thread(target=self._run, args=('repeat 100000000 [make "x 1]',))
+        running.start()
+        time.sleep(0.3)
+        try:
+            self.assertEqual(503, self._run('pr 1')[0])
+        finally:
+            running.join()
+
+class TestServerStuckWorker(unittest.TestCase):
+
+    def test_stuck_worker_replaced(self):
+        import server
+        import signal
+
+        execute = server._execute
+        def blocked(request):
+            # il worker ignora SIGALRM, come se fosse bloccato in un calcolo che il segnale non interrompe
+            signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGALRM])
+            return execute(request)
+
+        grace, server.GRACE, server._execute = server.GRACE, 0.3, blocked
+        try:
+            logo = server.LogoServer(port=0, workers=1, queueSize=1, timeout=0.2).start()
+        finally:
+            server._execute = execute
+        try:
+            status, result = server.request(logo.url('/run'), 'while "true [make "x 1]')
+            self.assertEqual(504, status)
+            self.assertEqual(1, logo.report()['killed'])
+            status, result = server.request(logo.url('/run'), 'pr 1 + 2')
+            self.assertEqual((200, '3\n'), (status, result['stdout']))
+        finally:
+            server.GRACE = grace
+            logo.close()
+
+class TestAsyncSessions(unittest.TestCase):
+
+    def _events(self, code, input=None):
+        import asyncio
+        from asyncRunner import runAsync
+
+        async def session():
+            events = asyncio.Queue()
+            try:
+                await runAsync(code, input=input, events=events)
+            except Exception:
+                pass
+            result = []
+            while not events.empty():
+                kind, value = events.get_nowait()
+                result.append((kind, len(value) if kind == 'draw' else value))
+            return result
+        return asyncio.run(session())
+
+    def test_event_order(self):
+        self.assertEqual([('draw', 2), ('clear', None), ('draw', 1), ('print', '1'), ('end', None)],
+                         self._events('fd 10 rt 90 fd 10 cs fd 5 pr 1'))
+
+    def test_readword(self):
+        import asyncio
+        self.assertEqual([('print', 'ciao'), ('print', '4'), ('end', None)],
+                         self._events('pr "ciao pr readword + 1', input=lambda: asyncio.sleep(0, '3')))
+
+    def test_readword_without_input(self):
+        events = self._events('pr 1 pr readword')
+        self.assertEqual(('print', '1'), events[0])
+        self.assertEqual('end', events[-1][0])
+        self.assertIsInstance(events[-1][1], EOFError)
+
+    def test_syntax_error(self):
+        with redirect_stdout(StringIO()), redirect_stderr(StringIO()):
+            events = self._events('pr [')
+        self.assertEqual(1, len(events))
+        self.assertIsInstance(events[0][1], SyntaxError)
+
+# Programma dei test sul budget: 21 chiamate, 15 iterazioni e 15 tratti disegnati.
+
+BUDGET_PROGRAM = r"""
+    to r :n
+        if :n = 0 [output 0]
+        output 1 + r :n - 1
+    end
+    make "x r 20
+    repeat 10 [fd 1 rt 36]
+    make "i 0
+    while :i < 5 [make "i :i + 1 arc 90 10]
+"""
+
+CACHED_BUDGET_PROGRAM = r"""
+    to side :s
+        fd :s rt 90
+    end
+    to sq :s
+        repeat 4 [side :s]
+    end
+    repeat 100 [sq 10]
+"""
+
+class TestBudget(unittest.TestCase):
+
+    def _run(self, engine, code=BUDGET_PROGRAM, optimize=None, **limits):
+        from budget import Budget
+        budget = Budget(**limits)
+        with redirect_stdout(StringIO()):
+            Interpreter(engine, optimize=optimize, graphics='headless', budget=budget).run(code)
+        return budget
+
+    def test_report(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                report = self._run(engine, steps=36, depth=21, segments=15).report()
+                used = {resource: value['used'] for resource, value in report.items() if resource != 'seconds'}
+                self.assertEqual({'steps': 36, 'depth': 21, 'segments': 15}, used)
+                self.assertEqual(36, report['steps']['limit'])
+                self.assertIsNone(report['seconds']['limit'])
+
+    def test_limits(self):
+        from budget import BudgetExceeded
+        for engine in ENGINES:
+            for resource, limit, used in (('steps', 35, 36), ('depth', 20, 21), ('segments', 14, 15)):
+                with self.subTest(engine=engine, resource=resource):
+                    with self.assertRaises(BudgetExceeded) as raised:
+                        self._run(engine, **{resource: limit})
+                    self.assertEqual((resource, limit, used), (raised.exception.resource, raised.exception.limit, raised.exception.used))
+
+    def test_replayed_calls(self):
+        # le chiamate ridisegnate dalla cache delle procedure consumano gli stessi passi e la stessa profondita'
+        from budget import BudgetExceeded
+        import procedureCache
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                interpreter = Interpreter(engine, optimize=True, graphics='headless')
+                interpreter.run(CACHED_BUDGET_PROGRAM)
+                self.assertEqual(procedureCache.CACHE_SIZE > 0, interpreter.procedures.stats['hits'] > 0)
+                for optimize in (True, False):
+                    report = self._run(engine, CACHED_BUDGET_PROGRAM, optimize).report()
+                    self.assertEqual((1000, 2), (report['steps']['used'], report['depth']['used']))
+                    with self.assertRaises(BudgetExceeded) as raised:
+                        self._run(engine, 'to sq :s\n repeat 4 [fd :s rt 90]\n end\n repeat 100 [sq 10]', optimize, steps=150)
+                    self.assertEqual(('steps', 151), (raised.exception.resource, raised.exception.used))
+                    with self.assertRaises(BudgetExceeded):
+                        self._run(engine, CACHED_BUDGET_PROGRAM, optimize, depth=1)
+
+    def test_seconds(self):
+        from budget import BudgetExceeded
+        for engine in ENGINES:
+            for code in ('while "true [make "x 1]', 'pu repeat 100000000 [fd 1 rt 1]'):
+                with self.subTest(engine=engine, code=code):
+                    start = time.perf_counter()
+                    with self.assertRaises(BudgetExceeded) as raised:
+                        self._run(engine, code, seconds=0.1)
+                    self.assertEqual('seconds', raised.exception.resource)
+                    self.assertLess(time.perf_counter() - start, 1)
+
+PROCEDURE_CACHE_TESTS = {
+    'pen': """
+        to dash :n
+            repeat :n [fd 5 pu fd 5 pd]
+        end
+        repeat 20 [dash 3 rt 18]
+    """,
+    'setpc': """
+        to red :s
+            setpc [255 0 0] fd :s setpc [0 0 255] rt 45
+        end
+        repeat 16 [red 10 fd 3]
+    """,
+    'arc': """
+        to bump :r
+            arc 90 :r fd :r rt 30
+        end
+        repeat 12 [bump 10]
+    """,
+    'stop': """
+        to spiral :n
+            if :n < 1 [stop]
+            fd :n rt 45
+            spiral :n - 2
+        end
+        repeat 6 [spiral 9 rt 60]
+    """,
+    'nested': """
+        to side :s
+            fd :s rt 90
+        end
+        to sq :s
+            repeat 4 [side :s]
+        end
+        repeat 10 [sq 10 rt 36]
+    """,
+    'numbers': """
+        to step :s
+            fd :s rt 30 arc 45 :s
+        end
+        repeat 6 [step 10 step 10.0 step 5 / 2]
+    """
+}
+
+class TestProcedureCache(unittest.TestCase):
+
+    def _draw(self, engine, code, size):
+        import procedureCache
+        saved = procedureCache.CACHE_SIZE
+        procedureCache.CACHE_SIZE = size
+        try:
+            interpreter = Interpreter(engine, optimize=True, graphics='headless')
+            shapes = interpreter.run(code)
+        finally:
+            procedureCache.CACHE_SIZE = saved
+        shapes = [tuple(round(value, 6) if isinstance(value, float) else value for value in shape.fields()) for shape in shapes]
+        return shapes, interpreter.procedures
+
+    def test_replay_matches_execution(self):
+        # lo stesso disegno con la cache e senza, come con LOGO_PROCEDURE_CACHE=0
+        for engine in ENGINES:
+            for name, code in PROCEDURE_CACHE_TESTS.items():
+                with self.subTest(engine=engine, name=name):
+                    cached, procedures = self._draw(engine, code, 1024)
+                    executed, _ = self._draw(engine, code, 0)
+                    self.assertGreater(procedures.stats['hits'], 0)
+                    self.assertEqual(executed, cached)
+
+    def test_argument_types(self):
+        # 10 e 10.0 sono chiamate diverse, 5 / 2 e' lo stesso valore di 2.5
+        from procedureCache import report
+        _, procedures = self._draw('tree', PROCEDURE_CACHE_TESTS['numbers'] + ' step 2.5', 1024)
+        self.assertEqual(3, report(procedures)['entries'])
+
+class TestGrammarCache(unittest.TestCase):
+
+    def _load(self, grammar, directory):
+        # conta le esecuzioni di java da parte del costruttore di ANTLR
+        import subprocess
+        from unittest import mock
+        from grammarCache import loadGrammar
+        with mock.patch('liblet.antlr.run', wraps=subprocess.run) as java:
+            antlr = loadGrammar(grammar, directory)
+        return antlr, java.call_count
+
+    def _grammar(self):
+        with open('logoGrammar.g4') as inf:
+            return inf.read()
+
+    def test_hit(self):
+        from grammarCache import grammarHash, _storeModules
+        import parser
+        grammar = self._grammar()
+        with tempfile.TemporaryDirectory() as directory:
+            _storeModules(parser.ANTLR_GRAMMAR, os.path.join(directory, 'grammar-' + grammarHash(grammar)))
+            antlr, runs = self._load(grammar, directory)
+        self.assertEqual(0, runs)
+        self.assertEqual(parser.ANTLR_GRAMMAR.source, antlr.source)
+        self.assertIsNotNone(antlr.tree('fd 10', 'prog'))
+
+    def test_changed_grammar(self):
+        from grammarCache import grammarHash
+        grammar = self._grammar()
+        changed = grammar + '\n// commento\n'
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(1, self._load(changed, directory)[1])
+            self.assertEqual(0, self._load(changed, directory)[1])
+            self.assertEqual(['grammar-' + grammarHash(changed)], os.listdir(directory))
+        self.assertNotEqual(grammarHash(grammar), grammarHash(changed))
+
+    def test_corrupted(self):
+        from grammarCache import grammarHash
+        grammar = self._grammar()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'grammar-' + grammarHash(grammar))
+            os.makedirs(path)
+            with open(os.path.join(path, 'logoGrammarLexer.py'), 'w') as ouf:
+                ouf.write('class logoGrammarLexer(:\n')
+            antlr, runs = self._load(grammar, directory)
+            self.assertEqual(1, runs)
+            with open(os.path.join(path, 'logoGrammarLexer.py')) as inf:
+                self.assertEqual(antlr.source['Lexer'], inf.read())
+            self.assertEqual(0, self._load(grammar, directory)[1])
+
+class TestAstCache(unittest.TestCase):
+
+    def test_memory_hit_and_miss(self):
+        from astCache import ASTCache, encode
+        cache = ASTCache('salt')
+        code = 'repeat 4 [fd 10 rt 90]'
+        self.assertIsNone(cache.get(code))
+        tree = parse(code, cache=False)
+        cache.put(code, tree)
+        cached = cache.get(code)
+        self.assertEqual(encode(tree), encode(cached))
+        self.assertIsNot(tree, cached)
+        self.assertEqual((1, 0, 1, 1), tuple(cache.stats()[name] for name in ('hits', 'diskHits', 'misses', 'entries')))
+
+    def test_memory_limit(self):
+        from astCache import ASTCache
+        cache = ASTCache('salt', maxEntries=2)
+        for index in range(3):
+            cache.put('pr ' + str(index), parse('pr ' + str(index), cache=False))
+        self.assertIsNone(cache.get('pr 0'))
+        self.assertIsNotNone(cache.get('pr 2'))
+
+    def test_disk_hit_and_invalidation(self):
+        from astCache import ASTCache
+        code = 'pr 1 + 2'
+        with tempfile.TemporaryDirectory() as directory:
+            ASTCache('grammar:1', directory=directory).put(code, parse(code, cache=False))
+            cache = ASTCache('grammar:1', directory=directory)
+            self.assertIsNotNone(cache.get(code))
+            self.assertEqual(1, cache.stats()['diskHits'])
+            # una grammatica o una versione di logoToAst diversa cambiano il sale e quindi la chiave
+            self.assertIsNone(ASTCache('grammar:2', directory=directory).get(code))
+            self.assertIsNone(ASTCache('other:1', directory=directory).get(code))
+
+class TestHeadless(unittest.TestCase):
+
+    def _shapes(self, code):
+        return [tuple(round(value, 6) if isinstance(value, float) else value for value in shape.fields())
+                for shape in run(code, graphics='headless')]
+
+    def test_display_list(self):
+        self.assertEqual([(0, 0, 10, 0, (0, 0, 0), 1), (10, 0, 10, -10, (0, 0, 0), 1)],
+                         self._shapes('fd 10 rt 90 fd 10 pu fd 10'))
+
+    def test_pen(self):
+        shapes = self._shapes('setpc [255 0 0] setpensize 3 fd 5 arc 90 10')
+        self.assertEqual((0, 0, 5, 0, (255, 0, 0), 3), shapes[0])
+        self.assertEqual(('Arc', (255, 0, 0), 3), ('Arc', shapes[1][-2], shapes[1][-1]))
+
+    def test_clear(self):
+        self.assertEqual([(10, 0, 10, -10, (0, 0, 0), 1)], self._shapes('fd 10 cs rt 90 fd 10'))
+
+class TestSvg(unittest.TestCase):
+
+    def test_write(self):
+        from svg import writeSvg
+        import xml.etree.ElementTree as ET
+        out = StringIO()
+        writeSvg(run('fd 10 rt 90 fd 10 setpc [255 0 0] fd 5', graphics='headless'), out)
+        paths = ET.fromstring(out.getvalue()).findall('.//{http://www.w3.org/2000/svg}path')
+        self.assertEqual([('#000000', 'M0 0 L10 0 L10 10'), ('#ff0000', 'M10 10 L10 15')],
+                         [(path.get('stroke'), path.get('d')) for path in paths])
+
+    def test_backend_layers(self):
+        from svg import SvgBackend
+        import xml.etree.ElementTree as ET
+        out = StringIO()
+        run('fd 10 cs fd 5', graphics=SvgBackend(out))
+        document = ET.fromstring(out.getvalue())
+        groups = document.findall('{http://www.w3.org/2000/svg}g')
+        self.assertEqual(['layer0', 'layer1'], [group.get('id') for group in groups])
+        self.assertIn('#layer1', document.find('{http://www.w3.org/2000/svg}style').text)
+
+class TestRaster(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest('numpy non installato')
+
+    def test_render(self):
+        from raster import render
+        from graphics import Segment
+        image = render([Segment(0, 0, 10, 0, (255, 0, 0), 1)], width=16, height=8, fit=False)
+        self.assertEqual((8, 16, 3), image.shape)
+        self.assertEqual([255, 255, 255], image[0, 0].tolist())
+        self.assertEqual([255, 128, 128], image[4, 12].tolist())
+
+    def test_png(self):
+        from raster import render, encodePng
+        import struct
+        import zlib
+        image = render(run('repeat 4 [fd 20 rt 90]', graphics='headless'), width=24, height=16)
+        data = encodePng(image)
+        self.assertEqual(b'\x89PNG\r\n\x1a\n', data[:8])
+        self.assertEqual((24, 16), struct.unpack('>II', data[16:24]))
+        length = struct.unpack('>I', data[33:37])[0]
+        rows = zlib.decompress(data[41:41 + length])
+        self.assertEqual(image.tobytes(), b''.join(rows[row * 73 + 1:(row + 1) * 73] for row in range(16)))
+
+class TestScreenBatching(unittest.TestCase):
+
+    def _calls(self, code, **options):
+        # un modulo turtle finto registra i comandi ricevuti, senza aprire la finestra
+        import types
+        from unittest import mock
+        from graphics import BatchedScreenBackend
+
+        class FakeTurtle(types.ModuleType):
+            class Terminator(Exception):
+                pass
+
+            def __init__(self):
+                types.ModuleType.__init__(self, 'turtle')
+                self.calls = []
+
+            def __getattr__(self, name):
+                if name.startswith('__'):
+                    raise AttributeError(name)
+                return lambda *args: self.calls.append(name)
+
+        fake = FakeTurtle()
+        with mock.patch.dict(sys.modules, {'turtle': fake}):
+            run(code, graphics=BatchedScreenBackend(**options))
+        return fake.calls
+
+    def test_commands(self):
+        calls = self._calls('repeat 26 [fd 1 rt 1] fd 1', commands=10, interval=3600 * 1000)
+        self.assertEqual(['tracer', 'bye'], [calls[0], calls[-1]])
+        self.assertEqual(6, calls.count('update'))
+        updates = [index for index, name in enumerate(calls) if name == 'update']
+        # un aggiornamento ogni 10 comandi, piu' quello di close prima di bye
+        self.assertEqual([10] * 5 + [3], [end - start - 1 for start, end in zip([0] + updates, updates)])
+        self.assertEqual(len(calls) - 2, updates[-1])
+
+    def test_interval(self):
+        calls = self._calls('fd 1 rt 1 fd 1', commands=1000, interval=0)
+        self.assertEqual(['tracer', 'forward', 'update', 'right', 'update', 'forward', 'update', 'update', 'bye'], calls)
+
+    def test_setspeed(self):
+        calls = self._calls('fd 1 setspeed 5 fd 1', commands=1000, interval=3600 * 1000)
+        self.assertEqual(['tracer', 'forward', 'update', 'tracer', 'speed', 'forward', 'bye'], calls)
+
+class TestDrawing(unittest.TestCase):
+
+    def _optimize(self, displayList, tolerance=0):
+        import drawing
+        result = drawing.optimizeDrawing(displayList, tolerance)
+        return [shape.fields() for shape in result], drawing.report()
+
+    def test_merge_collinear(self):
+        shapes, stats = self._optimize(run('fd 10 fd 10 fd 10 rt 90 fd 5', graphics='headless'))
+        self.assertEqual([(0, 0, 30, 0, (0, 0, 0), 1), (30, 0, 30, -5, (0, 0, 0), 1)], shapes)
+        self.assertEqual((4, 2, 2), (stats['before'], stats['after'], stats['merged']))
+
+    def test_covered(self):
+        # bk 10 ripercorre il segmento appena disegnato, mentre con un altra penna resta visibile
+        shapes, stats = self._optimize(run('fd 10 bk 10', graphics='headless'))
+        self.assertEqual([(0, 0, 10, 0, (0, 0, 0), 1)], shapes)
+        self.assertEqual(1, stats['invisible'])
+        shapes, _ = self._optimize(run('fd 10 setpensize 2 bk 10', graphics='headless'))
+        self.assertEqual(2, len(shapes))
+
+    def test_invisible(self):
+        from graphics import Segment, Arc
+        shapes, stats = self._optimize([Segment(1, 1, 1, 1, (0, 0, 0), 1), Arc(0, 0, 10, 0, 0, (0, 0, 0), 1),
+                                        Arc(0, 0, 0, 0, 90, (0, 0, 0), 1), Segment(0, 0, 1, 1, (0, 0, 0), 1)])
+        self.assertEqual([(0, 0, 1, 1, (0, 0, 0), 1)], shapes)
+        self.assertEqual(3, stats['invisible'])
+
+    def test_douglas_peucker(self):
+        from graphics import Segment
+        points = [(0, 0), (1, 0.1), (2, -0.1), (3, 0.02), (4, 0)]
+        polyline = [Segment(x1, y1, x2, y2, (0, 0, 0), 1) for (x1, y1), (x2, y2) in zip(points, points[1:])]
+        shapes, stats = self._optimize(polyline, 0.5)
+        self.assertEqual([(0, 0, 4, 0, (0, 0, 0), 1)], shapes)
+        self.assertEqual(3, stats['simplified'])
+        shapes, stats = self._optimize(polyline, 0.01)
+        self.assertEqual(4, len(shapes))
+        shapes, _ = self._optimize(polyline, 0.08)
+        self.assertEqual([(0, 0), (1, 0.1), (2, -0.1), (4, 0)], [shape[:2] for shape in shapes] + [shapes[-1][2:4]])
+
+    def test_export(self):
+        from svg import writeSvg
+        from drawing import optimizeDrawing
+        displayList = run('repeat 8 [fd 5] rt 90 fd 5 bk 5', graphics='headless')
+        optimized, plain, direct = StringIO(), StringIO(), StringIO()
+        writeSvg(displayList, optimized, tolerance=0)
+        writeSvg(displayList, plain)
+        writeSvg(optimizeDrawing(displayList), direct)
+        self.assertEqual(direct.getvalue(), optimized.getvalue())
+        self.assertLess(len(optimized.getvalue()), len(plain.getvalue()))
+
+TILES_PROGRAM = 'repeat 36 [fd 20 rt 10] arc 90 50 setpc [255 0 0] setpensize 3 setxy 150 -90 fd 40'
+
+class TestTiles(unittest.TestCase):
+
+    def test_stitch(self):
+        # il backend e la display list distribuita nei tasselli producono la stessa immagine
+        import numpy as np
+        from tiles import TileBackend, tileDisplayList, stitch
+        with tempfile.TemporaryDirectory() as streamed, tempfile.TemporaryDirectory() as listed:
+            index = run(TILES_PROGRAM, graphics=TileBackend(streamed, tileSize=64))
+            self.assertGreater(len(index.tiles), 4)
+            expected = stitch(tileDisplayList(run(TILES_PROGRAM, graphics='headless'), listed, tileSize=64))
+            image = stitch(index)
+        self.assertEqual(expected.shape, image.shape)
+        self.assertTrue(np.array_equal(expected, image))
+
+    def test_pyramid(self):
+        import struct
+        from tiles import TileBackend, renderTiles
+        with tempfile.TemporaryDirectory() as directory:
+            out = os.path.join(directory, 'tiles')
+            index = run(TILES_PROGRAM, graphics=TileBackend(directory, tileSize=64))
+            files = renderTiles(index, out)
+            paths = sorted(os.path.relpath(path, out).split(os.sep) for path in files)
+            self.assertEqual([['0', '0', '0.png']], [path for path in paths if path[0] == '0'])
+            top = max(int(level) for level, _, _ in paths)
+            self.assertEqual(len(index.tiles), len([path for path in paths if path[0] == str(top)]))
+            self.assertEqual(set(range(top + 1)), {int(level) for level, _, _ in paths})
+            for path in files:
+                with open(path, 'rb') as inf:
+                    data = inf.read()
+                self.assertTrue(data.startswith(b'\x89PNG'))
+                self.assertEqual((64, 64), struct.unpack('>II', data[16:24]))
+
+class TestSwarm(unittest.TestCase):
+
+    def _shapes(self, code):
+        interpreter = Interpreter(graphics='swarm')
+        shapes = interpreter.run(code)
+        shapes = sorted(tuple(round(value, 6) + 0.0 if isinstance(value, float) else value for value in shape.fields()) for shape in shapes)
+        return shapes, interpreter.graphics.addressed()
+
+    def test_tellall(self):
+        # le nuove tartarughe hanno le direzioni distribuite sull'angolo giro, la tartaruga 0 resta verso est
+        shapes, addressed = self._shapes('crt 4 tellall fd 10')
+        black = ((0, 0, 0), 1)
+        self.assertEqual(sorted([(0, 0, 10, 0) + black, (0, 0, 10, 0) + black, (0, 0, 0, 10) + black,
+                                 (0, 0, -10, 0) + black, (0, 0, 0, -10) + black]), shapes)
+        self.assertEqual([0, 1, 2, 3, 4], addressed)
+
+    def test_tell_pens(self):
+        shapes, _ = self._shapes('crt 2 tell [1 2] setpc [255 0 0] tell 2 setpc [0 0 255] setpensize 2 tell [0 1 2] fd 10')
+        self.assertEqual(sorted([(0, 0, 10, 0, (0, 0, 0), 1), (0, 0, 10, 0, (255, 0, 0), 1), (0, 0, -10, 0, (0, 0, 255), 2)]), shapes)
+
+    def test_ask(self):
+        shapes, addressed = self._shapes('crt 2 tell 1 ask [0 2] [fd 10] fd 5')
+        self.assertEqual(sorted([(0, 0, 10, 0, (0, 0, 0), 1), (0, 0, -10, 0, (0, 0, 0), 1), (0, 0, 5, 0, (0, 0, 0), 1)]), shapes)
+        self.assertEqual([1], addressed)
+        shapes, addressed = self._shapes('crt 2 tell [1 2] ask 0 [fd 10] fd 5')
+        self.assertEqual(sorted([(0, 0, 10, 0, (0, 0, 0), 1), (0, 0, 5, 0, (0, 0, 0), 1), (0, 0, -5, 0, (0, 0, 0), 1)]), shapes)
+        self.assertEqual([1, 2], addressed)
+
+    def test_unknown_turtle(self):
+        for code, turtle in (('tell 1', 1), ('crt 2 tell [0 3]', 3), ('crt 2 ask 5 [fd 10]', 5)):
+            with self.subTest(code=code):
+                with self.assertRaises(ValueError) as raised:
+                    run(code, graphics='swarm')
+                self.assertEqual("La tartaruga " + str(turtle) + " non esiste", str(raised.exception))
+
+class TestTrajectory(unittest.TestCase):
+
+    def test_square(self):
+        from trajectory import pathLength, bounds, intersections
+        trajectory = run('repeat 4 [fd 10 rt 90]', graphics='trajectory')
+        self.assertAlmostEqual(40, pathLength(trajectory))
+        self.assertEqual((0, -10, 10, 0), tuple(round(value, 6) for value in bounds(trajectory)))
+        self.assertEqual(0, intersections(trajectory))
+
+    def test_figure_eight(self):
+        # i due lati obliqui si incrociano in (5, 5), il primo e l'ultimo si toccano solo nell'origine
+        from trajectory import intersections
+        self.assertEqual(1, intersections(run('setxy 10 10 setxy 10 0 setxy 0 10 setxy 0 0', graphics='trajectory')))
+
+    def test_pen_up(self):
+        from trajectory import pathLength, bounds, intersections
+        trajectory = run('fd 10 pu fd 10 pd fd 10', graphics='trajectory')
+        self.assertAlmostEqual(20, pathLength(trajectory))
+        self.assertAlmostEqual(30, pathLength(trajectory, drawn=False))
+        # il tratto verticale con la penna alzata attraversa fd 10 solo se contano anche i tratti non disegnati
+        trajectory = run('pu setxy 5 -5 setxy 5 5 pd setxy 0 0 fd 10', graphics='trajectory')
+        self.assertEqual((0, 1), (intersections(trajectory), intersections(trajectory, drawn=False)))
+        self.assertEqual((0, 0, 10, 5), tuple(round(value, 6) for value in bounds(trajectory)))
+        self.assertEqual((0, -5, 10, 5), tuple(round(value, 6) for value in bounds(trajectory, drawn=False)))
+
+class TestInterpreterInstances(unittest.TestCase):
+
+    def test_concurrent_instances(self):
+        programs = ['make "x ' + str(index) + ' repeat 200 [make "x :x + 10] pr :x' for index in range(4)]
+        outputs = [StringIO() for _ in programs]
+        instances = [Interpreter(engine, graphics='headless', output=output) for engine, output in zip(ENGINES, outputs)]
+        threads = [threading.Thread(target=instance.run, args=(program,)) for instance, program in zip(instances, programs)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(['2000\n', '2001\n', '2002\n', '2003\n'], [output.getvalue() for output in outputs])
+
+    def test_separate_state(self):
+        first = Interpreter(graphics='headless', output=StringIO())
+        second = Interpreter(graphics='headless', output=StringIO())
+        first.run('make "x 1 fd 10')
+        self.assertRaises(NameError, lambda: second.run('pr :x'))
+        self.assertEqual(1, len(first.graphics.displayList))
+        self.assertEqual(0, len(second.graphics.displayList))
+
+    def test_seed(self):
+        outputs = [StringIO(), StringIO()]
+        for output in outputs:
+            Interpreter(graphics='headless', output=output, seed=7).run('repeat 5 [pr random 1000]')
+        self.assertEqual(outputs[0].getvalue(), outputs[1].getvalue())
+
+class TestBatch(unittest.TestCase):
+
+    PROGRAMS = {
+        'a_ok.logo': 'repeat 4 [fd 10 rt 90] pr "fatto',
+        'b_error.logo': 'pr :nessuna',
+        'c_timeout.logo': 'while "true [make "x 1]',
+        'd_limit.logo': 'to f :n\n output 1 + f :n + 1\nend\npr f 1'
+    }
+
+    def _batch(self, processes):
+        import batch
+        import json
+        with tempfile.TemporaryDirectory() as directory:
+            for name, code in self.PROGRAMS.items():
+                with open(os.path.join(directory, name), 'w') as ouf:
+                    ouf.write(code)
+            out = StringIO()
+            report = batch.runBatch(batch.findPrograms([directory]), out, processes, timeout=0.5,
+                                    drawings=os.path.join(directory, 'svg'), limits={'depth': 50})
+            results = [json.loads(line) for line in out.getvalue().splitlines()]
+            drawings = sorted(os.listdir(os.path.join(directory, 'svg')))
+        return report, results, drawings
+
+    def test_results(self):
+        for processes in (0, 2):
+            with self.subTest(processes=processes):
+                report, results, drawings = self._batch(processes)
+                self.assertEqual(list(self.PROGRAMS), [os.path.basename(result['path']) for result in results])
+                self.assertEqual(['ok', 'error', 'timeout', 'limit'], [result['status'] for result in results])
+                self.assertEqual(('fatto\n', 4), (results[0]['stdout'], results[0]['strokes']))
+                self.assertEqual('NameError', results[1]['error']['type'])
+                self.assertEqual('depth', results[3]['error']['resource'])
+                self.assertEqual(['000000_a_ok.svg'], drawings)
+                self.assertEqual((4, 1, 1, 1, 1), tuple(report[name] for name in ('programs', 'ok', 'errors', 'timeouts', 'limits')))
+
 #############################################################################
 
 # Il codice da questo commento in poi non deve essere modificato.
@@ -0,0 +1,336 @@
+from graphics import HeadlessBackend, Arc
+from raster import _arcPoints, _cover, _composite, encodePng
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import heapq
+import math
+from operator import itemgetter
+import os
+import shutil
+import sys
+
+import numpy as np
+
+"""
+Rendering a tasselli di disegni troppo grandi per una singola immagine, con memoria che dipende dalla dimensione
+dei tasselli e non da quella del disegno.
+
+**TileBackend** calcola la tartaruga come il backend `headless` ma, invece di conservare la display list,
+assegna ogni segmento ai tasselli di una griglia che attraversa e lo accoda ai file del tassello in una cartella:
+non serve conoscere in anticipo le dimensioni del disegno e in memoria restano al piu' `BUFFER` segmenti.
+Al termine **renderTiles** disegna ogni tassello in modo indipendente, eventualmente in un pool di processi,
+e scrive la piramide di tasselli PNG `livello/x/y.png`: il livello piu' alto contiene i tasselli alla scala indicata,
+ogni livello inferiore ha meta' risoluzione e i file dei suoi tasselli vengono costruiti da quelli del livello superiore,
+fino al livello 0 che contiene tutto il disegno in un solo tassello. Lo spessore della penna resta in pixel a ogni livello.
+**stitch** unisce i tasselli del livello piu' alto in un unica immagine, se non supera `STITCH_LIMIT` pixel.
+"""
+
+"""
+Dimensione in pixel dei tasselli.
+"""
+TILE_SIZE = 256
+
+"""
+Numero massimo di segmenti tenuti in memoria da **TileBackend** prima di accodarli ai file dei tasselli.
+"""
+BUFFER = 1 << 16
+
+"""
+Numero massimo di pixel dell'immagine prodotta da **stitch**.
+"""
+STITCH_LIMIT = 1 << 26
+
+"""
+Campi di un segmento nei file dei tasselli: il numero d'ordine del segmento, gli estremi in pixel del livello piu' alto,
+il colore e lo spessore della penna.
+"""
+FIELDS = 9
+
+"""
+Cartella dei file dei tasselli scritti da **TileBackend**, con colonne e righe della griglia che hanno origine nella tartaruga.
+"""
+RAW = 'raw'
+
+#===tile index===
+class TileIndex:
+    """
+    Risultato di **TileBackend**: la cartella con i file dei tasselli, l'insieme dei tasselli non vuoti
+    e le dimensioni con cui sono stati calcolati.
+    """
+
+    def __init__(self, directory, tiles, scale, tileSize):
+        self.directory = directory
+        self.tiles = tiles
+        self.scale = scale
+        self.tileSize = tileSize
+
+    def bounds(self):
+        """
+        Restituisce `(colonna minima, riga minima, colonne, righe)` della griglia, `None` se il disegno e' vuoto.
+        """
+        if not self.tiles:
+            return None
+        columns = [column for column, _ in self.tiles]
+        rows = [row for _, row in self.tiles]
+        return min(columns), min(rows), max(columns) - min(columns) + 1, max(rows) - min(rows) + 1
+
+#===bin path===
+def _binPath(directory, level, column, row):
+    return os.path.join(directory, 'bins', str(level), str(column) + '_' + str(row) + '.bin')
+
+#===read bin===
+def _readBin(path, chunk=BUFFER):
+    """
+    Generatore dei segmenti di un file di tasselli, a blocchi di `chunk` segmenti: ogni blocco e' una matrice con una riga per segmento.
+    """
+    size = FIELDS * 8
+    with open(path, 'rb') as inf:
+        while True:
+            data = inf.read(chunk * size)
+            if not data:
+                return
+            yield np.frombuffer(data, dtype=float).reshape(-1, FIELDS)
+
+#===tile backend===
+class TileBackend(HeadlessBackend):
+    """
+    Backend che distribuisce i segmenti nei tasselli di `tileSize` pixel, con `scale` pixel per passo della tartaruga:
+    come nelle immagini l'asse y e' rivolto verso il basso, la riga 0 inizia dall'origine della tartaruga. Gli archi vengono approssimati con segmenti di al piu' 2 pixel.
+    Si usa passandolo a [[interpreter.py#run]], che restituisce il **TileIndex** da passare a **renderTiles** o a **stitch**.
+    """
+
+    def __init__(self, directory, scale=1, tileSize=TILE_SIZE, buffer=BUFFER):
+        HeadlessBackend.__init__(self)
+        self.directory = directory
+        self.scale = scale
+        self.tileSize = tileSize
+        self.buffer = buffer
+        self._reset()
+
+    def _reset(self):
+        shutil.rmtree(os.path.join(self.directory, 'bins'), ignore_errors=True)
+        os.makedirs(os.path.join(self.directory, 'bins', RAW))
+        self.pending = {}
+        self.buffered = 0
+        self.tiles = set()
+        self.count = 0
+
+    def _tiles(self, x1, y1, x2, y2, pad):
+        """
+        Generatore dei tasselli attraversati dal segmento in pixel, allargato di `pad` pixel:
+        per ogni colonna della griglia il segmento viene ritagliato sulla colonna e si considerano le righe che copre.
+        """
+        size = self.tileSize
+        dx = x2 - x1
+        for column in range(math.floor((min(x1, x2) - pad) / size), math.floor((max(x1, x2) + pad) / size) + 1):
+            if dx == 0:
+                ya, yb = y1, y2
+            else:
+                t0 = min(max((column * size - pad - x1) / dx, 0), 1)
+                t1 = min(max(((column + 1) * size + pad - x1) / dx, 0), 1)
+                ya, yb = y1 + t0 * (y2 - y1), y1 + t1 * (y2 - y1)
+            for row in range(math.floor((min(ya, yb) - pad) / size), math.floor((max(ya, yb) + pad) / size) + 1):
+                yield column, row
+
+    def _add(self, x1, y1, x2, y2):
+        scale = self.scale
+        x1, y1, x2, y2 = x1 * scale, -y1 * scale, x2 * scale, -y2 * scale
+        record = (self.count, x1, y1, x2, y2) + tuple(self.color) + (self.width,)
+        self.count += 1
+        for tile in self._tiles(x1, y1, x2, y2, max(self.width, 1) / 2 + 2):
+            values = self.pending.get(tile)
+            if values is None:
+                values = self.pending[tile] = array('d')
+            values.extend(record)
+            self.buffered += 1
+        if self.buffered >= self.buffer:
+            self._flush()
+
+    def _flush(self):
+        for (column, row), values in self.pending.items():
+            with open(_binPath(self.directory, RAW, column, row), 'ab') as ouf:
+                values.tofile(ouf)
+            self.tiles.add((column, row))
+        self.pending = {}
+        self.buffered = 0
+
+    def drawSegment(self, x1, y1, x2, y2):
+        self._add(x1, y1, x2, y2)
+
+    def drawSegments(self, x1, y1, x2, y2):
+        for coordinates in zip(x1, y1, x2, y2):
+            self._add(*coordinates)
+
+    def drawArc(self, x, y, radius, start, extent):
+        xs, ys = _arcPoints(Arc(x, y, radius, start, extent, self.color, self.width), min(math.radians(5), 2 / max(radius * self.scale, 1e-9)))
+        for coordinates in zip(xs[:-1].tolist(), ys[:-1].tolist(), xs[1:].tolist(), ys[1:].tolist()):
+            self._add(*coordinates)
+
+    def clear(self):
+        self._reset()
+
+    def close(self):
+        """
+        Accoda ai file i segmenti ancora in memoria e restituisce il **TileIndex** del disegno.
+        """
+        self._flush()
+        return TileIndex(self.directory, self.tiles, self.scale, self.tileSize)
+
+#===tile display list===
+def tileDisplayList(displayList, directory, **options):
+    """
+    Distribuisce nei tasselli una display list del backend `headless`, ad esempio dopo [[drawing.py#optimize drawing]],
+    e restituisce il **TileIndex**. `options` sono passate a **TileBackend**.
+    """
+    backend = TileBackend(directory, **options)
+    for shape in displayList:
+        backend.color, backend.width = shape.color, shape.width
+        if isinstance(shape, Arc):
+            backend.drawArc(shape.x, shape.y, shape.radius, shape.start, shape.extent)
+        else:
+            backend.drawSegment(shape.x1, shape.y1, shape.x2, shape.y2)
+    return backend.close()
+
+#===merge bins===
+def _touching(block, box, factor):
+    """
+    Righe di `block` il cui riquadro, allargato dello spessore della penna in pixel del livello, tocca il riquadro `box`.
+    """
+    pad = (np.maximum(block[:, 8], 1) / 2 + 2) * factor
+    xmin, ymin, xmax, ymax = box
+    return block[(np.minimum(block[:, 1], block[:, 3]) - pad <= xmax) & (np.maximum(block[:, 1], block[:, 3]) + pad >= xmin)
+                 & (np.minimum(block[:, 2], block[:, 4]) - pad <= ymax) & (np.maximum(block[:, 2], block[:, 4]) + pad >= ymin)]
+
+def _records(path, box, factor):
+    for block in _readBin(path):
+        yield from _touching(block, box, factor).tolist()
+
+def _mergeBins(directory, level, children, origin, size, top):
+    """
+    Crea i file dei tasselli del livello `level` da quelli del livello `level + 1`, `children`, in ordine di disegno
+    e senza ripetere i segmenti presenti in piu' file. Restituisce i file del nuovo livello.
+    Un tratto spesso puo' entrare in un tassello pur essendo disegnato in un figlio di un tassello vicino,
+    per questo ogni tassello legge anche i figli che circondano i suoi quattro e ne tiene i segmenti che lo toccano.
+    """
+    factor = 2 ** (top - level)
+    parents = {(column >> 1, row >> 1) for column, row in children}
+    os.makedirs(os.path.join(directory, 'bins', str(level)), exist_ok=True)
+    result = {}
+    for column, row in parents:
+        paths = [children[child] for child in ((x, y) for x in range(2 * column - 1, 2 * column + 3)
+                                              for y in range(2 * row - 1, 2 * row + 3)) if child in children]
+        x, y = origin[0] + column * size * factor, origin[1] + row * size * factor
+        box = (x, y, x + size * factor, y + size * factor)
+
+        path = result[column, row] = _binPath(directory, level, column, row)
+        with open(path, 'wb') as ouf:
+            last = None
+            values = array('d')
+            for record in heapq.merge(*(_records(child, box, factor) for child in paths), key=itemgetter(0)):
+                if record[0] == last:
+                    continue
+                last = record[0]
+                values.extend(record)
+                if len(values) >= BUFFER * FIELDS:
+                    values.tofile(ouf)
+                    values = array('d')
+            values.tofile(ouf)
+    return result
+
+#===render tile===
+def _renderTile(path, origin, factor, tileSize, background):
+    """
+    Restituisce l'immagine del tassello con i segmenti del file `path`: le coordinate vengono divise per `factor`
+    e spostate in modo che `origin` sia l'angolo in alto a sinistra.
+    I segmenti consecutivi con la stessa penna accumulano la copertura e vengono sovrapposti all'immagine insieme, come in [[raster.py#render]].
+    """
+    image = np.empty((tileSize, tileSize, 3), dtype=float)
+    image[:] = background
+    coverage = np.zeros(tileSize * tileSize)
+    pen = None
+    shift = np.array([origin[0], origin[1], origin[0], origin[1]], dtype=float)
+
+    for block in _readBin(path):
+        lines = block[:, 1:5] / factor - shift
+        pens = block[:, 5:9]
+        changes = np.flatnonzero(np.any(pens[1:] != pens[:-1], axis=1)) + 1
+        for first, last in zip(np.concatenate(([0], changes)), np.concatenate((changes, [len(block)]))):
+            current = tuple(pens[first])
+            if pen is not None and current != pen:
+                _composite(image, coverage, pen[:3])
+            pen = current
+            _cover(coverage, lines[first:last], pen[3], tileSize, tileSize)
+    if pen is not None:
+        _composite(image, coverage, pen[:3])
+    return np.rint(image).astype(np.uint8)
+
+def _writeTile(task):
+    """
+    Disegna e scrive un tassello, `task` contiene tutti i parametri cosi' che possa essere eseguita in un altro processo.
+    """
+    path, origin, factor, tileSize, background, out = task
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, 'wb') as ouf:
+        ouf.write(encodePng(_renderTile(path, origin, factor, tileSize, background)))
+    return out
+
+#===render tiles===
+def renderTiles(index, out, processes=None, background=(255, 255, 255)):
+    """
+    Scrive in `out` la piramide di tasselli PNG del disegno e restituisce la lista dei file scritti.
+    I livelli sono numerati da 0, un solo tassello con tutto il disegno, fino a quello alla scala di **TileBackend**;
+    colonne e righe partono da 0 in ogni livello. Con `processes` i tasselli vengono disegnati da un pool di processi.
+    """
+    box = index.bounds()
+    if box is None:
+        return []
+    size = index.tileSize
+    column0, row0, columns, rows = box
+    top = max(0, math.ceil(math.log2(max(columns, rows))))
+
+    # la griglia viene spostata in modo che inizi da (0, 0), cosi' ogni tassello ha i suoi quattro figli allineati
+    origin = (column0 * size, row0 * size)
+    levels = {top: {(column - column0, row - row0): _binPath(index.directory, RAW, column, row) for column, row in index.tiles}}
+    for level in range(top - 1, -1, -1):
+        levels[level] = _mergeBins(index.directory, level, levels[level + 1], origin, size, top)
+
+    tasks = []
+    for level, tiles in sorted(levels.items()):
+        factor = 2 ** (top - level)
+        for (column, row), path in sorted(tiles.items()):
+            tasks.append((path, (origin[0] / factor + column * size, origin[1] / factor + row * size), factor, size,
+                          background, os.path.join(out, str(level), str(column), str(row) + '.png')))
+
+    if processes:
+        with ProcessPoolExecutor(processes) as pool:
+            return list(pool.map(_writeTile, tasks))
+    return [_writeTile(task) for task in tasks]
+
+#===stitch===
+def stitch(index, background=(255, 255, 255)):
+    """
+    Restituisce l'immagine di tutti i tasselli alla scala di **TileBackend** come array **numpy**.
+    Se supera `STITCH_LIMIT` pixel solleva **ValueError**: in quel caso va usato **renderTiles**.
+    """
+    box = index.bounds()
+    size = index.tileSize
+    if box is None:
+        return np.empty((0, 0, 3), dtype=np.uint8)
+    column0, row0, columns, rows = box
+    if columns * rows * size * size > STITCH_LIMIT:
+        raise ValueError("Il disegno e' troppo grande per essere unito in un immagine, va diviso in tasselli")
+
+    image = np.empty((rows * size, columns * size, 3), dtype=np.uint8)
+    image[:] = background
+    for column, row in index.tiles:
+        tile = _renderTile(_binPath(index.directory, RAW, column, row), (column * size, row * size), 1, size, background)
+        y, x = (row - row0) * size, (column - column0) * size
+        image[y:y + size, x:x + size] = tile
+    return image
+
+if __name__ == '__main__':
+    from interpreter import run
+    with open(sys.argv[1]) as inf:
+        code = inf.read()
+    out = sys.argv[2] if len(sys.argv) > 2 else sys.argv[1].rsplit('.', 1)[0] + '_tiles'
+    print(len(renderTiles(run(code, graphics=TileBackend(out)), out, processes=os.cpu_count())), 'tiles')
@@ -0,0 +1,276 @@
+from graphics import HeadlessBackend
+import math
+import sys
+
+import numpy as np
+
+"""
+Percorso della tartaruga come array **numpy** contigui, per calcolare metriche sui disegni senza cicli python.
+
+**TrajectoryBackend** calcola la tartaruga come il backend `headless` ma, invece della display list, registra
+ogni posizione raggiunta: gli spostamenti di `fd`, `bk`, `setxy`, `home`, ..., anche con la penna alzata,
+i punti calcolati in blocco da **repeatMoves** e gli archi, approssimati con un punto ogni `ARC_STEP` gradi.
+Le rotazioni senza spostamento non aggiungono punti. I punti vengono accumulati in blocchi di `CHUNK` righe
+e uniti solo da **close**, che restituisce una **Trajectory**: `run(code, graphics='trajectory')`.
+
+Le metriche (**pathLength**, **bounds**, **coverage**, **intersections**, riassunte da **report**)
+lavorano sui segmenti tra punti consecutivi, per default solo su quelli disegnati con la penna abbassata,
+e le operazioni vettoriali sono eseguite a blocchi di al piu' `BATCH` elementi.
+"""
+
+"""
+Numero di punti di un blocco di **TrajectoryBackend**.
+"""
+CHUNK = 1 << 16
+
+"""
+Ampiezza massima in gradi dell'arco tra due punti consecutivi di un `arc`.
+"""
+ARC_STEP = 2
+
+"""
+Numero massimo di campioni o di coppie di segmenti elaborati insieme da **coverage** e **intersections**.
+"""
+BATCH = 1 << 20
+
+#===trajectory===
+class Trajectory:
+    """
+    Percorso della tartaruga: per ogni punto `x`, `y`, la direzione `heading` in gradi, `down`, vero se il tratto
+    che arriva al punto e' stato disegnato, e `color`, l'indice in `colors` del colore della penna.
+    Il primo punto e' la posizione iniziale della tartaruga.
+    """
+    __slots__ = ('x', 'y', 'heading', 'down', 'color', 'colors')
+
+    def __init__(self, x, y, heading, down, color, colors):
+        self.x, self.y, self.heading = x, y, heading
+        self.down, self.color = down, color
+        self.colors = colors
+
+    def __len__(self):
+        return len(self.x)
+
+    def segments(self, drawn=True):
+        """
+        Restituisce gli array `x1, y1, x2, y2` dei segmenti tra punti consecutivi, solo quelli disegnati se `drawn`.
+        """
+        x1, y1, x2, y2 = self.x[:-1], self.y[:-1], self.x[1:], self.y[1:]
+        if drawn:
+            mask = self.down[1:]
+            return x1[mask], y1[mask], x2[mask], y2[mask]
+        return x1, y1, x2, y2
+
+#===trajectory backend===
+class TrajectoryBackend(HeadlessBackend):
+    """
+    I punti sono accodati a `pending`, una lista python di tuple, e convertiti in array ogni `CHUNK` punti;
+    **trace** aggiunge direttamente gli array calcolati da **repeatMoves**.
+    I tratti non vengono conservati, quindi **penState** restituisce `None` e la cache di [[procedureCache.py]],
+    che ridisegna solo i tratti e non gli spostamenti con la penna alzata, non viene usata.
+    """
+
+    def __init__(self):
+        HeadlessBackend.__init__(self)
+        self.chunks = []
+        self.pending = []
+        self.colors = []
+        self.colorIds = {}
+        self._point()
+
+    def _colorId(self):
+        color = self.colorIds.get(self.color)
+        if color is None:
+            color = self.colorIds[self.color] = len(self.colors)
+            self.colors.append(self.color)
+        return color
+
+    def _point(self):
+        self.pending.append((self.x, self.y, self.heading, self.down, self._colorId()))
+        if len(self.pending) >= CHUNK:
+            self._flush()
+
+    def _flush(self):
+        if self.pending:
+            x, y, heading, down, color = zip(*self.pending)
+            self.chunks.append((np.array(x, dtype=float), np.array(y, dtype=float), np.array(heading, dtype=float),
+                                np.array(down, dtype=bool), np.array(color, dtype=np.int32)))
+            self.pending = []
+
+    def _extend(self, xs, ys, headings):
+        self._flush()
+        count = len(xs)
+        self.chunks.append((np.asarray(xs, dtype=float), np.asarray(ys, dtype=float), np.asarray(headings, dtype=float),
+                            np.full(count, self.down), np.full(count, self._colorId(), dtype=np.int32)))
+
+    def drawSegment(self, x1, y1, x2, y2):
+        pass
+
+    def drawSegments(self, x1, y1, x2, y2):
+        pass
+
+    def drawArc(self, x, y, radius, start, extent):
+        pass
+
+    def _moveTo(self, x, y):
+        HeadlessBackend._moveTo(self, x, y)
+        self._point()
+
+    def circle(self, radius, extent=None):
+        """
+        Aggiunge i punti dell'arco percorso, come calcolato da **HeadlessBackend.circle**.
+        """
+        x0, y0, heading = self.x, self.y, self.heading
+        HeadlessBackend.circle(self, radius, extent)
+        if radius == 0:
+            return
+        extent = 360 if extent is None else extent
+        turn = extent if radius >= 0 else -extent
+        normal = math.radians(heading + 90)
+        cx, cy = x0 + radius * math.cos(normal), y0 + radius * math.sin(normal)
+        start = (heading - 90 if radius >= 0 else heading + 90) % 360
+
+        pieces = max(1, math.ceil(abs(turn) / ARC_STEP))
+        fractions = np.arange(1, pieces + 1) / pieces
+        angles = np.radians(start + fractions * turn)
+        xs, ys = cx + abs(radius) * np.cos(angles), cy + abs(radius) * np.sin(angles)
+        xs[-1], ys[-1] = self.x, self.y
+        self._extend(xs, ys, (heading + fractions * turn) % 360)
+
+    def trace(self, xs, ys, headings):
+        self._extend(xs, ys, headings)
+
+    def penState(self):
+        return None
+
+    def clear(self):
+        """
+        Il percorso della tartaruga non viene cancellato.
+        """
+        pass
+
+    def close(self):
+        """
+        Unisce i blocchi e restituisce la **Trajectory**.
+        """
+        self._flush()
+        fields = [np.concatenate([chunk[index] for chunk in self.chunks]) for index in range(5)]
+        self.chunks = [tuple(fields)]
+        return Trajectory(*fields, list(self.colors))
+
+#===batches===
+def _batches(counts, limit=None):
+    """
+    Divide gli elementi con `counts` campioni ciascuno in intervalli `(primo, ultimo)` consecutivi
+    con al piu' `limit` campioni, o con un solo elemento se ne ha di piu'.
+    """
+    limit = BATCH if limit is None else limit
+    ends = np.cumsum(counts)
+    first = 0
+    while first < len(counts):
+        done = ends[first - 1] if first else 0
+        last = max(first + 1, int(np.searchsorted(ends, done + limit, side='right')))
+        yield first, last
+        first = last
+
+#===path length===
+def pathLength(trajectory, drawn=True):
+    """
+    Lunghezza del percorso, solo dei tratti disegnati se `drawn`.
+    """
+    x1, y1, x2, y2 = trajectory.segments(drawn)
+    return float(np.hypot(x2 - x1, y2 - y1).sum())
+
+#===bounds===
+def bounds(trajectory, drawn=True):
+    """
+    Rettangolo `(xmin, ymin, xmax, ymax)` che contiene il percorso, solo i tratti disegnati se `drawn`.
+    Se non ci sono tratti restituisce `None`.
+    """
+    x1, y1, x2, y2 = trajectory.segments(drawn)
+    if not len(x1):
+        return None
+    return (float(min(x1.min(), x2.min())), float(min(y1.min(), y2.min())),
+            float(max(x1.max(), x2.max())), float(max(y1.max(), y2.max())))
+
+#===coverage===
+def coverage(trajectory, cell=1.0, drawn=True):
+    """
+    Frazione delle celle quadrate di lato `cell`, della griglia che copre **bounds**, attraversate dal percorso.
+    Ogni segmento viene campionato con un punto ogni `cell / 2`, quindi le celle appena sfiorate possono non essere contate.
+    """
+    box = bounds(trajectory, drawn)
+    if box is None:
+        return 0.0
+    xmin, ymin, xmax, ymax = box
+    rows = int((ymax - ymin) // cell) + 1
+    total = (int((xmax - xmin) // cell) + 1) * rows
+
+    x1, y1, x2, y2 = trajectory.segments(drawn)
+    steps = np.maximum(1, np.ceil(np.hypot(x2 - x1, y2 - y1) / (cell / 2))).astype(np.int64)
+    cells = []
+    for first, last in _batches(steps + 1):
+        counts = steps[first:last] + 1
+        index = np.repeat(np.arange(first, last), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        t = offsets / steps[index]
+        xs = x1[index] + t * (x2[index] - x1[index])
+        ys = y1[index] + t * (y2[index] - y1[index])
+        columns = np.minimum(((xs - xmin) // cell).astype(np.int64), total // rows - 1)
+        cells.append(np.unique(columns * rows + np.minimum(((ys - ymin) // cell).astype(np.int64), rows - 1)))
+    return len(np.unique(np.concatenate(cells))) / total
+
+#===intersections===
+def _orientation(ax, ay, bx, by, cx, cy):
+    return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+
+def intersections(trajectory, drawn=True):
+    """
+    Numero di coppie di segmenti del percorso che si attraversano, cioe' con un punto in comune interno a entrambi:
+    i segmenti consecutivi, che condividono solo un estremo, e quelli sovrapposti sulla stessa retta non vengono contati.
+    Le coppie candidate sono quelle con le proiezioni sull'asse x sovrapposte, trovate ordinando i segmenti per `xmin`,
+    poi vengono scartate quelle con le proiezioni sull'asse y disgiunte e le altre sono verificate con le orientazioni.
+    """
+    x1, y1, x2, y2 = trajectory.segments(drawn)
+    order = np.argsort(np.minimum(x1, x2), kind='stable')
+    x1, y1, x2, y2 = x1[order], y1[order], x2[order], y2[order]
+    left, right = np.minimum(x1, x2), np.maximum(x1, x2)
+    bottom, top = np.minimum(y1, y2), np.maximum(y1, y2)
+
+    # il segmento i va confrontato con i segmenti da i + 1 a stops[i] escluso
+    stops = np.searchsorted(left, right, side='right')
+    counts = np.maximum(stops - np.arange(len(left)) - 1, 0)
+    found = 0
+    for first, last in _batches(counts):
+        sizes = counts[first:last]
+        i = np.repeat(np.arange(first, last), sizes)
+        j = i + 1 + np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        keep = (bottom[i] <= top[j]) & (bottom[j] <= top[i])
+        i, j = i[keep], j[keep]
+        ax, ay, bx, by = x1[i], y1[i], x2[i], y2[i]
+        cx, cy, dx, dy = x1[j], y1[j], x2[j], y2[j]
+        crossing = _orientation(cx, cy, dx, dy, ax, ay) * _orientation(cx, cy, dx, dy, bx, by) < 0
+        crossing &= _orientation(ax, ay, bx, by, cx, cy) * _orientation(ax, ay, bx, by, dx, dy) < 0
+        found += int(np.count_nonzero(crossing))
+    return found
+
+#===report===
+def report(trajectory, cell=1.0):
+    """
+    Restituisce le metriche dei tratti disegnati: numero di punti e di segmenti, lunghezza, rettangolo che li contiene,
+    copertura con celle di lato `cell`, numero di intersezioni e numero di colori usati.
+    """
+    return {
+        'points': len(trajectory),
+        'segments': int(np.count_nonzero(trajectory.down[1:])),
+        'length': pathLength(trajectory),
+        'bounds': bounds(trajectory),
+        'coverage': coverage(trajectory, cell),
+        'intersections': intersections(trajectory),
+        'colors': len(trajectory.colors)
+    }
+
+if __name__ == '__main__':
+    from interpreter import run
+    with open(sys.argv[1]) as inf:
+        trajectory = run(inf.read(), graphics=TrajectoryBackend())
+    print(report(trajectory, float(sys.argv[2]) if len(sys.argv) > 2 else 1.0))
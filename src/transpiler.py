@@ -0,0 +1,930 @@
+from logoAst import NodeWalker, Block, Word, StringLiteral, Output
+from tailcalls import tailCalls, TailCall, STATEMENT
+from parser import parse, grammar, UndefinedNodeException
+from grammarCache import CACHE_DIR, grammarHash
+from astCache import DISK_PRUNE_INTERVAL
+from interpreter import DT_OPERATORS, DT_GRAPHICS, turtleMoves, repeatMoves, cachedCall, beginAsk, endAsk, readword, write, current
+from collections import OrderedDict
+from contextlib import contextmanager
+import optimizer
+from importlib import util as imputil
+import hashlib
+import marshal
+import math
+import os
+import sys
+import tempfile
+import threading
+
+"""
+Transpiler da Logo a Python.
+Il programma Logo viene tradotto in sorgente python leggibile:
+
+    - ogni procedura diventa una funzione `p_<nome>`, i suoi parametri diventano le variabili locali `v_<nome>`
+    - `REPEAT` diventa un ciclo `for` e `WHILE` un ciclo `while`
+    - `ASK` diventa un blocco `with asking(...)`, che torna alle tartarughe precedenti anche quando il corpo termina con un `return`
+    - `OUTPUT` e `STOP` diventano dei `return`
+    - una procedura che chiama se stessa in coda diventa un ciclo `while True`, la chiamata assegna i nuovi parametri e ricomincia il ciclo,
+      le chiamate in coda ad altre procedure restituiscono una `TailCall`, che viene eseguita da `trampoline`
+    - una procedura con `cache`, assegnato da [[optimizer.py#cacheable]], viene avvolta da `cached`
+    - una chiamata con un numero di parametri diverso da quello di una procedura con lo stesso nome passa da `arguments`
+    - il codice al di fuori delle procedure viene messo nella funzione `main`
+
+Le operazioni che in Logo effettuano controlli sui tipi vengono tradotte in chiamate alle funzioni di supporto
+definite in questo modulo, cosi' che gli errori siano gli stessi di [[interpreter.py]].
+Le espressioni che contengono istruzioni (ad esempio un `IFELSE` usato come valore) vengono tradotte
+calcolando prima il loro valore in una variabile temporanea `t<n>`.
+"""
+toStatements = NodeWalker()
+toExpression = NodeWalker()
+
+"""
+Versione del codice generato, va incrementata ogni volta che cambia la traduzione
+cosi' che i moduli salvati nella cache non vengano piu' utilizzati.
+"""
+TRANSPILER_VERSION = 10
+
+"""
+Dispatch table che associa ad ogni operatore infisso la funzione di supporto che lo implementa.
+"""
+DT_INFIX = {
+    '+':  'add',
+    '-':  'sub',
+    '*':  'mul',
+    '/':  'div',
+    '<':  'lt',
+    '>':  'gt',
+    '=':  'eq',
+    '<=': 'le',
+    '>=': 'ge'
+}
+
+"""
+Tipi di nodo che non producono mai un valore e vengono quindi tradotti sempre come istruzioni.
+"""
+STATEMENT_TYPES = ['pr', 'make', 'graphic', 'repeatState', 'turtleRepeat', 'whileState', 'askState', 'opState', 'stopState', 'procedureDeclaration']
+
+#===indent===
+def _indent(lines):
+    """
+    Indenta di un livello le righe, se non ci sono righe restituisce un `pass`.
+    """
+    return ['    ' + line for line in lines] if lines else ['    pass']
+
+#===temporary===
+def _temporary():
+    """
+    Restituisce il nome di una nuova variabile temporanea.
+    """
+    toExpression.TEMPORARIES += 1
+    return 't' + str(toExpression.TEMPORARIES)
+
+#===is simple===
+def _isSimple(expr):
+    """
+    Vero se l'espressione tradotta e' un letterale o una variabile, quindi puo' essere valutata piu' tardi
+    senza cambiare l'ordine degli effetti collaterali.
+    """
+    return expr.isidentifier() or _isLiteral(expr)
+
+#===is literal===
+def _isLiteral(expr):
+    return expr in ['True', 'False'] or expr.lstrip('-').replace('.', '', 1).isdigit() or expr[:1] in ['"', "'"]
+
+#===never none===
+def _neverNone(expr):
+    """
+    Vero se l'espressione tradotta non puo' valere `None`: i letterali, le variabili globali (`make` non accetta `None`),
+    gli operatori infissi e le espressioni tra parentesi, che sono sempre segni o connettivi logici.
+    """
+    return _isLiteral(expr) or expr.startswith(('(', 'G[')) or expr.split('(')[0] in DT_INFIX.values()
+
+#===sequence===
+def _sequence(parts):
+    """
+    Unisce le traduzioni `(righe, espressione)` di piu' operandi preservando l'ordine di valutazione:
+    se un operando e' seguito da un altro che richiede delle istruzioni, il suo valore viene prima salvato
+    in una variabile temporanea.
+    Restituisce le righe da eseguire prima e la lista delle espressioni.
+    """
+    lines = []
+    exprs = []
+    for index, (pre, expr) in enumerate(parts):
+        lines += pre
+        if not _isSimple(expr) and any(later for later, _ in parts[index + 1:]):
+            temp = _temporary()
+            lines.append(temp + ' = ' + expr)
+            expr = temp
+        exprs.append(expr)
+    return lines, exprs
+
+#===block value===
+def _blockValue(children, target):
+    """
+    Traduce una sequenza di istruzioni usata come valore: nella variabile `target` viene salvato
+    l'ultimo valore diverso da `None`, come in [[interpreter.py#block]].
+    """
+    lines = [target + ' = None']
+    for child in children:
+        if child.TYPE in STATEMENT_TYPES:
+            lines += toStatements(child)
+            continue
+        pre, expr = toExpression(child)
+        lines += pre
+        if expr == 'None':
+            continue
+        if _neverNone(expr):
+            lines.append(target + ' = ' + expr)
+        else:
+            value = _temporary()
+            lines += [value + ' = ' + expr, 'if ' + value + ' is not None:'] + _indent([target + ' = ' + value])
+    return lines
+
+#===value of===
+def _valueOf(ast):
+    """
+    Traduce un operando che puo' essere un espressione oppure un blocco.
+    """
+    if isinstance(ast, Block):
+        temp = _temporary()
+        return _blockValue(ast.children, temp), temp
+    return toExpression(ast)
+
+#===statements===
+def _statements(children):
+    lines = []
+    for child in children:
+        lines += toStatements(child)
+    return lines
+
+#===prog===
+@toStatements.register
+def prog(visit, ast):
+    return _statements(ast.children)
+
+#===line===
+@toStatements.register
+def line(visit, ast):
+    return _statements(ast.children)
+
+#===block===
+@toStatements.register
+def block(visit, ast):
+    return _statements(ast.children)
+
+#===print===
+@toStatements.register
+def pr(visit, ast):
+    lines = []
+    for child in ast.children:
+        pre, expr = toExpression(child)
+        lines += pre + ['print(' + expr + ')']
+    return lines
+
+#===make===
+@toStatements.register
+def make(visit, ast):
+    pre, (name, value) = _sequence([toExpression(child) for child in ast.children])
+    return pre + ['make(' + name + ', ' + value + ')']
+
+#===graphic===
+@toStatements.register
+def graphic(visit, ast):
+    """
+    I comandi senza parametri si comportano come `zeroPrarameterFunctions` definita in [[interpreter.py]].
+    Se il primo parametro e' un blocco i parametri sono gli elementi del blocco.
+    """
+    name = repr(ast.name)
+    if len(ast.children) == 0:
+        return ['graphic(' + name + ')']
+    children = ast.children[0].children if isinstance(ast.children[0], Block) else ast.children
+    pre, exprs = _sequence([toExpression(child) for child in children])
+    return pre + ['graphic(' + name + ', [' + ', '.join(exprs) + '])']
+
+#===if===
+@toStatements.register
+def ifState(visit, ast):
+    pre, condition = _valueOf(ast.children[0])
+    return pre + ['if test(' + condition + '):'] + _indent(visit(ast.children[1]))
+
+#===if else===
+@toStatements.register
+def ifelseState(visit, ast):
+    pre, condition = _valueOf(ast.children[0])
+    return (pre + ['if test(' + condition + '):'] + _indent(visit(ast.children[1]))
+            + ['else:'] + _indent(visit(ast.children[2])))
+
+#===repeat===
+@toStatements.register
+def repeatState(visit, ast):
+    pre, times = toExpression(ast.children[0])
+    return pre + ['for _ in times(' + times + '):'] + _indent(['step()'] + visit(ast.children[1]))
+
+#===turtle repeat===
+@toStatements.register
+def turtleRepeat(visit, ast):
+    """
+    Se i parametri del corpo non richiedono istruzioni vengono passati a `vectorized` in una lambda,
+    che li valuta una sola volta, altrimenti il ciclo viene tradotto come un `REPEAT`.
+    """
+    body = ast.children[1]
+    parts = [toExpression(child.children[0]) for child in body.children]
+    if any(pre for pre, _ in parts):
+        return repeatState(visit, ast)
+    pre, times = toExpression(ast.children[0])
+    count = _temporary()
+    params = 'lambda: [' + ', '.join(expr for _, expr in parts) + ']'
+    return (pre + [count + ' = ' + times, 'if not vectorized(' + count + ', ' + repr(list(ast.moves)) + ', ' + params + '):']
+            + _indent(['for _ in times(' + count + '):'] + _indent(['step()'] + visit(body))))
+
+#===while===
+@toStatements.register
+def whileState(visit, ast):
+    """
+    Se la condizione richiede delle istruzioni, vengono eseguite all'inizio di ogni iterazione.
+    """
+    pre, condition = toExpression(ast.children[0])
+    body = ['step()'] + visit(ast.children[1])
+    if not pre:
+        return ['while ' + condition + ':'] + _indent(body)
+    return ['while True:'] + _indent(pre + ['if not ' + condition + ':', '    break'] + body)
+
+#===ask===
+@toStatements.register
+def askState(visit, ast):
+    """
+    Le tartarughe sono un numero oppure gli elementi di un blocco, come i parametri di **graphic**.
+    """
+    turtles, body = ast.children
+    children = turtles.children if isinstance(turtles, Block) else [turtles]
+    pre, exprs = _sequence([toExpression(child) for child in children])
+    return pre + ['with asking([' + ', '.join(exprs) + ']):'] + _indent(visit(body))
+
+#===output===
+@toStatements.register
+def opState(visit, ast):
+    if toExpression.PARAMS is None:
+        return ["outside('output')"]
+    if id(ast.children[0]) in toStatements.TAIL['calls']:
+        return _tailCall(ast.children[0])
+    pre, expr = toExpression(ast.children[0])
+    return pre + ['return ' + _kept(expr)]
+
+#===stop===
+@toStatements.register
+def stopState(visit, ast):
+    if toExpression.PARAMS is None:
+        return ["outside('stop')"]
+    return ['return']
+
+#===kept===
+def _kept(expr):
+    """
+    Se la procedura ha scartato il valore di una chiamata in coda a se stessa, anche il suo valore viene scartato.
+    """
+    if toStatements.TAIL['discard']:
+        return expr + ' if keep else None'
+    return expr
+
+#===tail call===
+def _tailCall(ast):
+    """
+    Traduce una chiamata in coda.
+    Se la procedura chiama se stessa e in `P` c'e' ancora la funzione in esecuzione, i parametri vengono riassegnati
+    e il ciclo del corpo ricomincia, contando un passo del budget come una chiamata, altrimenti viene eseguita una chiamata normale.
+    Una chiamata in coda ad un altra procedura restituisce una **TailCall**, che viene eseguita da **trampoline**.
+    """
+    tail = toStatements.TAIL
+    discard = tail['calls'][id(ast)] == STATEMENT
+    pre, callee, exprs = _call(ast)
+
+    if ast.name != tail['name'] or len(exprs) != len(tail['args']):
+        keep = 'False' if discard else ('keep' if tail['discard'] else 'True')
+        return pre + ['return TailCall(' + callee + ', ' + _arguments(ast.name, callee, exprs) + ', ' + keep + ')']
+
+    call = _invocation(ast.name, callee, exprs)
+    loop = [', '.join(tail['args']) + ' = ' + ', '.join(exprs)]
+    if discard:
+        if tail['discard']:
+            loop.append('keep = False')
+        after = [call, 'return']
+    else:
+        after = ['return ' + _kept(call)]
+    return pre + ['if ' + callee + ' is ' + tail['function'] + ':'] + _indent(loop + ['step()', 'continue']) + after
+
+#===has output===
+def _hasOutput(ast):
+    return any(isinstance(child, Output) or _hasOutput(child) for child in ast.children)
+
+#===procedure declaration===
+@toStatements.register
+def procedureDeclaration(visit, ast):
+    """
+    Traduce la procedura in una funzione python e la registra in `P` nel punto in cui e' dichiarata.
+    Se una procedura viene ridichiarata la nuova funzione riceve un suffisso numerico.
+    Le chiamate in coda, trovate da [[tailcalls.py#tail calls]], vengono tradotte da **_tailCall**:
+    se la procedura chiama se stessa il corpo diventa un ciclo, se chiama un altra procedura viene avvolta da **trampoline**.
+    Una procedura con `cache` viene poi avvolta da **cached**.
+    Il corpo viene eseguito tra `enter` e `leave` del [[budget.py#budget]].
+    """
+    name = ast.name
+    params = ast.params
+    count = toStatements.PROCEDURES.get(name, 0) + 1
+    toStatements.PROCEDURES[name] = count
+    function = 'p_' + name + ('' if count == 1 else '_' + str(count))
+
+    # se un parametro e' ripetuto vale l'ultimo, i precedenti diventano argomenti ignorati
+    args = ['v_' + param if param not in params[index + 1:] else '_' + str(index) for index, param in enumerate(params)]
+
+    calls = {id(call): kind for call, kind in tailCalls(ast)}
+    selfCalls = [call for call, _ in tailCalls(ast) if call.name == name and len(call.children) == len(params)]
+    discard = any(calls[id(call)] == STATEMENT for call in selfCalls) and _hasOutput(ast)
+    tail = {'name': name, 'function': function, 'args': args, 'calls': calls, 'discard': discard}
+
+    outer = toExpression.PARAMS, toStatements.TAIL
+    toExpression.PARAMS = params
+    toStatements.TAIL = tail
+    try:
+        body = _statements(ast.children)
+    finally:
+        toExpression.PARAMS, toStatements.TAIL = outer
+
+    if selfCalls:
+        loop = body if body[-1] == 'return' else body + ['return']
+        body = (['keep = True'] if discard else []) + ['while True:'] + _indent(loop)
+    header = 'def ' + function + '(' + ', '.join(args) + '):'
+    body = ['enter()', 'try:'] + _indent(body) + ['finally:', '    leave()']
+    wrapper = [function + ' = trampoline(' + function + ')'] if len(selfCalls) < len(calls) else []
+    if ast.cache:
+        wrapper.append(function + ' = cached(' + function + ')')
+    wrapper.append(function + '.arity = ' + str(len(params)))
+    return [header] + _indent(body) + wrapper + ['P[' + repr(name) + '] = ' + function]
+
+#===expression statement===
+def _expressionStatement(visit, ast):
+    """
+    Un espressione usata come istruzione viene valutata solo per i suoi effetti collaterali.
+    """
+    if id(ast) in toStatements.TAIL['calls']:
+        return _tailCall(ast)
+    pre, expr = toExpression(ast)
+    if _isSimple(expr) or expr == 'None':
+        return pre
+    return pre + [expr]
+
+toStatements.catchall_func = _expressionStatement
+
+#===statement expression===
+def _statementExpression(visit, ast):
+    """
+    Un istruzione usata come valore viene eseguita e il suo valore e' `None`.
+    Un nodo che non e' ne' un istruzione ne' un espressione solleva **UndefinedNodeException**.
+    """
+    if ast.TYPE not in toStatements.dispatch_table:
+        raise UndefinedNodeException("Nodo `" + str(ast.TYPE) + "` non traducibile")
+    return toStatements(ast), 'None'
+
+toExpression.catchall_func = _statementExpression
+
+#===operations===
+@toExpression.register
+def operation(visit, ast):
+    """
+    Un operazione infissa tra due espressioni diventa una chiamata alla funzione di supporto indicata in `DT_INFIX`.
+    """
+    pre, (left, right) = _sequence([visit(child) for child in ast.children])
+    return pre, DT_INFIX[ast.op] + '(' + left + ', ' + right + ')'
+
+#===sign===
+@toExpression.register
+def sign(visit, ast):
+    """
+    Il segno viene applicato come in [[interpreter.py#sign]].
+    """
+    pre, expr = visit(ast.children[0])
+    return pre, '(' + ast.sign + '1 * ' + expr + ')'
+
+#===arithmetic and boolean operations===
+@toExpression.register
+def arithmBoolOperations(visit, ast):
+    """
+    I connettivi logici sono tradotti negli operatori `and`, `or` e `not` di python, cosi' da mantenere la short circuit evaluation.
+    Se un operando richiede delle istruzioni, la traduzione usa una catena di `if` annidati.
+    Le altre operazioni sono tradotte in una chiamata a `prim`.
+    """
+    name = ast.name
+    parts = [_valueOf(child) for child in ast.children]
+
+    if name == 'not':
+        pre, expr = parts[0]
+        return pre, '(not truth(' + expr + '))'
+
+    if name in ['and', 'or']:
+        if not any(pre for pre, _ in parts):
+            return [], '(' + (' ' + name + ' ').join('truth(' + expr + ')' for _, expr in parts) + ')'
+        temp = _temporary()
+        lines = []
+        nested = lines
+        for index, (pre, expr) in enumerate(parts):
+            nested += pre + [temp + ' = truth(' + expr + ')']
+            if index < len(parts) - 1:
+                inner = []
+                nested.append(('if ' if name == 'and' else 'if not ') + temp + ':')
+                nested.append(inner)
+                nested = inner
+        return _flatten(lines), temp
+
+    pre, exprs = _sequence(parts)
+    return pre, 'prim(' + ', '.join([repr(name)] + exprs) + ')'
+
+#===flatten===
+def _flatten(lines):
+    """
+    Trasforma le liste annidate prodotte per i connettivi logici in righe indentate.
+    """
+    result = []
+    for line in lines:
+        if isinstance(line, list):
+            result += _indent(_flatten(line))
+        else:
+            result.append(line)
+    return result
+
+#===deref===
+@toExpression.register
+def deref(visit, ast):
+    """
+    Se il nome della variabile e' noto, un parametro della procedura diventa la variabile locale corrispondente
+    e una variabile globale un accesso a `G`.
+    Altrimenti il nome viene cercato a runtime da `thing`.
+    """
+    child = ast.children[0]
+    if isinstance(child, (Word, StringLiteral)):
+        name = child.value.replace('"', '')
+        params = toExpression.PARAMS or []
+        pre, expr = [], ('v_' + name if name in params else 'G[' + repr(name) + ']')
+    else:
+        pre, name = visit(child)
+        frame = ''
+        if toExpression.PARAMS:
+            frame = ', {' + ', '.join(repr(param) + ': v_' + param for param in toExpression.PARAMS) + '}'
+        expr = 'thing(' + name + frame + ')'
+    return pre, expr
+
+#===call===
+def _call(ast):
+    """
+    Traduce la procedura e i parametri di un invocazione, restituisce le righe da eseguire prima,
+    l'espressione della procedura e quelle dei parametri.
+    La procedura viene cercata in `P` prima di valutare i parametri, come in [[interpreter.py#procedureInvocation]].
+    """
+    parts = [toExpression(child) for child in ast.children]
+    callee = 'P[' + repr(ast.name) + ']'
+    if any(pre for pre, _ in parts):
+        temp = _temporary()
+        pre, exprs = _sequence(parts)
+        return [temp + ' = ' + callee] + pre, temp, exprs
+    return [], callee, [expr for _, expr in parts]
+
+#===arguments===
+def _arguments(name, callee, exprs):
+    """
+    Traduce la lista dei parametri di una chiamata.
+    Se non tutte le procedure `name` dichiarate nel programma hanno quel numero di parametri, la lista passa da `arguments`,
+    che controlla il numero di parametri della procedura chiamata dopo averli valutati, come [[interpreter.py#procedure invocation]].
+    """
+    values = '[' + ', '.join(exprs) + ']'
+    if toExpression.ARITIES.get(name, {len(exprs)}) == {len(exprs)}:
+        return values
+    return 'arguments(' + callee + ', ' + repr(name) + ', ' + values + ')'
+
+#===invocation===
+def _invocation(name, callee, exprs):
+    arguments = _arguments(name, callee, exprs)
+    if arguments.startswith('['):
+        return callee + '(' + ', '.join(exprs) + ')'
+    return callee + '(*' + arguments + ')'
+
+#===procedure invocation===
+@toExpression.register
+def procedureInvocation(visit, ast):
+    pre, callee, exprs = _call(ast)
+    return pre, _invocation(ast.name, callee, exprs)
+
+#===if===
+@toExpression.register
+def ifState(visit, ast):
+    pre, condition = _valueOf(ast.children[0])
+    temp = _temporary()
+    return (pre + [temp + ' = None', 'if test(' + condition + '):']
+            + _indent(_blockValue(ast.children[1].children, temp))), temp
+
+#===if else===
+@toExpression.register
+def ifelseState(visit, ast):
+    pre, condition = _valueOf(ast.children[0])
+    temp = _temporary()
+    return (pre + ['if test(' + condition + '):'] + _indent(_blockValue(ast.children[1].children, temp))
+            + ['else:'] + _indent(_blockValue(ast.children[2].children, temp))), temp
+
+#===block===
+@toExpression.register
+def block(visit, ast):
+    return _valueOf(ast)
+
+#===read word===
+@toExpression.register
+def rw(visit, ast):
+    return [], 'readword()'
+
+@toExpression.register
+def Boolean_(visit, ast):
+    return [], repr(ast.value)
+
+@toExpression.register
+def STRINGLITERAL(visit, ast):
+    return [], repr(str(ast.value))
+
+@toExpression.register
+def STRING(visit, ast):
+    return [], repr(str(ast.value.replace('"', '')))
+
+@toExpression.register
+def number(visit, ast):
+    if '.' in ast.value:
+        return [], repr(float(ast.value))
+    return [], repr(int(ast.value))
+
+@toExpression.register
+def constant(visit, ast):
+    """
+    I float non finiti non hanno un letterale python e vengono ricostruiti con `float`.
+    """
+    if isinstance(ast.value, float) and not math.isfinite(ast.value):
+        return [], "float('" + repr(ast.value) + "')"
+    return [], repr(ast.value)
+
+"""
+Lo stato della traduzione e' salvato negli attributi di `toStatements` e `toExpression`,
+quindi un solo thread alla volta puo' tradurre un albero.
+"""
+LOCK = threading.Lock()
+
+#===arities===
+def _arities(ast, arities):
+    """
+    Raccoglie in `arities` i numeri di parametri delle procedure dichiarate nell'albero, per nome.
+    """
+    if ast.TYPE == 'procedureDeclaration':
+        arities.setdefault(ast.name, set()).add(len(ast.params))
+    for child in ast.children:
+        _arities(child, arities)
+    return arities
+
+#===transpile===
+def transpile(ast):
+    """
+    Traduce l'albero prodotto da `parse` nel sorgente python del modulo corrispondente.
+    """
+    with LOCK:
+        toExpression.TEMPORARIES = 0
+        toExpression.PARAMS = None
+        toExpression.ARITIES = _arities(ast, {})
+        toStatements.PROCEDURES = {}
+        toStatements.TAIL = {'name': None, 'calls': {}, 'discard': False}
+        body = toStatements(ast)
+    return '\n'.join(['# Codice generato da transpiler.py', '', 'def main():'] + _indent(body)) + '\n'
+
+#===runtime support===
+def _isNumber(value):
+    return not isinstance(value, bool) and isinstance(value, (int, float))
+
+def _numbers(x, y):
+    if not (_isNumber(x) and _isNumber(y)):
+        raise TypeError("In un espressione gli operandi devono essere int o float")
+
+def add(x, y):
+    _numbers(x, y)
+    return x + y
+
+def sub(x, y):
+    _numbers(x, y)
+    return x - y
+
+def mul(x, y):
+    _numbers(x, y)
+    return x * y
+
+def div(x, y):
+    _numbers(x, y)
+    return DT_OPERATORS['/'](x, y)
+
+def lt(x, y):
+    _numbers(x, y)
+    return x < y
+
+def gt(x, y):
+    _numbers(x, y)
+    return x > y
+
+def eq(x, y):
+    _numbers(x, y)
+    return x == y
+
+def le(x, y):
+    _numbers(x, y)
+    return x <= y
+
+def ge(x, y):
+    _numbers(x, y)
+    return x >= y
+
+def prim(name, *params):
+    """
+    Esegue un operazione aritmetica di `DT_OPERATORS` controllando che i parametri siano dei numeri.
+    """
+    if not all(_isNumber(ele) for ele in params):
+        raise TypeError("In un espressione gli operandi devono essere int o float")
+    return DT_OPERATORS[name](list(params))
+
+def truth(value):
+    if not isinstance(value, bool):
+        raise TypeError("Gli input dei connettivi logici devono essere dei boolean")
+    return value
+
+def test(value):
+    if not isinstance(value, bool):
+        raise TypeError("La condizione di un IF deve essere un boolean")
+    return value
+
+def times(value):
+    if not isinstance(value, int):
+        raise TypeError("REPEAT deve avere un int come parametro")
+    return range(value)
+
+def vectorized(count, moves, params):
+    """
+    Esegue un `TurtleRepeat` come [[interpreter.py#turtle repeat]], restituisce falso se il corpo va eseguito
+    un comando alla volta.
+    """
+    if not isinstance(count, int) or count <= 0:
+        return False
+    try:
+        moves = turtleMoves(moves, params())
+    except Exception:
+        return False
+    if moves is None:
+        return False
+    repeatMoves(count, moves)
+    return True
+
+def graphic(name, params=None):
+    """
+    Esegue un comando grafico come [[interpreter.py#graphic]].
+    """
+    if params is None:
+        DT_GRAPHICS[name]()
+        return
+    if not all(isinstance(ele, (int, float)) for ele in params):
+        raise TypeError("In un espressione gli operandi devono essere int o float")
+    DT_GRAPHICS[name](params)
+
+@contextmanager
+def asking(turtles):
+    """
+    Esegue il corpo di un `ASK` come [[interpreter.py#ask]].
+    """
+    previous = beginAsk(turtles)
+    try:
+        yield
+    finally:
+        endAsk(previous)
+
+def arguments(function, name, values):
+    """
+    Restituisce i parametri di una chiamata se sono tanti quanti quelli della procedura, vedi **_arguments**.
+    """
+    if len(values) != function.arity:
+        raise TypeError("Numero di parametri per la funzione `" +  name + "` non corretto")
+    return values
+
+def outside(command):
+    raise SyntaxError("Non si può avere " + ('un output' if command == 'output' else 'uno stop') + " state al di fuori di una funzione")
+
+def trampoline(function):
+    """
+    Avvolge una procedura che contiene chiamate in coda ad altre procedure:
+    ogni **TailCall** restituita viene eseguita nel ciclo della procedura che l'ha avvolta, senza annidare le chiamate.
+    Il valore di una chiamata in coda usata come istruzione viene scartato, come in [[interpreter.py#procedure invocation]].
+    """
+    def procedure(*values):
+        result = function(*values)
+        keep = True
+        while result.__class__ is TailCall:
+            keep = keep and result.keep
+            result = getattr(result.function, 'body', result.function)(*result.values)
+        return result if keep else None
+    procedure.body = function
+    return procedure
+
+def cached(function):
+    """
+    Avvolge una procedura con `cache`: le chiamate passano da [[interpreter.py#cached call]], con la procedura avvolta come chiave.
+    Una **TailCall** verso la procedura, eseguita da **trampoline**, passa invece direttamente al corpo.
+    """
+    def procedure(*values):
+        return cachedCall(procedure, values, lambda: function(*values))
+    procedure.body = getattr(function, 'body', function)
+    return procedure
+
+class Memory(dict):
+    """
+    Memoria globale del programma, un nome non dichiarato solleva **NameError**.
+    """
+    def __missing__(self, name):
+        raise NameError("La variabile " + name + " non è stata dichiarata")
+
+class Procedures(dict):
+    """
+    Procedure dichiarate dal programma, una procedura non dichiarata solleva **NameError**.
+    """
+    def __missing__(self, name):
+        raise NameError("La funzione non è stata dichiarata")
+
+#===namespace===
+def namespace():
+    """
+    Crea il namespace in cui viene eseguito un modulo generato, con una nuova memoria globale e nessuna procedura.
+    `print` e `readword` usano l'uscita e l'ingresso dell'interprete corrente, vedi [[interpreter.py#interpreter]],
+    `step`, `enter` e `leave` il suo budget.
+    """
+    budget = current().budget
+    G = Memory()
+    P = Procedures()
+
+    def make(name, value):
+        if not isinstance(name, str):
+            raise ValueError("Il nome di una variabile deve essere una stringa")
+        if value == None:
+            raise TypeError("Non posso assegnare ad una variabile un valore nullo")
+        G[name] = value
+
+    def thing(name, frame={}):
+        if name in frame:
+            return frame[name]
+        if name in G:
+            return G[name]
+        raise NameError("La variabile " + name + " non è stata dichiarata")
+
+    result = {name: globals()[name] for name in ['add', 'sub', 'mul', 'div', 'lt', 'gt', 'eq', 'le', 'ge',
+              'prim', 'truth', 'test', 'times', 'vectorized', 'graphic', 'asking', 'readword', 'arguments', 'outside', 'trampoline',
+              'cached', 'TailCall']}
+    result.update({'G': G, 'P': P, 'make': make, 'thing': thing, 'print': write, '__name__': '__logo__',
+                   'step': budget.step, 'enter': budget.enter, 'leave': budget.leave})
+    return result
+
+"""
+Limiti della cache dei moduli compilati, possono essere modificati tramite variabili d'ambiente:
+numero di moduli tenuti in memoria, numero di moduli e byte occupati nella cartella `python` della cache su disco.
+"""
+MAX_PROGRAMS = int(os.environ.get('LOGO_PROGRAM_CACHE_ENTRIES', 256))
+MAX_DISK_PROGRAMS = int(os.environ.get('LOGO_PROGRAM_DISK_ENTRIES', 4096))
+MAX_DISK_BYTES = int(os.environ.get('LOGO_PROGRAM_DISK_BYTES', 256 * 1024 * 1024))
+
+"""
+Cache LRU in memoria dei moduli compilati, la chiave e' la stessa usata per i file su disco.
+"""
+CODE_CACHE = OrderedDict()
+CODE_LOCK = threading.Lock()
+
+"""
+Moduli scritti su disco da questo processo, ogni `DISK_PRUNE_INTERVAL` la cartella viene ridotta entro i limiti.
+"""
+WRITTEN = 0
+
+#===remember===
+def _remember(key, compiled):
+    """
+    Inserisce il modulo nella cache in memoria ed elimina quelli usati meno di recente oltre `MAX_PROGRAMS`.
+    """
+    with CODE_LOCK:
+        CODE_CACHE[key] = compiled
+        CODE_CACHE.move_to_end(key)
+        while len(CODE_CACHE) > MAX_PROGRAMS:
+            CODE_CACHE.popitem(last=False)
+    return compiled
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+#===prune disk===
+def pruneDisk(directory, maxPrograms=MAX_DISK_PROGRAMS, maxBytes=MAX_DISK_BYTES):
+    """
+    Elimina dalla cartella i moduli, `.pyc` e sorgente, usati meno di recente, come [[astCache.py]],
+    finche' non vengono rispettati i limiti sul numero di moduli e sulla dimensione.
+    """
+    try:
+        programs = {}
+        for entry in os.scandir(directory):
+            key, suffix = os.path.splitext(entry.name)
+            if suffix in ('.py', '.pyc'):
+                stat = entry.stat()
+                used, size = programs.get(key, (0, 0))
+                programs[key] = (max(used, stat.st_mtime), size + stat.st_size)
+    except OSError:
+        return
+
+    files = sorted((used, size, key) for key, (used, size) in programs.items())
+    total = sum(size for _, size, _ in files)
+    while files and (len(files) > maxPrograms or total > maxBytes):
+        _, size, key = files.pop(0)
+        total -= size
+        for suffix in ('.pyc', '.py'):
+            try:
+                os.remove(os.path.join(directory, key + suffix))
+            except OSError:
+                pass
+
+#===program key===
+def programKey(code, optimize=True):
+    """
+    Chiave del modulo compilato: dipende dal sorgente Logo, dalla grammatica, dalla versione del transpiler
+    e, se l'albero viene ottimizzato, dalla versione di [[optimizer.py]].
+    """
+    key = hashlib.sha256()
+    for part in (grammarHash(grammar), str(TRANSPILER_VERSION), str(optimizer.OPTIMIZER_VERSION) if optimize else '-', code):
+        key.update(part.encode('utf-8'))
+        key.update(b'\0')
+    return key.hexdigest()
+
+#===load program===
+def loadProgram(code, cacheDir=None, optimize=True):
+    """
+    Restituisce il code object del modulo python corrispondente al programma Logo.
+    Il code object viene cercato prima in memoria e poi su disco, in un file `.pyc` che contiene il magic number
+    di python seguito dal code object serializzato con `marshal`.
+    Accanto al `.pyc` viene salvato anche il sorgente generato, cosi' che traceback e profiler possano mostrarlo.
+    Solo se il programma non e' presente nella cache viene effettuato il parsing e la traduzione,
+    se `optimize` e' vero l'albero viene ottimizzato da [[optimizer.py]] prima di essere tradotto.
+    La cache in memoria tiene al piu' `MAX_PROGRAMS` moduli, quella su disco viene ridotta da **pruneDisk**
+    ogni `DISK_PRUNE_INTERVAL` moduli scritti.
+    Se il codice non e' valido solleva **SyntaxError**.
+    """
+    global WRITTEN
+    key = programKey(code, optimize)
+    with CODE_LOCK:
+        compiled = CODE_CACHE.get(key)
+        if compiled is not None:
+            CODE_CACHE.move_to_end(key)
+            return compiled
+
+    directory = os.path.join(CACHE_DIR if cacheDir is None else cacheDir, 'python')
+    path = os.path.join(directory, key)
+    try:
+        with open(path + '.pyc', 'rb') as inf:
+            data = inf.read()
+        if data[:len(imputil.MAGIC_NUMBER)] == imputil.MAGIC_NUMBER:
+            compiled = marshal.loads(data[len(imputil.MAGIC_NUMBER):])
+            _touch(path + '.pyc')
+            return _remember(key, compiled)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    ast = parse(code)
+    if ast is None:
+        raise SyntaxError("Errore di parsing")
+    if optimize:
+        ast = optimizer.optimize(ast)
+    source = transpile(ast)
+    compiled = compile(source, path + '.py', 'exec')
+    try:
+        os.makedirs(directory, exist_ok=True)
+        for suffix, data, mode in (('.py', source, 'w'), ('.pyc', imputil.MAGIC_NUMBER + marshal.dumps(compiled), 'wb')):
+            fd, tmp = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, mode) as ouf:
+                ouf.write(data)
+            os.replace(tmp, path + suffix)
+        WRITTEN += 1
+        if WRITTEN % DISK_PRUNE_INTERVAL == 0:
+            pruneDisk(directory)
+    except OSError:
+        pass
+
+    return _remember(key, compiled)
+
+#===execute===
+def execute(compiled):
+    """
+    Esegue il code object di un modulo generato in un nuovo namespace.
+    Va chiamata con un interprete attivo, vedi **active** in [[interpreter.py#interpreter]].
+    """
+    scope = namespace()
+    exec(compiled, scope)
+    scope['main']()
+
+if __name__ == '__main__':
+    with open(sys.argv[1]) as inf:
+        print(transpile(parse(inf.read())), end='')